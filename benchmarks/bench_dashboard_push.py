@@ -0,0 +1,178 @@
+"""Benchmark: dashboard server CPU with idle viewers, push vs interval polling
+
+Starts a server process over a scratch SQLite database holding ``--rows``
+predictions and keeps ``--clients`` idle viewers connected for ``--seconds``:
+
+- push: each viewer holds one /events stream (``DashboardData.event_stream``
+  behind ``register_event_stream``, as the dashboard serves it);
+- poll: each viewer requests the five panels every 5 s, each running the
+  full-table queries the dashboard callbacks used to run per tab.
+
+Reports the server process's CPU time (user + system) while idle.
+Linux only (reads /proc).
+
+Usage:
+    python benchmarks/bench_dashboard_push.py --clients 50 --seconds 60
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import http.client
+import subprocess
+import tempfile
+import threading
+import time
+import numpy as np
+from flask import Flask, jsonify
+from werkzeug.serving import make_server
+
+from dashboards.data_layer import DashboardData, register_event_stream
+from shared.database import DatabaseManager
+
+POLL_INTERVAL = 5.0
+PANELS = ('stats', 'prediction-chart', 'model-chart', 'recent-predictions', 'system-info')
+
+# Queries each panel callback ran on every interval tick before the data layer
+PANEL_QUERIES = {
+    'stats': ["SELECT COUNT(*) FROM predictions",
+              "SELECT COUNT(*) FROM drift_events WHERE drift_detected = true",
+              "SELECT COUNT(*) FROM model_registry",
+              "SELECT metrics FROM model_registry ORDER BY timestamp DESC LIMIT 1"],
+    'prediction-chart': ["SELECT prediction, COUNT(*) FROM predictions GROUP BY prediction"],
+    'model-chart': ["SELECT model_version, metrics FROM model_registry ORDER BY timestamp"],
+    'recent-predictions': ["SELECT prediction, probability, timestamp FROM predictions ORDER BY timestamp DESC LIMIT 5"],
+    'system-info': ["SELECT COUNT(*) FROM predictions",
+                    "SELECT model_version FROM model_registry ORDER BY timestamp DESC LIMIT 1",
+                    "SELECT COUNT(*) FROM drift_events WHERE drift_detected = true"]
+}
+
+
+def load(db: DatabaseManager, n_rows: int):
+    """Insert random predictions, a few drift events and models"""
+    rng = np.random.default_rng(0)
+    conn = db._get_connection()
+    conn.executemany(
+        "INSERT INTO predictions (features, prediction, probability, model_version) VALUES ('[]', ?, ?, 'v1')",
+        zip(rng.integers(0, 2, n_rows).tolist(), rng.uniform(0.5, 1, n_rows).tolist())
+    )
+    conn.commit()
+    conn.close()
+    for i in range(20):
+        db.log_drift_event(i % 3 == 0, 0.1, [], {}, 'none')
+        db.register_model(f"model_{i}", f"models/model_{i}.pkl", {'accuracy': 0.8})
+
+
+def serve(mode: str, db_path: str, port: int):
+    """Run the server side of one mode until killed"""
+    db = DatabaseManager(db_path)
+    app = Flask(__name__)
+    if mode == 'push':
+        data = DashboardData(db, poll_interval=POLL_INTERVAL)
+        data.start()
+        register_event_stream(app, data)
+    else:
+        @app.route('/panel/<name>')
+        def panel(name):
+            results = []
+            for query in PANEL_QUERIES[name]:
+                conn = db._get_connection()  # one connection per callback query block, as before
+                cursor = conn.cursor()
+                cursor.execute(query)
+                results.append(cursor.fetchall())
+                conn.close()
+            return jsonify(len(results))
+    make_server('127.0.0.1', port, app, threaded=True).serve_forever()
+
+
+def cpu_seconds(pid: int) -> float:
+    """User + system CPU time of a process"""
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(')', 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+
+def push_client(port: int, stop: threading.Event, received: list):
+    """Hold one /events stream open and count messages"""
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    conn.request('GET', '/events')
+    response = conn.getresponse()
+    while not stop.is_set():
+        line = response.fp.readline()
+        if not line:
+            break
+        if line.startswith(b'data:'):
+            received.append(1)
+    conn.close()
+
+
+def poll_client(port: int, stop: threading.Event, received: list, offset: float):
+    """Request every panel on each interval tick; failed requests count as 0"""
+    stop.wait(offset)
+    while not stop.is_set():
+        for name in PANELS:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            try:
+                conn.request('GET', f'/panel/{name}')
+                conn.getresponse().read()
+                received.append(1)
+            except (http.client.HTTPException, OSError):
+                received.append(0)  # server overloaded and dropped the request
+            finally:
+                conn.close()
+        stop.wait(POLL_INTERVAL)
+
+
+def measure(mode: str, db_path: str, port: int, clients: int, seconds: float) -> tuple:
+    """Server CPU seconds and responses received over the idle period"""
+    server = subprocess.Popen([sys.executable, __file__, '--serve', mode, '--db', db_path, '--port', str(port)],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        time.sleep(3)  # server start and the first poll
+        stop, received = threading.Event(), []
+        rng = np.random.default_rng(1)
+        threads = [threading.Thread(
+            target=push_client if mode == 'push' else poll_client,
+            args=(port, stop, received) if mode == 'push' else (port, stop, received, rng.uniform(0, POLL_INTERVAL)),
+            daemon=True
+        ) for _ in range(clients)]
+        for thread in threads:
+            thread.start()
+        time.sleep(2)  # connections established
+        start_cpu, start_count = cpu_seconds(server.pid), len(received)
+        time.sleep(seconds)
+        used, window = cpu_seconds(server.pid) - start_cpu, received[start_count:]
+        stop.set()
+        return used, sum(window), len(window) - sum(window)
+    finally:
+        server.kill()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dashboard server CPU with idle viewers")
+    parser.add_argument('--clients', type=int, default=50)
+    parser.add_argument('--seconds', type=float, default=60)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--serve', choices=['push', 'poll'], help=argparse.SUPPRESS)
+    parser.add_argument('--db', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.serve:
+        serve(args.serve, args.db, args.port)
+        return
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'dashboard.db')
+        load(DatabaseManager(db_path), args.rows)
+        print(f"{args.rows:,} predictions, {args.clients} idle viewers, {args.seconds:.0f}s")
+        for mode in ('poll', 'push'):
+            used, sent, dropped = measure(mode, db_path, args.port, args.clients, args.seconds)
+            print(f"{mode:<5} server CPU {used:6.2f}s ({100 * used / args.seconds:5.1f}% of a core), "
+                  f"{sent} responses sent, {dropped} dropped")
+
+
+if __name__ == '__main__':
+    main()
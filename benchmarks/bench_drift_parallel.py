@@ -0,0 +1,55 @@
+"""Benchmark: serial vs process-pool drift detection on wide tables
+
+Usage:
+    python benchmarks/bench_drift_parallel.py --features 256 --rows 5000
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import time
+import numpy as np
+
+from ml.evaluation.drift_detector import DriftDetector
+
+
+def time_detect(detector: DriftDetector, current: np.ndarray, n_jobs: int, repeats: int) -> float:
+    """Best-of-N wall time for one detect_drift call"""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        detector.detect_drift(current, n_jobs=n_jobs)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drift detection speedup vs core count")
+    parser.add_argument('--features', type=int, default=256)
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+    
+    rng = np.random.default_rng(42)
+    reference = rng.normal(size=(args.rows, args.features))
+    current = rng.normal(0.1, 1.0, size=(args.rows, args.features))
+    
+    detector = DriftDetector(parallel_min_features=1)
+    detector.set_reference(reference)
+    
+    cores = os.cpu_count() or 1
+    job_counts = sorted({1, 2, 4, 8, cores} & set(range(1, cores + 1))) or [1]
+    
+    print(f"rows={args.rows} features={args.features} cores={cores}")
+    print(f"{'n_jobs':>6} {'seconds':>10} {'speedup':>8}")
+    
+    baseline = None
+    for n_jobs in job_counts:
+        elapsed = time_detect(detector, current, n_jobs, args.repeats)
+        baseline = baseline or elapsed
+        print(f"{n_jobs:>6} {elapsed:>10.3f} {baseline / elapsed:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Benchmark: online feature lookup latency with many stored entities
+
+Bulk-loads ``--entities`` rows into a scratch SQLite database (reporting
+ingest rows/sec), then times uncached point lookups, batched lookups and
+cache hits.
+
+Usage:
+    python benchmarks/bench_feature_store.py --entities 10000000
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import tempfile
+import time
+import numpy as np
+
+from ml.feature_store.feature_store import FeatureStore
+from shared.database import DatabaseManager
+
+LOAD_CHUNK = 100000
+
+
+def percentiles(timings) -> str:
+    """p50/p99 of a list of seconds, in milliseconds"""
+    p50, p99 = np.percentile(np.array(timings) * 1000, [50, 99])
+    return f"p50={p50:.3f}ms p99={p99:.3f}ms"
+
+
+def load(store: FeatureStore, n_entities: int, n_features: int, rng: np.random.Generator):
+    """Bulk-write one row per entity through store_features_bulk"""
+    names = [f"f{i}" for i in range(n_features)]
+    start = time.perf_counter()
+    for offset in range(0, n_entities, LOAD_CHUNK):
+        values = rng.random((min(LOAD_CHUNK, n_entities - offset), n_features)).round(6)
+        ids = [f"entity_{offset + i}" for i in range(len(values))]
+        store.store_features_bulk(values, entity_ids=ids, feature_names=names)
+    elapsed = time.perf_counter() - start
+    print(f"loaded {n_entities} entities in {elapsed:.1f}s ({n_entities / elapsed:,.0f} rows/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Online feature store lookup latency")
+    parser.add_argument('--entities', type=int, default=10_000_000)
+    parser.add_argument('--features', type=int, default=8)
+    parser.add_argument('--lookups', type=int, default=10000)
+    parser.add_argument('--batch', type=int, default=100)
+    args = parser.parse_args()
+    
+    rng = np.random.default_rng(42)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, 'features.db'))
+        load(FeatureStore(db, cache_size=0), args.entities, args.features, rng)
+        ids = [f"entity_{i}" for i in rng.integers(0, args.entities, args.lookups)]
+        
+        uncached = FeatureStore(db, cache_size=0)
+        timings = []
+        for entity_id in ids:
+            start = time.perf_counter()
+            uncached.get_features(entity_id)
+            timings.append(time.perf_counter() - start)
+        print(f"get_features (uncached)       {percentiles(timings)}")
+        
+        timings = []
+        for offset in range(0, len(ids), args.batch):
+            start = time.perf_counter()
+            uncached.get_features_many(ids[offset:offset + args.batch])
+            timings.append(time.perf_counter() - start)
+        print(f"get_features_many x{args.batch:<8}  {percentiles(timings)} per batch")
+        
+        cached = FeatureStore(db, cache_size=args.lookups)
+        cached.get_features_many(ids)
+        timings = []
+        for entity_id in ids:
+            start = time.perf_counter()
+            cached.get_features(entity_id)
+            timings.append(time.perf_counter() - start)
+        print(f"get_features (cached)         {percentiles(timings)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""Benchmark: training time, inference latency and accuracy per model family
+
+Models are round-tripped through the artifact format, so latency is what
+the prediction service sees.
+
+Usage:
+    python benchmarks/bench_model_families.py --rows 20000 --features 8
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import tempfile
+import time
+import numpy as np
+from sklearn.datasets import make_classification
+from sklearn.model_selection import train_test_split
+
+from ml.training.model_families import MODEL_FAMILIES, load_artifact, save_artifact
+
+BATCH_SIZES = (1, 10, 100, 1000)
+
+
+def median_latency(family, model, X: np.ndarray, batch_size: int, repeats: int) -> float:
+    """Median seconds per predict_proba call on one batch"""
+    batch = X[:batch_size]
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        family.predict_proba(model, batch)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare model families on one dataset")
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--features', type=int, default=8)
+    parser.add_argument('--repeats', type=int, default=50)
+    parser.add_argument('--n-jobs', type=int, default=1)
+    args = parser.parse_args()
+    
+    X, y = make_classification(n_samples=args.rows, n_features=args.features,
+                               n_informative=max(2, args.features // 2), random_state=42)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    config = {'n_estimators': 100, 'max_depth': 10, 'random_state': 42}
+    
+    header = f"{'family':<22}{'train_s':>9}{'accuracy':>10}" + ''.join(f"{f'p50@{b}_ms':>13}" for b in BATCH_SIZES)
+    print(header)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, family in MODEL_FAMILIES.items():
+            if family.build is None:
+                continue
+            
+            start = time.perf_counter()
+            model = family.build(config, args.n_jobs)
+            family.fit(model, X_train, y_train)
+            train_time = time.perf_counter() - start
+            
+            path = os.path.join(tmp, f'{name}.pkl')
+            save_artifact(model, name, path)
+            served, served_family = load_artifact(path)
+            
+            proba = served_family.predict_proba(served, X_test)
+            accuracy = np.mean(served.classes_[np.argmax(proba, axis=1)] == y_test)
+            latencies = [median_latency(served_family, served, X_test, b, args.repeats) for b in BATCH_SIZES]
+            
+            print(f"{name:<22}{train_time:>9.2f}{accuracy:>10.4f}" +
+                  ''.join(f"{lat * 1000:>13.3f}" for lat in latencies))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Benchmark: point-in-time training set generation
+
+Writes a synthetic feature history into a scratch SQLite database and
+joins ``--labels`` label rows against it, reporting time and peak RSS.
+
+Usage:
+    python benchmarks/bench_offline_store.py --labels 1000000 --history 5000000
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import resource
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+from ml.feature_store.offline_store import OfflineFeatureStore
+from shared.database import DatabaseManager
+
+LOAD_CHUNK = 200000
+
+
+def load_history(db: DatabaseManager, n_rows: int, n_entities: int, n_features: int,
+                 rng: np.random.Generator):
+    """Insert random (entity, feature, value, time) rows"""
+    conn = db._get_connection()
+    cursor = conn.cursor()
+    for offset in range(0, n_rows, LOAD_CHUNK):
+        n = min(LOAD_CHUNK, n_rows - offset)
+        cursor.executemany("""
+            INSERT INTO feature_store (feature_name, feature_value, entity_id, feature_group, event_timestamp)
+            VALUES (?, ?, ?, 'default', ?)
+        """, zip(
+            (f"f{i}" for i in rng.integers(0, n_features, n)),
+            rng.random(n).tolist(),
+            (f"entity_{i}" for i in rng.integers(0, n_entities, n)),
+            rng.uniform(0, 86400 * 30, n).tolist()
+        ))
+    conn.commit()
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Point-in-time join throughput")
+    parser.add_argument('--labels', type=int, default=1_000_000)
+    parser.add_argument('--history', type=int, default=5_000_000)
+    parser.add_argument('--entities', type=int, default=100_000)
+    parser.add_argument('--features', type=int, default=10)
+    parser.add_argument('--chunk-size', type=int, default=100_000)
+    args = parser.parse_args()
+    
+    rng = np.random.default_rng(42)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, 'features.db'))
+        start = time.perf_counter()
+        load_history(db, args.history, args.entities, args.features, rng)
+        print(f"loaded {args.history} history rows in {time.perf_counter() - start:.1f}s")
+        
+        labels = pd.DataFrame({
+            'entity_id': [f"entity_{i}" for i in rng.integers(0, args.entities, args.labels)],
+            'event_timestamp': rng.uniform(0, 86400 * 30, args.labels),
+            'label': rng.integers(0, 2, args.labels)
+        })
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        
+        start = time.perf_counter()
+        result = OfflineFeatureStore(db).get_historical_features(labels, chunk_size=args.chunk_size)
+        elapsed = time.perf_counter() - start
+        rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        
+        filled = result[[f"f{i}" for i in range(args.features)]].notna().to_numpy().mean()
+        print(f"joined {args.labels} labels x {args.features} features in {elapsed:.1f}s "
+              f"({args.labels / elapsed:,.0f} labels/s), {filled:.1%} cells filled")
+        print(f"peak RSS {rss_after:.0f} MB (before join {rss_before:.0f} MB)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Benchmark: peak RSS of out-of-core training vs dataset size
+
+Run once per size, since peak RSS is per process:
+    python benchmarks/bench_out_of_core.py --rows 2000000 --budget-mb 256
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import resource
+import tempfile
+import time
+import numpy as np
+
+from ml.training.out_of_core import iter_npy_chunks, train_out_of_core
+
+
+def write_dataset(path: str, rows: int, features: int, chunk_rows: int = 100000):
+    """Write a synthetic classification dataset to .npy files chunk by chunk"""
+    rng = np.random.default_rng(0)
+    weights = rng.normal(size=features)
+    X = np.lib.format.open_memmap(os.path.join(path, 'X.npy'), mode='w+', dtype=np.float32, shape=(rows, features))
+    y = np.lib.format.open_memmap(os.path.join(path, 'y.npy'), mode='w+', dtype=np.int64, shape=(rows,))
+    for start in range(0, rows, chunk_rows):
+        chunk = rng.normal(size=(min(chunk_rows, rows - start), features)).astype(np.float32)
+        X[start:start + len(chunk)] = chunk
+        y[start:start + len(chunk)] = (chunk @ weights + rng.normal(size=len(chunk)) > 0)
+    X.flush()
+    y.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Out-of-core training peak memory")
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--features', type=int, default=20)
+    parser.add_argument('--budget-mb', type=float, default=256)
+    parser.add_argument('--max-bags', type=int, default=4)
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        write_dataset(tmp, args.rows, args.features)
+        baseline_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        
+        start = time.perf_counter()
+        _, metrics = train_out_of_core(
+            iter_npy_chunks(os.path.join(tmp, 'X.npy'), os.path.join(tmp, 'y.npy')),
+            os.path.join(tmp, 'work'),
+            memory_budget_mb=args.budget_mb, max_bags=args.max_bags
+        )
+        elapsed = time.perf_counter() - start
+        peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    
+    raw_mb = args.rows * args.features * 4 / 1e6
+    print(f"rows={args.rows} features={args.features} raw={raw_mb:.0f}MB budget={args.budget_mb}MB")
+    print(f"peak_rss={peak_mb:.0f}MB (after data generation: {baseline_mb:.0f}MB) "
+          f"time={elapsed:.1f}s accuracy={metrics['accuracy']:.4f} bags={metrics['bags']}")
+
+
+if __name__ == "__main__":
+    main()
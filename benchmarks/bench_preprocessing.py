@@ -0,0 +1,87 @@
+"""Benchmark: serve-time preprocessing cost per request batch
+
+Fits a ``Preprocessor`` on a synthetic mixed-type frame and times
+``transform`` on raw dict records at several batch sizes, against the
+per-value approach (a Python dict lookup per categorical cell, then
+``StandardScaler.transform``).
+
+Usage:
+    python benchmarks/bench_preprocessing.py --numeric 6 --categorical 4
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import StandardScaler
+
+from ml.training.preprocessing import Preprocessor
+
+
+def make_frame(n_rows: int, n_numeric: int, n_categorical: int, cardinality: int,
+               rng: np.random.Generator) -> pd.DataFrame:
+    """Random numeric and string-categorical columns"""
+    columns = {f"num_{i}": rng.normal(size=n_rows) for i in range(n_numeric)}
+    for i in range(n_categorical):
+        columns[f"cat_{i}"] = np.char.add('c', rng.integers(0, cardinality, n_rows).astype(str))
+    return pd.DataFrame(columns)
+
+
+def per_value_transform(records, preprocessor: Preprocessor, mappings, scaler: StandardScaler):
+    """Baseline: dict lookup per categorical value, row by row, then scale"""
+    rows = []
+    for record in records:
+        row = []
+        for name in preprocessor.columns:
+            value = record.get(name)
+            if name in mappings:
+                row.append(mappings[name].get(str(value), preprocessor.fill[name]))
+            else:
+                row.append(preprocessor.fill[name] if value is None else value)
+        rows.append(row)
+    return scaler.transform(np.array(rows, dtype=np.float64))
+
+
+def median_us(fn, repeats: int) -> float:
+    """Median wall time of ``fn`` in microseconds"""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings) * 1e6)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Preprocessing transform latency")
+    parser.add_argument('--numeric', type=int, default=6)
+    parser.add_argument('--categorical', type=int, default=4)
+    parser.add_argument('--cardinality', type=int, default=200)
+    parser.add_argument('--repeats', type=int, default=200)
+    args = parser.parse_args()
+    
+    rng = np.random.default_rng(42)
+    train = make_frame(50000, args.numeric, args.categorical, args.cardinality, rng)
+    preprocessor = Preprocessor.fit(train)
+    mappings = {name: {c: i for i, c in enumerate(categories)}
+                for name, categories in preprocessor.categorical.items()}
+    scaler = StandardScaler()
+    scaler.mean_, scaler.scale_ = preprocessor.mean, preprocessor.scale
+    scaler.n_features_in_ = len(preprocessor.columns)
+    
+    print(f"{'batch':>6} {'transform':>12} {'per-value':>12} {'rows/s':>12}")
+    for batch in (1, 10, 100, 1000):
+        records = make_frame(batch, args.numeric, args.categorical, args.cardinality, rng).to_dict('records')
+        assert np.allclose(preprocessor.transform(records),
+                           per_value_transform(records, preprocessor, mappings, scaler))
+        repeats = max(10, args.repeats // max(1, batch // 100))
+        fast = median_us(lambda: preprocessor.transform(records), repeats)
+        slow = median_us(lambda: per_value_transform(records, preprocessor, mappings, scaler), repeats)
+        print(f"{batch:>6} {fast:>10.0f}us {slow:>10.0f}us {batch / fast * 1e6:>12,.0f}")
+
+
+if __name__ == '__main__':
+    main()
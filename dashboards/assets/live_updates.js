@@ -0,0 +1,20 @@
+// Live dashboard updates: forwards server-sent change events from /events into
+// the hidden change-signal input, so Dash callbacks run only when data changed.
+// EventSource reconnects on its own; the server resends a full event on reconnect.
+(function () {
+    function connect() {
+        var input = document.getElementById('change-signal');
+        if (!input) {
+            setTimeout(connect, 200);  // layout not rendered yet
+            return;
+        }
+        // Set the value the way React expects so dcc.Input reports the change
+        var setValue = Object.getOwnPropertyDescriptor(HTMLInputElement.prototype, 'value').set;
+        var source = new EventSource('/events');
+        source.onmessage = function (event) {
+            setValue.call(input, event.data);
+            input.dispatchEvent(new Event('input', {bubbles: true}));
+        };
+    }
+    window.addEventListener('load', connect);
+})();
@@ -0,0 +1,240 @@
+"""Dashboard data layer: incrementally maintained aggregates shared by all callbacks"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import json
+import threading
+import time
+import numpy as np
+from collections import Counter, defaultdict, deque
+from flask import Response, stream_with_context
+from typing import Dict, Iterator
+
+from shared.database import DatabaseManager
+from shared.logger import setup_logger
+from shared.timeseries import lttb, minmax_downsample, pick_resolution, quantile_from_bins
+
+logger = setup_logger("dashboard_data")
+
+RECENT_PREDICTIONS = 5
+TABLES = ('predictions', 'drift_events', 'model_registry')
+
+
+class DashboardData:
+    """Dashboard aggregates computed once and read by every callback and viewer
+    
+    A single background thread polls every ``poll_interval`` seconds and
+    folds in only rows past a high-water-mark id per table (predictions,
+    drift events, registered models), so a poll costs the same whatever the
+    table size. Callbacks read the resulting snapshot from memory, so the
+    number of open dashboards does not reach the database. ``get`` refreshes
+    inline, once for all concurrent callers, when the snapshot is older than
+    ``ttl`` (before the poller starts, or if it stalls). ``event_stream``
+    pushes a message to each viewer only when a table's data changed.
+    """
+    
+    def __init__(self, db: DatabaseManager = None, poll_interval: float = 5.0, ttl: float = 15.0):
+        self.db = db or DatabaseManager()
+        self.poll_interval = poll_interval
+        self.ttl = ttl
+        self.lock = threading.Lock()  # one refresh at a time
+        self.marks = {'predictions': 0, 'drift_events': 0, 'model_registry': 0}
+        self.class_counts = Counter()
+        self.drift_count = 0
+        self.recent = deque(maxlen=RECENT_PREDICTIONS)  # newest first
+        self.models = []  # (model_version, accuracy) in registration order
+        self.version = 0  # bumped whenever the aggregates change
+        self.table_versions = {table: 0 for table in TABLES}
+        self.changed = threading.Condition()  # notified when table_versions move
+        self.refreshed_at = 0.0
+        self.snapshot = self._build_snapshot()
+        self.series_lock = threading.Lock()
+        self.series_cache = {}  # (span_seconds, max_points) -> (built_at, version, series)
+        self.running = False
+        self.thread = None
+    
+    def start(self):
+        """Start the background poller"""
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True, name="dashboard-poller")
+        self.thread.start()
+        logger.info(f"Dashboard poller started (every {self.poll_interval}s)")
+    
+    def stop(self):
+        """Stop the background poller"""
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=self.poll_interval + 1)
+    
+    def _run(self):
+        """Poll until stopped"""
+        while self.running:
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Dashboard poll failed: {e}")
+            time.sleep(self.poll_interval)
+    
+    def get(self) -> Dict:
+        """Current snapshot, refreshed first if older than the TTL"""
+        if time.time() - self.refreshed_at > self.ttl:
+            try:
+                self.refresh(max_age=self.ttl)
+            except Exception as e:
+                logger.error(f"Dashboard refresh failed: {e}")
+        return self.snapshot
+    
+    def refresh(self, max_age: float = None) -> bool:
+        """Fold new rows into the aggregates; returns True if anything changed
+        
+        With ``max_age``, skips the poll if another caller refreshed within it.
+        """
+        with self.lock:
+            if max_age is not None and time.time() - self.refreshed_at <= max_age:
+                return False
+            changed_tables = self._poll()
+            self.refreshed_at = time.time()
+            if changed_tables:
+                self.version += 1
+            self.snapshot = self._build_snapshot()
+        if changed_tables:
+            with self.changed:
+                for table in changed_tables:
+                    self.table_versions[table] += 1
+                self.changed.notify_all()
+        return bool(changed_tables)
+    
+    def _poll(self) -> list:
+        """Read rows past each high-water mark and update running totals; returns changed tables"""
+        changed = []
+        
+        mark = self.marks['predictions']
+        max_id, counts = self.db.get_prediction_counts_since(mark)
+        if counts:
+            # Bounded by max_id: rows logged since the count are left for the next poll
+            recent = self.db.get_predictions_after(mark, RECENT_PREDICTIONS, max_id)
+            self.class_counts.update(counts)
+            self.recent.extendleft(reversed(recent))
+            self.marks['predictions'] = max_id
+            changed.append('predictions')
+        
+        max_id, detected = self.db.get_drift_counts_since(self.marks['drift_events'])
+        if max_id > self.marks['drift_events']:
+            self.drift_count += detected
+            self.marks['drift_events'] = max_id
+            changed.append('drift_events')
+        
+        models = self.db.get_models_since(self.marks['model_registry'])
+        if models:
+            self.models.extend((m['model_version'], (m['metrics'] or {}).get('accuracy', 0)) for m in models)
+            self.marks['model_registry'] = models[-1]['id']
+            changed.append('model_registry')
+        
+        return changed
+    
+    def _build_snapshot(self) -> Dict:
+        """Copy of the aggregates handed to callbacks"""
+        return {
+            'version': self.version,
+            'updated_at': self.refreshed_at,
+            'total_predictions': sum(self.class_counts.values()),
+            'class_counts': dict(self.class_counts),
+            'drift_count': self.drift_count,
+            'model_count': len(self.models),
+            'models': list(self.models),
+            'latest_accuracy': self.models[-1][1] if self.models else None,
+            'current_model': self.models[-1][0] if self.models else None,
+            'recent_predictions': list(self.recent)
+        }
+    
+    def event_stream(self, heartbeat: float = 15.0) -> Iterator[str]:
+        """Server-sent events for one viewer
+        
+        The first message lists every table; after that a message is sent
+        only when tables changed (or the stale flag flipped), naming them, so
+        the browser re-renders just the affected panels. Waiting viewers
+        block on a condition and cost no CPU; a comment every ``heartbeat``
+        seconds keeps proxies from closing the connection.
+        """
+        seen, stale = None, None
+        while True:
+            with self.changed:
+                self.changed.wait_for(lambda: self.table_versions != seen, timeout=heartbeat)
+                versions = dict(self.table_versions)
+            is_stale = self.is_stale()
+            changed = [table for table in TABLES if seen is None or versions[table] != seen[table]]
+            if is_stale != stale:
+                changed.append('status')
+            seen, stale = versions, is_stale
+            if changed:
+                yield f"data: {json.dumps({'changed': changed, 'versions': versions, 'stale': is_stale})}\n\n"
+            else:
+                yield ": keep-alive\n\n"
+    
+    def is_stale(self) -> bool:
+        """Whether the snapshot is older than the TTL (database unreachable)"""
+        return time.time() - self.refreshed_at > self.ttl
+    
+    def get_series(self, span_seconds: float, max_points: int = 300) -> Dict:
+        """Time-series charts for the last ``span_seconds``, cached until data changes or one poll interval
+        
+        Reads the finest rollup that covers the span in a bounded number of
+        buckets, then downsamples each series to ``max_points``: LTTB for
+        volume and confidence, min/max for latency and drift so spikes stay
+        visible. Each series is ``{'x': epoch seconds, 'y': values}``.
+        """
+        key = (span_seconds, max_points)
+        with self.series_lock:
+            cached = self.series_cache.get(key)
+            if cached is not None and cached[1] == self.version and time.time() - cached[0] < self.poll_interval:
+                return cached[2]
+            version = self.version
+            series = self._build_series(span_seconds, max_points)
+            self.series_cache[key] = (time.time(), version, series)
+            return series
+    
+    def _build_series(self, span_seconds: float, max_points: int) -> Dict:
+        """Read one rollup's buckets and turn them into downsampled series"""
+        end = time.time()
+        resolution = pick_resolution(span_seconds)
+        columns = defaultdict(lambda: ([], [], []))  # metric -> (bucket_start, count, total)
+        latency_bins = defaultdict(dict)  # bucket_start -> {bin: count}
+        for bucket_start, metric, count, total, _ in self.db.get_metric_buckets(resolution, end - span_seconds, end):
+            if metric.startswith('latency_bin:'):
+                latency_bins[bucket_start][int(metric.split(':')[1])] = count
+            else:
+                x, counts, totals = columns[metric]
+                x.append(bucket_start)
+                counts.append(count)
+                totals.append(total)
+        
+        def pack(downsample, x, y):
+            x, y = downsample(np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64), max_points)
+            return {'x': x.tolist(), 'y': y.tolist()}
+        
+        series = {'resolution': resolution, 'volume': {}}
+        for metric, (x, counts, totals) in sorted(columns.items()):
+            counts, totals = np.asarray(counts), np.asarray(totals)
+            if metric.startswith('predictions:'):
+                per_minute = counts * 60 / resolution
+                series['volume'][int(metric.split(':')[1])] = pack(lttb, x, per_minute)
+            elif metric == 'confidence':
+                series['confidence'] = pack(lttb, x, totals / counts)
+            elif metric in ('drift_score', 'concept_psi'):
+                series[metric] = pack(minmax_downsample, x, totals / counts)
+        
+        buckets = sorted(latency_bins)
+        series['latency_p95'] = pack(minmax_downsample, buckets,
+                                     [quantile_from_bins(latency_bins[b], 0.95) for b in buckets])
+        return series
+
+
+def register_event_stream(server, data: DashboardData, heartbeat: float = 15.0):
+    """Serve ``data.event_stream`` at /events on a Flask server"""
+    @server.route('/events')
+    def dashboard_events():
+        return Response(stream_with_context(data.event_stream(heartbeat)), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
@@ -4,7 +4,7 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 import dash
-from dash import dcc, html
+from dash import ctx, dcc, html, no_update
 from dash.dependencies import Input, Output
 import plotly.graph_objs as go
 import pandas as pd
@@ -14,13 +14,33 @@ import json
 from shared.config import Config
 from shared.database import DatabaseManager
 from shared.logger import setup_logger
+from dashboards.data_layer import DashboardData, register_event_stream
 
 config = Config()
 logger = setup_logger("dashboard")
 db = DatabaseManager()
 
+# One poller feeds every callback and every open browser tab
+dashboard_data = DashboardData(db, config.dashboard.poll_interval, config.dashboard.cache_ttl)
+dashboard_data.start()
+
+# Tables each panel is drawn from; 'status' is the poller's stale flag
+PANEL_SOURCES = {
+    'stats': {'predictions', 'drift_events', 'model_registry'},
+    'prediction-chart': {'predictions'},
+    'model-chart': {'model_registry'},
+    'trends': {'predictions', 'drift_events'},
+    'recent-predictions': {'predictions'},
+    'system-info': {'predictions', 'drift_events', 'model_registry', 'status'},
+}
+
+# Chart ranges; wider ranges are read from coarser rollups
+TIME_RANGES = [("1h", 3600), ("24h", 86400), ("7d", 7 * 86400), ("30d", 30 * 86400)]
+CLASS_COLORS = ['#3498db', '#e74c3c', '#2ecc71', '#9b59b6']
+
 app = dash.Dash(__name__)
 app.title = "ML Pipeline Monitor"
+register_event_stream(app.server, dashboard_data)
 
 BASE_STYLE = """
 <style>
@@ -89,6 +109,27 @@ app.layout = html.Div([
                 ], style={'background': '#ecf0f1', 'padding': '20px', 'borderRadius': '10px', 'borderLeft': '4px solid #9b59b6', 'flex': 1}),
             ], style={'display': 'flex', 'gap': '20px', 'margin': '20px 0'}),
             
+            html.Div([
+                html.Div([
+                    html.H2("Trends", style={'fontSize': '18px', 'color': '#2c3e50', 'margin': 0, 'flex': 1}),
+                    dcc.RadioItems(
+                        id='time-range',
+                        options=[{'label': label, 'value': seconds} for label, seconds in TIME_RANGES],
+                        value=TIME_RANGES[1][1],
+                        inline=True,
+                        inputStyle={'marginLeft': '12px', 'marginRight': '4px'}
+                    ),
+                ], style={'display': 'flex', 'alignItems': 'center', 'marginBottom': '15px'}),
+                html.Div([
+                    dcc.Graph(id='volume-chart', config={'displayModeBar': False}, style={'height': '260px', 'flex': 1}),
+                    dcc.Graph(id='confidence-chart', config={'displayModeBar': False}, style={'height': '260px', 'flex': 1}),
+                ], style={'display': 'flex', 'gap': '20px'}),
+                html.Div([
+                    dcc.Graph(id='latency-chart', config={'displayModeBar': False}, style={'height': '260px', 'flex': 1}),
+                    dcc.Graph(id='drift-chart', config={'displayModeBar': False}, style={'height': '260px', 'flex': 1}),
+                ], style={'display': 'flex', 'gap': '20px'}),
+            ], style={'background': '#ecf0f1', 'padding': '20px', 'borderRadius': '10px', 'borderLeft': '4px solid #e67e22', 'margin': '20px 0'}),
+            
             html.Div([
                 html.Div([
                     html.H2("Recent Predictions", style={'fontSize': '18px', 'color': '#2c3e50', 'marginBottom': '15px'}),
@@ -104,42 +145,35 @@ app.layout = html.Div([
         ], style={'maxWidth': '1200px', 'margin': '30px auto', 'background': 'white', 'padding': '30px', 'borderRadius': '10px', 'boxShadow': '0 2px 10px rgba(0,0,0,0.1)'}),
     ], style={'background': '#f5f5f5', 'minHeight': '100vh', 'padding': '0'}),
     
-    dcc.Interval(id='interval-component', interval=5000, n_intervals=0),
+    # Set by assets/live_updates.js from the /events stream; names the tables that changed
+    dcc.Input(id='change-signal', type='text', value='', style={'display': 'none'}),
     
 ], style={'fontFamily': 'Arial, sans-serif', 'margin': 0})
 
 
+def unchanged(signal: str, panel: str) -> bool:
+    """Whether a change event leaves the panel's data untouched (the first render always draws)"""
+    if not signal:
+        return False
+    return not set(json.loads(signal)['changed']) & PANEL_SOURCES[panel]
+
+
 @app.callback(
     [Output('total-predictions', 'children'),
      Output('drift-events', 'children'),
      Output('retraining-count', 'children'),
      Output('model-accuracy', 'children')],
-    [Input('interval-component', 'n_intervals')]
+    [Input('change-signal', 'value')]
 )
-def update_stats(n):
+def update_stats(signal):
+    if unchanged(signal, 'stats'):
+        return no_update, no_update, no_update, no_update
     try:
-        conn = db._get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT COUNT(*) FROM predictions")
-        total_preds = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM drift_events WHERE drift_detected = true")
-        drift_count = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM model_registry")
-        model_count = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT metrics FROM model_registry ORDER BY timestamp DESC LIMIT 1")
-        result = cursor.fetchone()
-        if result:
-            metrics = json.loads(result[0]) if isinstance(result[0], str) else result[0]
-            accuracy = f"{metrics.get('accuracy', 0):.2%}"
-        else:
-            accuracy = "N/A"
-        
-        conn.close()
-        return f"{total_preds:,}", str(drift_count), str(model_count), accuracy
+        stats = dashboard_data.get()
+        accuracy = stats['latest_accuracy']
+        accuracy = f"{accuracy:.2%}" if accuracy is not None else "N/A"
+        return (f"{stats['total_predictions']:,}", str(stats['drift_count']),
+                str(stats['model_count']), accuracy)
         
     except Exception as e:
         logger.error(f"Stats error: {e}")
@@ -148,15 +182,13 @@ def update_stats(n):
 
 @app.callback(
     Output('prediction-chart', 'figure'),
-    [Input('interval-component', 'n_intervals')]
+    [Input('change-signal', 'value')]
 )
-def update_prediction_chart(n):
+def update_prediction_chart(signal):
+    if unchanged(signal, 'prediction-chart'):
+        return no_update
     try:
-        conn = db._get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT prediction, COUNT(*) FROM predictions GROUP BY prediction")
-        rows = cursor.fetchall()
-        conn.close()
+        rows = sorted(dashboard_data.get()['class_counts'].items())
         
         if not rows:
             fig = go.Figure()
@@ -206,15 +238,13 @@ def update_prediction_chart(n):
 
 @app.callback(
     Output('model-chart', 'figure'),
-    [Input('interval-component', 'n_intervals')]
+    [Input('change-signal', 'value')]
 )
-def update_model_chart(n):
+def update_model_chart(signal):
+    if unchanged(signal, 'model-chart'):
+        return no_update
     try:
-        conn = db._get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT model_version, metrics FROM model_registry ORDER BY timestamp")
-        rows = cursor.fetchall()
-        conn.close()
+        rows = dashboard_data.get()['models']
         
         if not rows:
             fig = go.Figure()
@@ -237,10 +267,9 @@ def update_model_chart(n):
         versions = []
         accuracies = []
         
-        for i, row in enumerate(rows):
+        for i, (_, accuracy) in enumerate(rows):
             versions.append(f"v{i+1}")
-            metrics = json.loads(row[1]) if isinstance(row[1], str) else row[1]
-            accuracies.append(metrics.get('accuracy', 0))
+            accuracies.append(accuracy)
         
         fig = go.Figure(data=[go.Bar(
             x=versions,
@@ -267,29 +296,86 @@ def update_model_chart(n):
         return go.Figure()
 
 
+def time_series_figure(traces, title, y_title, y_format=None):
+    """Line chart of downsampled {'x': epoch seconds, 'y': values} series"""
+    fig = go.Figure()
+    for name, points, color in traces:
+        fig.add_trace(go.Scatter(
+            x=pd.to_datetime(points['x'], unit='s'),
+            y=points['y'],
+            mode='lines',
+            name=name,
+            line=dict(color=color, width=2)
+        ))
+    fig.update_layout(
+        title=dict(text=title, font=dict(size=14, color='#2c3e50')),
+        yaxis=dict(title=y_title, tickformat=y_format, rangemode='tozero'),
+        showlegend=len(traces) > 1,
+        legend=dict(orientation='h', y=1.15, x=1, xanchor='right'),
+        height=250,
+        margin=dict(t=40, b=30, l=50, r=20),
+        plot_bgcolor='white',
+        paper_bgcolor='#ecf0f1'
+    )
+    return fig
+
+
+@app.callback(
+    [Output('volume-chart', 'figure'),
+     Output('confidence-chart', 'figure'),
+     Output('latency-chart', 'figure'),
+     Output('drift-chart', 'figure')],
+    [Input('change-signal', 'value'),
+     Input('time-range', 'value')]
+)
+def update_time_series(signal, span_seconds):
+    if ctx.triggered_id == 'change-signal' and unchanged(signal, 'trends'):
+        return no_update, no_update, no_update, no_update
+    try:
+        series = dashboard_data.get_series(span_seconds)
+        empty = {'x': [], 'y': []}
+        volume = [
+            ('Regular' if c == 0 else 'High-Value' if c == 1 else f"Class {c}", points,
+             CLASS_COLORS[c % len(CLASS_COLORS)])
+            for c, points in sorted(series['volume'].items())
+        ]
+        drift = [('Data drift', series.get('drift_score', empty), '#e74c3c'),
+                 ('Concept PSI', series.get('concept_psi', empty), '#9b59b6')]
+        return (
+            time_series_figure(volume, "Predictions / minute", "per minute"),
+            time_series_figure([('Mean confidence', series.get('confidence', empty), '#2ecc71')],
+                               "Mean confidence", "confidence", '.0%'),
+            time_series_figure([('p95 latency', series['latency_p95'], '#e67e22')],
+                               "p95 inference latency", "ms"),
+            time_series_figure(drift, "Drift score", "score")
+        )
+    
+    except Exception as e:
+        logger.error(f"Time series error: {e}")
+        return go.Figure(), go.Figure(), go.Figure(), go.Figure()
+
+
 @app.callback(
     Output('recent-predictions', 'children'),
-    [Input('interval-component', 'n_intervals')]
+    [Input('change-signal', 'value')]
 )
-def update_recent_predictions(n):
+def update_recent_predictions(signal):
+    if unchanged(signal, 'recent-predictions'):
+        return no_update
     try:
-        conn = db._get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT prediction, probability, timestamp FROM predictions ORDER BY timestamp DESC LIMIT 5")
-        rows = cursor.fetchall()
-        conn.close()
+        rows = dashboard_data.get()['recent_predictions']
         
         if not rows:
             return html.Div("No predictions yet", style={'color': '#95a5a6', 'textAlign': 'center', 'padding': '20px'})
         
         table_rows = []
         for row in rows:
-            pred_label = 'High-Value' if row[0] == 1 else 'Regular'
-            pred_color = '#e74c3c' if row[0] == 1 else '#3498db'
+            pred_label = 'High-Value' if row['prediction'] == 1 else 'Regular'
+            pred_color = '#e74c3c' if row['prediction'] == 1 else '#3498db'
             table_rows.append(
                 html.Tr([
                     html.Td(pred_label, style={'padding': '10px', 'borderBottom': '1px solid #ddd', 'color': pred_color, 'fontWeight': 'bold'}),
-                    html.Td(f"{row[1]:.1%}", style={'padding': '10px', 'borderBottom': '1px solid #ddd'}),
+                    html.Td(f"{row['probability']:.1%}", style={'padding': '10px', 'borderBottom': '1px solid #ddd'}),
                 ])
             )
         
@@ -308,30 +394,25 @@ def update_recent_predictions(n):
 
 @app.callback(
     Output('system-info', 'children'),
-    [Input('interval-component', 'n_intervals')]
+    [Input('change-signal', 'value')]
 )
-def update_system_info(n):
+def update_system_info(signal):
+    if unchanged(signal, 'system-info'):
+        return no_update
     try:
-        conn = db._get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT COUNT(*) FROM predictions")
-        total_preds = cursor.fetchone()[0]
+        stats = dashboard_data.get()
+        current_model = stats['current_model'][:30] if stats['current_model'] else "None"
         
-        cursor.execute("SELECT model_version FROM model_registry ORDER BY timestamp DESC LIMIT 1")
-        result = cursor.fetchone()
-        current_model = result[0][:30] if result else "None"
-        
-        cursor.execute("SELECT COUNT(*) FROM drift_events WHERE drift_detected = true")
-        drift_count = cursor.fetchone()[0]
-        
-        conn.close()
+        if dashboard_data.is_stale():
+            db_status = ("Database Status", "Stale", "#e74c3c")
+        else:
+            db_status = ("Database Status", "Connected", "#2ecc71")
         
         info_items = [
-            ("Database Status", "Connected", "#2ecc71"),
+            db_status,
             ("Active Model", current_model, "#3498db"),
-            ("Total Predictions", f"{total_preds:,}", "#9b59b6"),
-            ("Drift Alerts", str(drift_count), "#e74c3c"),
+            ("Total Predictions", f"{stats['total_predictions']:,}", "#9b59b6"),
+            ("Drift Alerts", str(stats['drift_count']), "#e74c3c"),
         ]
         
         rows = []
@@ -6,47 +6,29 @@ sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
 import pandas as pd
 import numpy as np
 from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler, LabelEncoder
+from sklearn.preprocessing import StandardScaler
 
+from ml.feature_store.materialization import RFMMaterializer
 from ml.training.trainer import ModelTrainer
 from ml.evaluation.drift_detector import DriftDetector
 from shared.database import DatabaseManager
 
 
 def load_retail_data():
-    """Load and prepare retail dataset for customer classification"""
-    df = pd.read_csv('data/retail_data.csv')
-    print(f"Loaded: {df.shape[0]:,} transactions")
+    """Load and prepare retail dataset for customer classification
     
-    df = df.dropna(subset=['Customer ID'])
-    df = df[(df['Quantity'] > 0) & (df['Price'] > 0)]
-    df['InvoiceDate'] = pd.to_datetime(df['InvoiceDate'])
-    df['TotalAmount'] = df['Quantity'] * df['Price']
+    Customer features come from the feature store; new transactions in the
+    CSV are materialized first, updating only the customers they touch.
+    """
+    materializer = RFMMaterializer()
+    stats = materializer.materialize_csv('data/retail_data.csv')
+    print(f"Loaded: {stats['rows']:,} new transactions ({stats['customer_updates']:,} customer updates)")
     
-    reference_date = df['InvoiceDate'].max() + pd.Timedelta(days=1)
-    
-    customer_df = df.groupby('Customer ID').agg({
-        'InvoiceDate': lambda x: (reference_date - x.max()).days,
-        'Invoice': 'nunique',
-        'TotalAmount': 'sum',
-        'Quantity': 'sum',
-        'StockCode': 'nunique',
-        'Country': 'first'
-    }).reset_index()
-    
-    customer_df.columns = ['CustomerID', 'Recency', 'Frequency', 'Monetary', 
-                           'TotalItems', 'UniqueProducts', 'Country']
-    
-    customer_df['AvgOrderValue'] = customer_df['Monetary'] / customer_df['Frequency']
-    customer_df['AvgItemsPerOrder'] = customer_df['TotalItems'] / customer_df['Frequency']
-    customer_df['AvgItemPrice'] = customer_df['Monetary'] / customer_df['TotalItems']
+    customer_df = materializer.load_customer_features()
     
     monetary_threshold = customer_df['Monetary'].quantile(0.75)
     customer_df['HighValue'] = (customer_df['Monetary'] >= monetary_threshold).astype(int)
     
-    le = LabelEncoder()
-    customer_df['CountryEncoded'] = le.fit_transform(customer_df['Country'])
-    
     feature_cols = ['Recency', 'Frequency', 'TotalItems', 'UniqueProducts',
                    'AvgOrderValue', 'AvgItemsPerOrder', 'AvgItemPrice', 'CountryEncoded']
     
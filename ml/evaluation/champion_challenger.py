@@ -0,0 +1,113 @@
+"""Champion/challenger evaluation before deployment"""
+import sys
+import os
+# Add project root to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Tuple
+
+from shared.logger import setup_logger
+from ml.evaluation.concept_drift import confusion_metrics
+from ml.training.model_families import load_artifact
+
+logger = setup_logger("champion_challenger")
+
+
+def score_model(model, family, X: np.ndarray, y: np.ndarray) -> Dict:
+    """Holdout metrics from one predict_proba call and a bincount confusion matrix"""
+    proba = family.predict_proba(model, X)
+    classes = np.union1d(model.classes_, np.unique(y))
+    y_pred = np.searchsorted(classes, np.asarray(model.classes_)[np.argmax(proba, axis=1)])
+    y_true = np.searchsorted(classes, y)
+    
+    k = len(classes)
+    confusion = np.bincount(y_true * k + y_pred, minlength=k * k).reshape(k, k)
+    return confusion_metrics(confusion)
+
+
+class ChampionChallenger:
+    """Scores a new model against the production one on the same holdout
+    
+    Both models are evaluated concurrently. Scores are cached per
+    (model_version, holdout snapshot) in ``model_evaluations``, so comparing
+    against an unchanged champion on an unchanged holdout costs nothing and
+    the holdout is only loaded when some score is missing. A winning
+    challenger takes the production stage; a losing one is archived.
+    """
+    
+    def __init__(self, db, metric: str = 'f1_score', margin: float = 0.01):
+        self.db = db
+        self.metric = metric
+        self.margin = margin
+    
+    def _score(self, model_version: str, model_path: str, snapshot_id: str,
+               holdout: Tuple[np.ndarray, np.ndarray]) -> Dict:
+        """Load one artifact, score it and store the result"""
+        model, family = load_artifact(model_path)
+        metrics = score_model(model, family, *holdout)
+        self.db.save_model_evaluation(model_version, snapshot_id, metrics)
+        return metrics
+    
+    def evaluate(self, challenger_version: str, challenger_path: str, snapshot_id: str,
+                 load_holdout: Callable[[], Tuple[np.ndarray, np.ndarray]]) -> Dict:
+        """Score challenger and champion; deploy the challenger if it wins by ``margin``"""
+        registered = self.db.get_model(challenger_version)
+        champion = self.db.get_active_model(registered['model_name']) if registered else self.db.get_active_model()
+        candidates = {challenger_version: challenger_path}
+        if champion and champion['model_version'] != challenger_version and os.path.exists(champion['model_path']):
+            candidates[champion['model_version']] = champion['model_path']
+        
+        scores = {}
+        for version in candidates:
+            cached = self.db.get_model_evaluation(version, snapshot_id)
+            if cached is not None:
+                scores[version] = cached
+        
+        missing = [v for v in candidates if v not in scores]
+        if missing:
+            holdout = load_holdout()
+            if len(holdout[1]) == 0:
+                logger.warning(f"Empty holdout for {snapshot_id}; keeping {challenger_version} undeployed")
+                return {'promoted': False, 'reason': 'empty_holdout', 'scores': scores}
+            with ThreadPoolExecutor(max_workers=len(missing)) as executor:
+                futures = {
+                    v: executor.submit(self._score, v, candidates[v], snapshot_id, holdout)
+                    for v in missing
+                }
+                scores.update({v: f.result() for v, f in futures.items()})
+        logger.info(f"Evaluated on {snapshot_id}: {len(missing)} scored, "
+                    f"{len(candidates) - len(missing)} cached")
+        
+        challenger_score = scores[challenger_version][self.metric]
+        champion_version = champion['model_version'] if champion else None
+        champion_score = scores[champion_version][self.metric] if champion_version in scores else None
+        
+        if champion_version == challenger_version:
+            promoted, reason = False, 'already_deployed'
+        elif champion_score is None:
+            promoted, reason = True, 'no_champion'
+        elif challenger_score - champion_score >= self.margin:
+            promoted, reason = True, 'challenger_wins'
+        else:
+            promoted, reason = False, 'champion_holds'
+        
+        if promoted:
+            self.db.set_model_stage(challenger_version, 'production')
+            self.db.update_model_status(challenger_version, 'deployed')
+        elif reason == 'champion_holds':
+            self.db.set_model_stage(challenger_version, 'archived')
+            self.db.update_model_status(challenger_version, 'rejected')
+        
+        champion_text = 'n/a' if champion_score is None else f"{champion_score:.4f}"
+        logger.info(f"Champion/challenger ({self.metric}): {challenger_version}={challenger_score:.4f} "
+                    f"vs {champion_version}={champion_text} -> {reason}")
+        return {
+            'promoted': promoted,
+            'reason': reason,
+            'metric': self.metric,
+            'challenger': challenger_version,
+            'champion': champion_version,
+            'scores': scores
+        }
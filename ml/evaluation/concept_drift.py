@@ -0,0 +1,177 @@
+"""Concept drift: prediction output distribution and label-delayed performance"""
+import sys
+import os
+# Add project root to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+import time
+import numpy as np
+from typing import Dict, List, Tuple
+
+from shared.logger import setup_logger
+
+logger = setup_logger("concept_drift")
+
+
+def window_start(timestamp: float, window_seconds: int) -> int:
+    """Floor an epoch timestamp to the start of its window"""
+    epoch = int(timestamp)
+    return epoch - epoch % window_seconds
+
+
+def distribution_psi(reference_counts: np.ndarray, current_counts: np.ndarray) -> float:
+    """PSI between two already-binned count vectors"""
+    if reference_counts.sum() == 0 or current_counts.sum() == 0:
+        return 0.0
+    
+    ref_dist = reference_counts / reference_counts.sum()
+    curr_dist = current_counts / current_counts.sum()
+    
+    ref_dist = np.where(ref_dist == 0, 0.0001, ref_dist)
+    curr_dist = np.where(curr_dist == 0, 0.0001, curr_dist)
+    
+    return float(np.sum((curr_dist - ref_dist) * np.log(curr_dist / ref_dist)))
+
+
+def confusion_metrics(confusion: np.ndarray) -> Dict:
+    """Accuracy and weighted precision/recall/F1 from a (true x predicted) matrix"""
+    total = confusion.sum()
+    if total == 0:
+        return {'accuracy': None, 'precision': None, 'recall': None,
+                'f1_score': None, 'samples_count': 0}
+    
+    true_positive = np.diag(confusion).astype(float)
+    support = confusion.sum(axis=1)
+    predicted = confusion.sum(axis=0)
+    
+    precision = np.divide(true_positive, predicted, out=np.zeros_like(true_positive), where=predicted > 0)
+    recall = np.divide(true_positive, support, out=np.zeros_like(true_positive), where=support > 0)
+    denom = precision + recall
+    f1 = np.divide(2 * precision * recall, denom, out=np.zeros_like(true_positive), where=denom > 0)
+    weights = support / total
+    
+    return {
+        'accuracy': float(true_positive.sum() / total),
+        'precision': float(np.sum(precision * weights)),
+        'recall': float(np.sum(recall * weights)),
+        'f1_score': float(np.sum(f1 * weights)),
+        'samples_count': int(total)
+    }
+
+
+class OutputDistributionTracker:
+    """Bins served predictions into per-window class and confidence counts
+    
+    Holds no running totals: each batch's counts are returned and added to
+    the window's rows in the database, which is the only accumulator.
+    """
+    
+    def __init__(self, n_classes: int = 2, confidence_bins: int = 10, window_seconds: int = 3600):
+        self.n_classes = n_classes
+        self.confidence_bins = confidence_bins
+        self.window_seconds = window_seconds
+    
+    def update(self, predictions: np.ndarray, confidences: np.ndarray,
+               timestamp: float = None) -> Tuple[int, Dict[int, int], List[int]]:
+        """Bin a batch of predictions; returns the batch's (window, class counts, confidence counts)"""
+        window = window_start(timestamp or time.time(), self.window_seconds)
+        
+        predictions = np.asarray(predictions, dtype=np.int64)
+        class_batch = np.bincount(predictions, minlength=self.n_classes)
+        
+        bins = np.minimum((np.asarray(confidences) * self.confidence_bins).astype(np.int64),
+                          self.confidence_bins - 1)
+        confidence_batch = np.bincount(bins, minlength=self.confidence_bins)
+        
+        class_counts = {c: int(n) for c, n in enumerate(class_batch) if n}
+        return window, class_counts, confidence_batch.tolist()
+
+
+class ConceptDriftDetector:
+    """Detects concept drift from output distributions and labeled performance"""
+    
+    def __init__(self, psi_threshold: float = 0.2, accuracy_drop_threshold: float = 0.05,
+                 confidence_bins: int = 10, min_labeled_samples: int = 100):
+        self.psi_threshold = psi_threshold
+        self.accuracy_drop_threshold = accuracy_drop_threshold
+        self.confidence_bins = confidence_bins
+        self.min_labeled_samples = min_labeled_samples
+    
+    def output_drift(self, rows: List[Dict], current_since: int) -> Dict:
+        """Compare output distribution rows before/after ``current_since``"""
+        size = {'class': 0, 'confidence': self.confidence_bins}
+        for row in rows:
+            if row['kind'] == 'class':
+                size['class'] = max(size['class'], row['bucket'] + 1)
+        
+        counts = {
+            (period, kind): np.zeros(size[kind], dtype=np.int64)
+            for period in ('reference', 'current') for kind in ('class', 'confidence')
+        }
+        for row in rows:
+            period = 'current' if row['window_start'] >= current_since else 'reference'
+            counts[(period, row['kind'])][row['bucket']] += row['count']
+        
+        class_psi = distribution_psi(counts[('reference', 'class')], counts[('current', 'class')])
+        confidence_psi = distribution_psi(counts[('reference', 'confidence')],
+                                          counts[('current', 'confidence')])
+        
+        return {
+            'class_psi': class_psi,
+            'confidence_psi': confidence_psi,
+            'reference_samples': int(counts[('reference', 'class')].sum()),
+            'current_samples': int(counts[('current', 'class')].sum()),
+            'drift_detected': bool(max(class_psi, confidence_psi) > self.psi_threshold)
+        }
+    
+    def _confusion_by_window(self, rows: List[Dict]) -> Tuple[np.ndarray, np.ndarray]:
+        """Stack ``performance_confusion`` rows into a (window x true x predicted) array"""
+        n_labels = 1 + max(max(r['true_label'], r['predicted_label']) for r in rows)
+        windows, window_index = np.unique([r['window_start'] for r in rows], return_inverse=True)
+        
+        confusion = np.zeros((len(windows), n_labels, n_labels), dtype=np.int64)
+        np.add.at(
+            confusion,
+            (
+                window_index,
+                np.array([r['true_label'] for r in rows]),
+                np.array([r['predicted_label'] for r in rows])
+            ),
+            np.array([r['count'] for r in rows])
+        )
+        return windows, confusion
+    
+    def rolling_performance(self, rows: List[Dict]) -> Dict[int, Dict]:
+        """Per-window metrics from ``performance_confusion`` rows"""
+        if not rows:
+            return {}
+        
+        windows, confusion = self._confusion_by_window(rows)
+        return {int(w): confusion_metrics(confusion[i]) for i, w in enumerate(windows)}
+    
+    def performance_drift(self, rows: List[Dict], current_since: int) -> Dict:
+        """Compare labeled accuracy/F1 before/after ``current_since``
+        
+        Accuracy is only compared once both periods hold at least
+        ``min_labeled_samples`` labeled predictions.
+        """
+        if not rows:
+            empty = confusion_metrics(np.zeros((1, 1)))
+            return {'reference': empty, 'current': empty, 'windows': {}, 'drift_detected': False}
+        
+        windows, confusion = self._confusion_by_window(rows)
+        is_current = windows >= current_since
+        
+        reference = confusion_metrics(confusion[~is_current].sum(axis=0))
+        current = confusion_metrics(confusion[is_current].sum(axis=0))
+        
+        drift_detected = False
+        if min(reference['samples_count'], current['samples_count']) >= max(self.min_labeled_samples, 1):
+            drift_detected = reference['accuracy'] - current['accuracy'] > self.accuracy_drop_threshold
+        
+        return {
+            'reference': reference,
+            'current': current,
+            'windows': {int(w): confusion_metrics(confusion[i]) for i, w in enumerate(windows)},
+            'drift_detected': bool(drift_detected)
+        }
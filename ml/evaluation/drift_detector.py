@@ -7,17 +7,108 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../.
 import numpy as np
 from scipy import stats
 from typing import Dict, Tuple, List
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
 
 from shared.logger import setup_logger
 
 logger = setup_logger("drift_detector")
 
+
+def calculate_psi(reference: np.ndarray, current: np.ndarray, bins: int = 10) -> float:
+    """Calculate Population Stability Index"""
+    breakpoints = np.percentile(reference, np.linspace(0, 100, bins + 1))
+    breakpoints = np.unique(breakpoints)
+    
+    if len(breakpoints) < 2:
+        return 0.0
+    
+    ref_counts, _ = np.histogram(reference, bins=breakpoints)
+    curr_counts, _ = np.histogram(current, bins=breakpoints)
+    
+    ref_dist = ref_counts / len(reference)
+    curr_dist = curr_counts / len(current)
+    
+    ref_dist = np.where(ref_dist == 0, 0.0001, ref_dist)
+    curr_dist = np.where(curr_dist == 0, 0.0001, curr_dist)
+    
+    psi = np.sum((curr_dist - ref_dist) * np.log(curr_dist / ref_dist))
+    
+    return float(psi)
+
+
+def evaluate_features(reference: np.ndarray, current: np.ndarray,
+                      columns: List[int], threshold: float) -> Dict[int, Dict]:
+    """Run the per-feature drift tests for the given column indices"""
+    results = {}
+    
+    for i in columns:
+        # KS test
+        ks_stat, ks_pvalue = stats.ks_2samp(reference[:, i], current[:, i])
+        
+        # PSI
+        psi = calculate_psi(reference[:, i], current[:, i])
+        
+        # Mean shift
+        ref_mean = np.mean(reference[:, i])
+        curr_mean = np.mean(current[:, i])
+        ref_std = np.std(reference[:, i])
+        mean_shift = abs(curr_mean - ref_mean) / (ref_std + 1e-10)
+        
+        # Drift detected?
+        drift_detected = bool(
+            ks_pvalue < threshold or 
+            psi > 0.2 or 
+            mean_shift > 2.0
+        )
+        
+        results[i] = {
+            'ks_statistic': float(ks_stat),
+            'ks_pvalue': float(ks_pvalue),
+            'psi': float(psi),
+            'mean_shift': float(mean_shift),
+            'drift_detected': drift_detected
+        }
+    
+    return results
+
+
+def _evaluate_shared_chunk(ref_spec: Tuple, curr_spec: Tuple,
+                           columns: List[int], threshold: float) -> Dict[int, Dict]:
+    """Process pool task: attach to shared memory blocks and evaluate a column chunk"""
+    ref_name, ref_shape, ref_dtype = ref_spec
+    curr_name, curr_shape, curr_dtype = curr_spec
+    ref_shm = shared_memory.SharedMemory(name=ref_name)
+    curr_shm = shared_memory.SharedMemory(name=curr_name)
+    reference = np.ndarray(ref_shape, dtype=ref_dtype, buffer=ref_shm.buf)
+    current = np.ndarray(curr_shape, dtype=curr_dtype, buffer=curr_shm.buf)
+    try:
+        return evaluate_features(reference, current, columns, threshold)
+    finally:
+        # Views must be released before the blocks can be closed
+        del reference, current
+        ref_shm.close()
+        curr_shm.close()
+
+
+def _to_shared(data: np.ndarray) -> Tuple[shared_memory.SharedMemory, Tuple]:
+    """Copy an array into a new shared memory block"""
+    data = np.ascontiguousarray(data)
+    shm = shared_memory.SharedMemory(create=True, size=max(data.nbytes, 1))
+    view = np.ndarray(data.shape, dtype=data.dtype, buffer=shm.buf)
+    view[:] = data
+    del view
+    return shm, (shm.name, data.shape, data.dtype.str)
+
 class DriftDetector:
     """Detects data drift using statistical tests"""
     
-    def __init__(self, threshold: float = 0.05, window_size: int = 1000):
+    def __init__(self, threshold: float = 0.05, window_size: int = 1000,
+                 n_jobs: int = 1, parallel_min_features: int = 32):
         self.threshold = threshold
         self.window_size = window_size
+        self.n_jobs = n_jobs
+        self.parallel_min_features = parallel_min_features
         self.reference_data = None
         self.feature_names = None
         
@@ -27,8 +118,12 @@ class DriftDetector:
         self.feature_names = feature_names or [f'feature_{i}' for i in range(data.shape[1])]
         logger.info(f"Reference data set: {data.shape}")
         
-    def detect_drift(self, current_data: np.ndarray) -> Tuple[bool, Dict]:
-        """Detect drift using multiple methods"""
+    def detect_drift(self, current_data: np.ndarray, n_jobs: int = None) -> Tuple[bool, Dict]:
+        """Detect drift using multiple methods
+        
+        With ``n_jobs > 1`` and at least ``parallel_min_features`` columns, the
+        feature columns are split into chunks evaluated on a process pool.
+        """
         if self.reference_data is None:
             raise ValueError("Reference data not set")
             
@@ -38,46 +133,25 @@ class DriftDetector:
             'summary': {}
         }
         
+        n_jobs = self.n_jobs if n_jobs is None else n_jobs
+        n_features = current_data.shape[1]
+        
+        if n_jobs > 1 and n_features >= self.parallel_min_features:
+            feature_results = self._evaluate_parallel(current_data, n_jobs)
+        else:
+            feature_results = evaluate_features(
+                self.reference_data, current_data, range(n_features), self.threshold
+            )
+        
         drift_count = 0
         
-        for i in range(current_data.shape[1]):
+        for i in range(n_features):
             feature_name = self.feature_names[i]
             
-            # KS test
-            ks_stat, ks_pvalue = stats.ks_2samp(
-                self.reference_data[:, i],
-                current_data[:, i]
-            )
-            
-            # PSI
-            psi = self._calculate_psi(
-                self.reference_data[:, i],
-                current_data[:, i]
-            )
-            
-            # Mean shift
-            ref_mean = np.mean(self.reference_data[:, i])
-            curr_mean = np.mean(current_data[:, i])
-            ref_std = np.std(self.reference_data[:, i])
-            mean_shift = abs(curr_mean - ref_mean) / (ref_std + 1e-10)
-            
-            # Drift detected?
-            drift_detected = (
-                ks_pvalue < self.threshold or 
-                psi > 0.2 or 
-                mean_shift > 2.0
-            )
-            
-            if drift_detected:
+            if feature_results[i]['drift_detected']:
                 drift_count += 1
                 
-            results['features'][feature_name] = {
-                'ks_statistic': float(ks_stat),
-                'ks_pvalue': float(ks_pvalue),
-                'psi': float(psi),
-                'mean_shift': float(mean_shift),
-                'drift_detected': drift_detected
-            }
+            results['features'][feature_name] = feature_results[i]
         
         # Overall drift
         results['overall_drift'] = drift_count > (len(self.feature_names) * 0.2)
@@ -88,24 +162,33 @@ class DriftDetector:
         }
         
         return results['overall_drift'], results
+    
+    def _evaluate_parallel(self, current_data: np.ndarray, n_jobs: int) -> Dict[int, Dict]:
+        """Evaluate feature chunks on a process pool over shared memory"""
+        n_features = current_data.shape[1]
+        chunks = [c.tolist() for c in np.array_split(np.arange(n_features), n_jobs) if len(c)]
         
-    def _calculate_psi(self, reference: np.ndarray, current: np.ndarray, bins: int = 10) -> float:
-        """Calculate Population Stability Index"""
-        breakpoints = np.percentile(reference, np.linspace(0, 100, bins + 1))
-        breakpoints = np.unique(breakpoints)
-        
-        if len(breakpoints) < 2:
-            return 0.0
-        
-        ref_counts, _ = np.histogram(reference, bins=breakpoints)
-        curr_counts, _ = np.histogram(current, bins=breakpoints)
-        
-        ref_dist = ref_counts / len(reference)
-        curr_dist = curr_counts / len(current)
+        # Share both matrices once instead of pickling columns into every task
+        ref_shm, ref_spec = _to_shared(self.reference_data)
+        curr_shm, curr_spec = _to_shared(current_data)
         
-        ref_dist = np.where(ref_dist == 0, 0.0001, ref_dist)
-        curr_dist = np.where(curr_dist == 0, 0.0001, curr_dist)
+        feature_results = {}
+        try:
+            with ProcessPoolExecutor(max_workers=len(chunks)) as executor:
+                futures = [
+                    executor.submit(_evaluate_shared_chunk, ref_spec, curr_spec, chunk, self.threshold)
+                    for chunk in chunks
+                ]
+                for future in futures:
+                    feature_results.update(future.result())
+        finally:
+            for shm in (ref_shm, curr_shm):
+                shm.close()
+                shm.unlink()
         
-        psi = np.sum((curr_dist - ref_dist) * np.log(curr_dist / ref_dist))
+        logger.debug(f"Evaluated {n_features} features in {len(chunks)} parallel chunks")
+        return feature_results
         
-        return psi
+    def _calculate_psi(self, reference: np.ndarray, current: np.ndarray, bins: int = 10) -> float:
+        """Calculate Population Stability Index"""
+        return calculate_psi(reference, current, bins)
@@ -0,0 +1,178 @@
+"""Cohort-aware drift detection over a segmentation column"""
+import sys
+import os
+# Add project root to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+import numpy as np
+from scipy import stats
+from typing import Dict, List, Tuple, Union
+
+from shared.logger import setup_logger
+
+logger = setup_logger("segmented_drift")
+
+
+def _segment_label(value) -> str:
+    """Readable, JSON-safe label for a segment value"""
+    return f"{value:g}" if isinstance(value, (float, np.floating)) else str(value)
+
+
+class SegmentedDriftDetector:
+    """Detects drift per segment of a declared cohort column
+    
+    Reference profiles (per-segment histograms over global quantile bins, plus
+    per-segment means and standard deviations) are built once. Every check then
+    evaluates all segments and features together with group-by bincounts; KS
+    statistics are computed on the binned CDFs.
+    """
+    
+    def __init__(self, segment_column: Union[int, str], threshold: float = 0.05,
+                 bins: int = 10, min_segment_samples: int = 30):
+        self.segment_column = segment_column
+        self.threshold = threshold
+        self.bins = bins
+        self.min_segment_samples = min_segment_samples
+        self.feature_names = None
+        self.segment_name = None
+        self._segment_index = None
+        self.segment_values = None
+        self.breakpoints = None
+        self.reference_counts = None
+        self.reference_sizes = None
+        self.reference_mean = None
+        self.reference_std = None
+    
+    def _split(self, data: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Separate the segment column from the analysed features"""
+        return data[:, self._segment_index], np.delete(data, self._segment_index, axis=1)
+    
+    def set_reference(self, data: np.ndarray, feature_names: List[str] = None):
+        """Build per-segment reference profiles"""
+        names = feature_names or [f'feature_{i}' for i in range(data.shape[1])]
+        if isinstance(self.segment_column, str):
+            self._segment_index = names.index(self.segment_column)
+        else:
+            self._segment_index = int(self.segment_column)
+        self.segment_name = names[self._segment_index]
+        self.feature_names = [n for i, n in enumerate(names) if i != self._segment_index]
+        
+        segments, features = self._split(data)
+        self.segment_values, codes = np.unique(segments, return_inverse=True)
+        
+        # Global quantile breakpoints keep every segment on the same bins
+        self.breakpoints = np.percentile(features, np.linspace(0, 100, self.bins + 1), axis=0).T
+        
+        n_segments = len(self.segment_values)
+        self.reference_counts, self.reference_sizes, self.reference_mean, self.reference_std = \
+            self._profile(features, codes, n_segments)
+        
+        logger.info(f"Segment reference set on '{self.segment_name}': "
+                    f"{n_segments} segments, {len(self.feature_names)} features")
+    
+    def _bin(self, features: np.ndarray) -> np.ndarray:
+        """Map each value to its feature's quantile bin"""
+        binned = np.empty(features.shape, dtype=np.int64)
+        for f in range(features.shape[1]):
+            binned[:, f] = np.searchsorted(self.breakpoints[f, 1:-1], features[:, f], side='right')
+        return binned
+    
+    def _profile(self, features: np.ndarray, codes: np.ndarray, n_segments: int):
+        """Histogram counts (S, F, B), sizes (S,), means and stds (S, F) by segment"""
+        n_features = features.shape[1]
+        binned = self._bin(features)
+        
+        flat = ((codes[:, None] * n_features + np.arange(n_features)[None, :]) * self.bins + binned).ravel()
+        counts = np.bincount(flat, minlength=n_segments * n_features * self.bins)
+        counts = counts.reshape(n_segments, n_features, self.bins)
+        
+        sizes = np.bincount(codes, minlength=n_segments)
+        cell = (codes[:, None] * n_features + np.arange(n_features)[None, :]).ravel()
+        sums = np.bincount(cell, weights=features.ravel(), minlength=n_segments * n_features)
+        sq_sums = np.bincount(cell, weights=(features ** 2).ravel(), minlength=n_segments * n_features)
+        
+        safe_sizes = np.maximum(sizes, 1)[:, None]
+        mean = sums.reshape(n_segments, n_features) / safe_sizes
+        var = sq_sums.reshape(n_segments, n_features) / safe_sizes - mean ** 2
+        return counts, sizes, mean, np.sqrt(np.maximum(var, 0.0))
+    
+    def detect_drift(self, current_data: np.ndarray) -> Tuple[bool, Dict]:
+        """Detect drift for every segment in one pass"""
+        if self.reference_counts is None:
+            raise ValueError("Reference data not set")
+        
+        segments, features = self._split(current_data)
+        
+        # Map current segment values onto reference segment codes
+        positions = np.searchsorted(self.segment_values, segments)
+        positions = np.minimum(positions, len(self.segment_values) - 1)
+        known = self.segment_values[positions] == segments
+        
+        n_segments = len(self.segment_values)
+        counts, sizes, mean, _ = self._profile(features[known], positions[known], n_segments)
+        
+        ref_sizes = self.reference_sizes[:, None, None]
+        curr_sizes = sizes[:, None, None]
+        ref_dist = self.reference_counts / np.maximum(ref_sizes, 1)
+        curr_dist = counts / np.maximum(curr_sizes, 1)
+        
+        # KS on binned CDFs
+        ks_stat = np.abs(np.cumsum(ref_dist, axis=2) - np.cumsum(curr_dist, axis=2)).max(axis=2)
+        n_eff = np.sqrt(self.reference_sizes * sizes / np.maximum(self.reference_sizes + sizes, 1))
+        ks_pvalue = stats.kstwobign.sf(ks_stat * n_eff[:, None])
+        
+        # PSI
+        ref_dist = np.where(ref_dist == 0, 0.0001, ref_dist)
+        curr_dist = np.where(curr_dist == 0, 0.0001, curr_dist)
+        psi = np.sum((curr_dist - ref_dist) * np.log(curr_dist / ref_dist), axis=2)
+        
+        # Mean shift
+        mean_shift = np.abs(mean - self.reference_mean) / (self.reference_std + 1e-10)
+        
+        drifted = (ks_pvalue < self.threshold) | (psi > 0.2) | (mean_shift > 2.0)
+        evaluated = (sizes >= self.min_segment_samples) & (self.reference_sizes >= self.min_segment_samples)
+        drifted &= evaluated[:, None]
+        
+        drift_counts = drifted.sum(axis=1)
+        segment_drift = drift_counts > len(self.feature_names) * 0.2
+        
+        results = {
+            'segment_column': self.segment_name,
+            'segments': {},
+            'unseen_segments': {},
+            'summary': {}
+        }
+        
+        for s in np.flatnonzero(evaluated):
+            label = _segment_label(self.segment_values[s])
+            results['segments'][label] = {
+                'samples': int(sizes[s]),
+                'reference_samples': int(self.reference_sizes[s]),
+                'drift_detected': bool(segment_drift[s]),
+                'drift_score': float(drift_counts[s] / len(self.feature_names)),
+                'features': {
+                    name: {
+                        'ks_statistic': float(ks_stat[s, f]),
+                        'ks_pvalue': float(ks_pvalue[s, f]),
+                        'psi': float(psi[s, f]),
+                        'mean_shift': float(mean_shift[s, f]),
+                        'drift_detected': bool(drifted[s, f])
+                    }
+                    for f, name in enumerate(self.feature_names)
+                }
+            }
+        
+        unseen_values, unseen_counts = np.unique(segments[~known], return_counts=True)
+        results['unseen_segments'] = {
+            _segment_label(v): int(c) for v, c in zip(unseen_values, unseen_counts)
+        }
+        
+        drifting = [label for label, seg in results['segments'].items() if seg['drift_detected']]
+        results['summary'] = {
+            'total_segments': n_segments,
+            'evaluated_segments': int(evaluated.sum()),
+            'segments_with_drift': len(drifting),
+            'drifting_segments': drifting
+        }
+        
+        return bool(drifting), results
@@ -4,46 +4,171 @@ import os
 # Add project root to Python path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
+import itertools
+import threading
+import time
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
+from typing import Dict, List
+
+from ml.feature_store.offline_store import to_epoch_seconds
+from shared.config import Config
 from shared.database import DatabaseManager
 from shared.logger import setup_logger
 
 logger = setup_logger("feature_store")
+config = Config()
+
+class FeatureCache:
+    """Thread-safe LRU cache of feature rows with a time-to-live"""
+    
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key):
+        """Cached value, or None if missing or expired"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[1] < time.time():
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+    
+    def put(self, key, value):
+        """Insert or refresh a value, evicting the least recently used"""
+        if self.max_size <= 0:
+            return
+        with self.lock:
+            self.entries[key] = (value, time.time() + self.ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+    
+    def invalidate(self, key):
+        """Drop a key so the next read goes to the database"""
+        with self.lock:
+            self.entries.pop(key, None)
 
 class FeatureStore:
-    """Manages feature storage and retrieval"""
+    """Manages feature storage and retrieval
+    
+    Every write is appended to ``feature_store`` (the history) and merged,
+    in the same transaction, into ``online_features``, which keeps one packed row with the latest
+    value of each feature per (entity_id, feature_group). Reads only touch
+    the online table, by primary key, behind an in-process LRU cache.
+    Writes from other processes are picked up once the cached row expires.
+    """
+    
+    def __init__(self, db: DatabaseManager = None, cache_size: int = None, cache_ttl: float = None):
+        self.db = db or DatabaseManager()
+        self.cache = FeatureCache(
+            config.feature_store.cache_size if cache_size is None else cache_size,
+            config.feature_store.cache_ttl if cache_ttl is None else cache_ttl
+        )
     
-    def __init__(self):
-        self.db = DatabaseManager()
+    def store_features(self, entity_id: str, features: dict, feature_group: str = "default",
+                       timestamp: float = None):
+        """Store features for an entity, observed at ``timestamp`` (epoch seconds, default now)"""
+        timestamp = time.time() if timestamp is None else timestamp
+        self.db.write_features(
+            [(name, value, entity_id, feature_group, timestamp) for name, value in features.items()],
+            [(entity_id, feature_group, features, timestamp)]
+        )
+        self.cache.invalidate((entity_id, feature_group))
+        logger.debug(f"Stored {len(features)} features for entity {entity_id}")
+    
+    def store_features_bulk(self, rows, feature_group: str = "default", entity_ids=None,
+                            feature_names: List[str] = None, timestamps=None) -> Dict:
+        """Store many entities' features in one transaction; returns ingest stats
         
-    def store_features(self, entity_id: str, features: dict, feature_group: str = "default"):
-        """Store features for an entity"""
-        conn = self.db._get_connection()
-        cursor = conn.cursor()
+        ``rows`` is a DataFrame with an ``entity_id`` column, an optional
+        ``event_timestamp`` column (epoch seconds or datetimes) and one column
+        per feature, or a 2-D array with ``entity_ids`` and ``feature_names``
+        given separately. ``timestamps`` defaults to now.
+        """
+        start = time.perf_counter()
+        if isinstance(rows, pd.DataFrame):
+            entity_ids = rows['entity_id'] if entity_ids is None else entity_ids
+            if timestamps is None and 'event_timestamp' in rows:
+                timestamps = to_epoch_seconds(rows['event_timestamp'])
+            feature_names = feature_names or [c for c in rows.columns if c not in ('entity_id', 'event_timestamp')]
+            values = rows[feature_names].to_numpy(dtype=np.float64)
+        else:
+            values = np.asarray(rows, dtype=np.float64)
+            if entity_ids is None or feature_names is None:
+                raise ValueError("entity_ids and feature_names are required for array input")
         
-        for feature_name, feature_value in features.items():
-            cursor.execute("""
-                INSERT INTO feature_store (feature_name, feature_value, entity_id, feature_group)
-                VALUES (?, ?, ?, ?)
-            """, (feature_name, feature_value, entity_id, feature_group))
+        entity_ids = np.asarray(entity_ids).astype(str)
+        n_rows, n_features = values.shape
+        if len(entity_ids) != n_rows or len(feature_names) != n_features:
+            raise ValueError(f"Got {len(entity_ids)} entity ids and {len(feature_names)} names "
+                             f"for a {n_rows}x{n_features} feature matrix")
+        timestamps = np.broadcast_to(
+            np.asarray(time.time() if timestamps is None else timestamps, dtype=np.float64), (n_rows,)
+        )
         
-        conn.commit()
-        conn.close()
-        logger.debug(f"Stored {len(features)} features for entity {entity_id}")
+        # Long-format history, row-major so each entity's features stay together
+        history = zip(
+            np.tile(np.asarray(feature_names, dtype=object), n_rows).tolist(),
+            values.ravel().tolist(),
+            np.repeat(entity_ids, n_features).tolist(),
+            itertools.repeat(feature_group),
+            np.repeat(timestamps, n_features).tolist()
+        )
+        # One online row per entity: its latest row in this batch
+        order = np.lexsort((np.arange(n_rows), timestamps, entity_ids))
+        last = order[np.r_[entity_ids[order][1:] != entity_ids[order][:-1], True]] if n_rows else order
+        online = [
+            (entity_ids[i], feature_group, dict(zip(feature_names, values[i].tolist())), float(timestamps[i]))
+            for i in last
+        ]
+        
+        self.db.write_features(history, online)
+        for entity_id, _, _, _ in online:
+            self.cache.invalidate((entity_id, feature_group))
         
+        elapsed = time.perf_counter() - start
+        stats = {
+            'rows': n_rows,
+            'entities': len(online),
+            'values': n_rows * n_features,
+            'seconds': elapsed,
+            'rows_per_sec': n_rows / elapsed if elapsed > 0 else float('inf')
+        }
+        logger.info(f"Stored {n_rows} rows x {n_features} features for {len(online)} entities "
+                    f"in {elapsed:.2f}s ({stats['rows_per_sec']:,.0f} rows/s)")
+        return stats
+    
     def get_features(self, entity_id: str, feature_group: str = "default") -> dict:
         """Retrieve features for an entity"""
-        conn = self.db._get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT feature_name, feature_value 
-            FROM feature_store 
-            WHERE entity_id = ? AND feature_group = ?
-            ORDER BY timestamp DESC
-        """, (entity_id, feature_group))
+        return self.get_features_many([entity_id], feature_group)[entity_id]
+    
+    def get_features_many(self, entity_ids: List[str], feature_group: str = "default") -> Dict[str, dict]:
+        """Latest features for many entities; cache misses are fetched in one batched query
         
-        rows = cursor.fetchall()
-        conn.close()
+        Entities with no stored features map to an empty dict.
+        """
+        result = {}
+        missing = []
+        for entity_id in entity_ids:
+            cached = self.cache.get((entity_id, feature_group))
+            if cached is None:
+                missing.append(entity_id)
+            else:
+                result[entity_id] = dict(cached)
         
-        features = {row[0]: row[1] for row in rows}
-        return features
+        if missing:
+            found = self.db.get_online_features(missing, feature_group)
+            for entity_id in missing:
+                features = found.get(entity_id, {})
+                self.cache.put((entity_id, feature_group), features)
+                result[entity_id] = dict(features)
+        return result
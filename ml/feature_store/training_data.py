@@ -0,0 +1,235 @@
+"""Durable, deduplicated training data with versioned snapshots"""
+import sys
+import os
+# Add project root to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+import json
+import time
+import numpy as np
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from shared.logger import setup_logger
+
+logger = setup_logger("training_data")
+
+_FNV_OFFSET = np.uint64(0xcbf29ce484222325)
+_MIX_1 = np.uint64(0xff51afd7ed558ccd)
+_MIX_2 = np.uint64(0xc4ceb9fe1a85ec53)
+
+
+def _mix(h: np.ndarray) -> np.ndarray:
+    """64-bit avalanche (murmur3 finalizer)"""
+    h ^= h >> np.uint64(33)
+    h *= _MIX_1
+    h ^= h >> np.uint64(33)
+    h *= _MIX_2
+    h ^= h >> np.uint64(33)
+    return h
+
+
+def row_hashes(X: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Content hash of each (features, label) row, computed column by column"""
+    bits = np.ascontiguousarray(X, dtype=np.float64).view(np.uint64)
+    h = np.full(len(X), _FNV_OFFSET, dtype=np.uint64)
+    for f in range(bits.shape[1]):
+        h = _mix(h ^ bits[:, f])
+    return _mix(h ^ np.asarray(y).astype(np.int64).view(np.uint64))
+
+
+class TrainingDataStore:
+    """Append-only store of labeled rows in immutable .npy shards
+    
+    Each shard holds column-major features, labels, per-row timestamps and
+    row hashes. ``manifest.json`` lists every shard with its row count and
+    time range, so a time window is resolved from the manifest and only the
+    overlapping shards are opened. Snapshots pin a list of shards plus a
+    window, which makes them reproducible because shards never change.
+    Shards record the preprocessor version their features came from, and a
+    snapshot only spans shards of one version. Rows whose hash is divisible by ``holdout_every`` form a fixed holdout
+    split that is never trained on. Assumes a single writer (the retraining
+    worker).
+    """
+    
+    def __init__(self, root: str = "data/training", holdout_every: int = 10):
+        if holdout_every < 2:
+            # 0 would divide by zero, 1 would hold out every row
+            raise ValueError(f"holdout_every must be at least 2, got {holdout_every}")
+        self.root = root
+        self.holdout_every = holdout_every
+        self.shard_dir = os.path.join(root, 'shards')
+        self.manifest_path = os.path.join(root, 'manifest.json')
+        os.makedirs(self.shard_dir, exist_ok=True)
+        self.manifest = self._read_manifest()
+        self._hashes = None
+    
+    def _read_manifest(self) -> Dict:
+        """Load the manifest, or start an empty one"""
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                return json.load(f)
+        return {'next_shard': 0, 'next_snapshot': 0, 'shards': [], 'snapshots': {}}
+    
+    def _write_manifest(self):
+        """Atomically replace the manifest"""
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+    
+    def _shard_path(self, shard_id: str, column: str) -> str:
+        """File holding one column of a shard"""
+        return os.path.join(self.shard_dir, f'{shard_id}_{column}.npy')
+    
+    def _known_hashes(self) -> np.ndarray:
+        """Sorted hashes of every stored row, loaded on first use"""
+        if self._hashes is None:
+            parts = [np.load(self._shard_path(s['id'], 'hash')) for s in self.manifest['shards']]
+            self._hashes = np.sort(np.concatenate(parts)) if parts else np.empty(0, dtype=np.uint64)
+        return self._hashes
+    
+    def append(self, X: np.ndarray, y: np.ndarray, timestamps: np.ndarray = None,
+               preprocessor: str = None) -> int:
+        """Store new rows as one shard, skipping rows already stored; returns rows added
+        
+        ``preprocessor`` is the version of the preprocessor the features were
+        produced with.
+        """
+        X = np.asarray(X, dtype=np.float64)
+        y = np.asarray(y)
+        if timestamps is None:
+            timestamps = np.full(len(X), time.time())
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        
+        hashes = row_hashes(X, y)
+        _, first = np.unique(hashes, return_index=True)
+        first.sort()
+        
+        known = self._known_hashes()
+        if len(known):
+            positions = np.minimum(np.searchsorted(known, hashes[first]), len(known) - 1)
+            first = first[known[positions] != hashes[first]]
+        
+        skipped = len(X) - len(first)
+        if len(first) == 0:
+            logger.info(f"All {skipped} rows already stored")
+            return 0
+        
+        shard_id = f"shard_{self.manifest['next_shard']:06d}"
+        columns = {
+            'X': np.asfortranarray(X[first]),
+            'y': y[first],
+            'ts': timestamps[first],
+            'hash': hashes[first]
+        }
+        # Shard files first, manifest last: a crash leaves at most an unlisted shard
+        for column, values in columns.items():
+            np.save(self._shard_path(shard_id, column), values)
+        
+        self.manifest['shards'].append({
+            'id': shard_id,
+            'rows': int(len(first)),
+            'n_features': int(X.shape[1]),
+            'min_ts': float(columns['ts'].min()),
+            'max_ts': float(columns['ts'].max()),
+            'preprocessor': preprocessor,
+            'created': time.time()
+        })
+        self.manifest['next_shard'] += 1
+        self._write_manifest()
+        self._hashes = np.sort(np.concatenate([known, columns['hash']]))
+        
+        logger.info(f"Stored {len(first)} rows in {shard_id} ({skipped} duplicates skipped)")
+        return int(len(first))
+    
+    def _select_shards(self, start: Optional[float], end: Optional[float],
+                       after_shard: Optional[str] = None) -> List[Dict]:
+        """Shards whose time range overlaps [start, end), from the manifest alone"""
+        return [
+            s for s in self.manifest['shards']
+            if (start is None or s['max_ts'] >= start)
+            and (end is None or s['min_ts'] < end)
+            and (after_shard is None or s['id'] > after_shard)
+        ]
+    
+    def create_snapshot(self, start: float = None, end: float = None,
+                        after_shard: str = None) -> Optional[str]:
+        """Pin the shards covering a time window; returns the snapshot id, or None if empty
+        
+        ``after_shard`` limits the snapshot to shards written after it, i.e.
+        to data that arrived since an earlier snapshot. A snapshot never mixes
+        feature spaces: it only holds shards produced with the preprocessor of
+        the newest selected shard, recorded as its ``preprocessor``. An
+        identical existing snapshot is reused, so its id stays a stable cache
+        key.
+        """
+        shards = self._select_shards(start, end, after_shard)
+        if not shards:
+            return None
+        preprocessor = shards[-1].get('preprocessor')
+        shards = [s for s in shards if s.get('preprocessor') == preprocessor]
+        
+        shard_ids = [s['id'] for s in shards]
+        for snapshot_id, snapshot in self.manifest['snapshots'].items():
+            if snapshot['shards'] == shard_ids and snapshot['start'] == start and snapshot['end'] == end:
+                return snapshot_id
+        
+        snapshot_id = f"snap_{self.manifest['next_snapshot']:06d}"
+        self.manifest['snapshots'][snapshot_id] = {
+            'shards': shard_ids,
+            'start': start,
+            'end': end,
+            'rows': sum(s['rows'] for s in shards),  # upper bound; edge shards are filtered on read
+            'preprocessor': preprocessor,
+            'created': time.time()
+        }
+        self.manifest['next_snapshot'] += 1
+        self._write_manifest()
+        logger.info(f"Snapshot {snapshot_id}: {len(shards)} shards")
+        return snapshot_id
+    
+    def get_snapshot(self, snapshot_id: str) -> Dict:
+        """Snapshot metadata"""
+        if snapshot_id not in self.manifest['snapshots']:
+            raise KeyError(f"Unknown snapshot: {snapshot_id}")
+        return self.manifest['snapshots'][snapshot_id]
+    
+    def iter_snapshot(self, snapshot_id: str, split: str = None) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """Yield (X, y, shard_index) per shard, filtered to the snapshot window
+        
+        ``split`` is None for all rows, 'train' or 'holdout'.
+        """
+        if split not in (None, 'train', 'holdout'):
+            raise ValueError(f"Unknown split: {split}")
+        snapshot = self.get_snapshot(snapshot_id)
+        start, end = snapshot['start'], snapshot['end']
+        
+        for index, shard_id in enumerate(snapshot['shards']):
+            X = np.load(self._shard_path(shard_id, 'X'), mmap_mode='r')
+            y = np.load(self._shard_path(shard_id, 'y'))
+            ts = np.load(self._shard_path(shard_id, 'ts'))
+            
+            mask = np.ones(len(ts), dtype=bool)
+            if start is not None:
+                mask &= ts >= start
+            if end is not None:
+                mask &= ts < end
+            if split is not None:
+                hashes = np.load(self._shard_path(shard_id, 'hash'))
+                in_holdout = hashes % np.uint64(self.holdout_every) == 0
+                mask &= in_holdout if split == 'holdout' else ~in_holdout
+            if mask.any():
+                rows = np.flatnonzero(mask)
+                yield np.asarray(X[rows]), y[rows], np.full(len(rows), index)
+    
+    def load_snapshot(self, snapshot_id: str, split: str = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Materialize a snapshot as (X, y, shard_index) arrays"""
+        parts = list(self.iter_snapshot(snapshot_id, split))
+        if not parts:
+            return np.empty((0, 0)), np.empty(0), np.empty(0, dtype=np.int64)
+        X, y, index = zip(*parts)
+        return np.vstack(X), np.concatenate(y), np.concatenate(index)
+    
+    def latest_shard(self) -> Optional[str]:
+        """Id of the newest shard"""
+        return self.manifest['shards'][-1]['id'] if self.manifest['shards'] else None
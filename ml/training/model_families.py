@@ -0,0 +1,220 @@
+"""Model families: how each kind of model is built, served and stored"""
+import sys
+import os
+# Add project root to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+import joblib
+import numpy as np
+from dataclasses import dataclass
+from datetime import datetime
+from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+from sklearn.tree import DecisionTreeClassifier
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from ml.training.preprocessing import Preprocessor
+from registry.artifact_store import ArtifactStore, is_stored_artifact, load_stored_artifact
+from shared.logger import setup_logger
+
+logger = setup_logger("model_families")
+
+ARTIFACT_FORMAT = 2
+DEFAULT_FAMILY = 'random_forest'
+
+
+def _fit(model, X: np.ndarray, y: np.ndarray, sample_weight: np.ndarray = None):
+    """Fit an sklearn-style estimator"""
+    if sample_weight is None:
+        return model.fit(X, y)
+    return model.fit(X, y, sample_weight=sample_weight)
+
+
+def _predict_proba(model, X: np.ndarray) -> np.ndarray:
+    """Class probabilities from an sklearn-style estimator"""
+    return model.predict_proba(X)
+
+
+def _identity(model):
+    """Store or load the estimator object as-is"""
+    return model
+
+
+@dataclass
+class ModelFamily:
+    """Hooks for one kind of model
+    
+    ``build(config, n_jobs)`` returns an unfitted estimator, or is None for
+    families produced by a dedicated training path. ``serialize`` turns a
+    fitted model into the payload stored in the artifact, ``deserialize``
+    turns it back into something ``predict_proba`` accepts.
+    """
+    name: str
+    build: Optional[Callable[[Dict, int], Any]] = None
+    fit: Callable = _fit
+    predict_proba: Callable[[Any, np.ndarray], np.ndarray] = _predict_proba
+    serialize: Callable[[Any], Any] = _identity
+    deserialize: Callable[[Any], Any] = _identity
+    supports_oob: bool = False
+
+
+class LinearScorer:
+    """Standardized logistic regression scored with plain numpy
+    
+    Skips sklearn's per-call validation, which dominates latency for the
+    small batches the prediction service sees.
+    """
+    
+    def __init__(self, mean: np.ndarray, scale: np.ndarray, coef: np.ndarray,
+                 intercept: np.ndarray, classes: np.ndarray):
+        # Fold the scaler into the weights: (x - m) / s @ w = x @ (w / s) - m / s @ w
+        self.coef = (coef / scale).T
+        self.intercept = intercept - (mean / scale) @ coef.T
+        self.classes_ = classes
+    
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Logistic or softmax probabilities"""
+        scores = np.asarray(X, dtype=float) @ self.coef + self.intercept
+        if scores.shape[1] == 1:
+            positive = 1.0 / (1.0 + np.exp(-scores[:, 0]))
+            return np.column_stack([1.0 - positive, positive])
+        scores -= scores.max(axis=1, keepdims=True)
+        exp = np.exp(scores)
+        return exp / exp.sum(axis=1, keepdims=True)
+    
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Predict the most probable class"""
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def _serialize_linear(model) -> Dict:
+    """Keep only the scaler statistics and coefficients"""
+    if not hasattr(model, 'named_steps'):
+        return model  # e.g. a fold ensemble
+    scaler, clf = model.named_steps['standardscaler'], model.named_steps['logisticregression']
+    return {
+        'mean': scaler.mean_,
+        'scale': scaler.scale_,
+        'coef': clf.coef_,
+        'intercept': clf.intercept_,
+        'classes': clf.classes_
+    }
+
+
+def _deserialize_linear(payload) -> LinearScorer:
+    """Rebuild a numpy scorer from stored coefficients"""
+    if isinstance(payload, dict):
+        return LinearScorer(payload['mean'], payload['scale'], payload['coef'],
+                            payload['intercept'], payload['classes'])
+    return payload
+
+
+def _fit_pipeline(model, X: np.ndarray, y: np.ndarray, sample_weight: np.ndarray = None):
+    """Route sample weights to the final pipeline step"""
+    if sample_weight is None:
+        return model.fit(X, y)
+    return model.fit(X, y, logisticregression__sample_weight=sample_weight)
+
+
+MODEL_FAMILIES: Dict[str, ModelFamily] = {}
+
+
+def register_family(family: ModelFamily):
+    """Make a model family available to the trainer and the prediction service"""
+    MODEL_FAMILIES[family.name] = family
+
+
+def get_family(name: str) -> ModelFamily:
+    """Look up a registered model family"""
+    if name not in MODEL_FAMILIES:
+        raise ValueError(f"Unknown model family: {name} (available: {sorted(MODEL_FAMILIES)})")
+    return MODEL_FAMILIES[name]
+
+
+register_family(ModelFamily(
+    name='random_forest',
+    build=lambda config, n_jobs: RandomForestClassifier(
+        n_estimators=config.get('n_estimators', 100),
+        max_depth=config.get('max_depth', 10),
+        min_samples_split=config.get('min_samples_split', 2),
+        min_samples_leaf=config.get('min_samples_leaf', 1),
+        max_features=config.get('max_features', 'sqrt'),
+        random_state=config.get('random_state', 42),
+        n_jobs=n_jobs
+    ),
+    supports_oob=True
+))
+
+register_family(ModelFamily(
+    name='logistic_regression',
+    build=lambda config, n_jobs: make_pipeline(
+        StandardScaler(),
+        LogisticRegression(C=config.get('regularization_c', 1.0), max_iter=1000)
+    ),
+    fit=_fit_pipeline,
+    serialize=_serialize_linear,
+    deserialize=_deserialize_linear
+))
+
+register_family(ModelFamily(
+    name='hist_gbdt',
+    build=lambda config, n_jobs: HistGradientBoostingClassifier(
+        max_iter=config.get('n_estimators', 100),
+        max_depth=config.get('max_depth', 10),
+        random_state=config.get('random_state', 42)
+    )
+))
+
+register_family(ModelFamily(
+    name='decision_tree',
+    build=lambda config, n_jobs: DecisionTreeClassifier(
+        max_depth=config.get('max_depth', 10),
+        min_samples_split=config.get('min_samples_split', 2),
+        random_state=config.get('random_state', 42)
+    )
+))
+
+# Produced by ModelTrainer.train_out_of_core, not by build()
+register_family(ModelFamily(name='binned_bagging'))
+
+
+def save_artifact(model, family: str, path: str, **extra):
+    """Write a model artifact tagged with its family"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    joblib.dump({
+        'model': get_family(family).serialize(model),
+        'family': family,
+        'format': ARTIFACT_FORMAT,
+        'timestamp': datetime.now().isoformat(),
+        **extra
+    }, path)
+
+
+def store_artifact(model, family: str, store: ArtifactStore, **extra) -> str:
+    """Write a model artifact into a content-addressed store; returns the path to register
+    
+    Carries no timestamp, so retraining to an identical model stores nothing new.
+    """
+    return store.put({
+        'model': get_family(family).serialize(model),
+        'family': family,
+        'format': ARTIFACT_FORMAT,
+        **extra
+    })
+
+
+def load_artifact(path: str) -> Tuple[Any, ModelFamily]:
+    """Load a model artifact; untagged artifacts are random forests"""
+    model, family, _ = load_serving_artifact(path)
+    return model, family
+
+
+def load_serving_artifact(path: str) -> Tuple[Any, ModelFamily, Optional[Preprocessor]]:
+    """Load a model artifact with the preprocessor it was trained behind, if any"""
+    data = load_stored_artifact(path) if is_stored_artifact(path) else joblib.load(path)
+    family = get_family(data.get('family', DEFAULT_FAMILY))
+    spec = data.get('preprocessor')
+    preprocessor = Preprocessor.from_dict(spec) if spec else None
+    return family.deserialize(data['model']), family, preprocessor
@@ -0,0 +1,220 @@
+"""Out-of-core training on datasets larger than memory"""
+import sys
+import os
+# Add project root to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+import glob
+import shutil
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import HistGradientBoostingClassifier
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from shared.logger import setup_logger
+from ml.evaluation.concept_drift import confusion_metrics
+
+logger = setup_logger("out_of_core")
+
+N_BINS = 255
+
+
+def iter_csv_chunks(path: str, target_column: str, chunk_rows: int = 50000) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """Stream (X, y) chunks of numeric columns from a CSV file"""
+    for chunk in pd.read_csv(path, chunksize=chunk_rows):
+        y = chunk.pop(target_column).to_numpy()
+        yield chunk.select_dtypes('number').to_numpy(dtype=np.float32), y
+
+
+def iter_npy_chunks(X_path: str, y_path: str, chunk_rows: int = 50000) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """Stream (X, y) chunks from memory-mapped .npy files"""
+    X = np.load(X_path, mmap_mode='r')
+    y = np.load(y_path, mmap_mode='r')
+    for start in range(0, len(X), chunk_rows):
+        yield np.asarray(X[start:start + chunk_rows], dtype=np.float32), np.asarray(y[start:start + chunk_rows])
+
+
+class BinnedDataset:
+    """uint8-binned feature matrix and labels stored as memory-mapped .npy files
+    
+    Built in two streaming passes so only one source chunk is ever resident:
+    the first spills float32 shards to disk while reservoir-sampling rows for
+    the quantile bin edges; the second bins each shard into one uint8 memmap.
+    """
+    
+    def __init__(self, work_dir: str, sample_rows: int = 100000, random_state: int = 42):
+        self.work_dir = work_dir
+        self.sample_rows = sample_rows
+        self.rng = np.random.default_rng(random_state)
+        self.bin_edges = None
+        self.classes = None
+        self.X = None
+        self.y = None
+    
+    def build(self, chunks: Iterable[Tuple[np.ndarray, np.ndarray]]) -> 'BinnedDataset':
+        """Materialize the dataset from an iterator of (X, y) chunks"""
+        os.makedirs(self.work_dir, exist_ok=True)
+        shard_dir = os.path.join(self.work_dir, 'shards')
+        os.makedirs(shard_dir, exist_ok=True)
+        
+        reservoir = None
+        seen = 0
+        n_rows = 0
+        shards = []
+        classes = set()
+        
+        for i, (X_chunk, y_chunk) in enumerate(chunks):
+            X_chunk = np.asarray(X_chunk, dtype=np.float32)
+            shard = os.path.join(shard_dir, f'shard_{i:05d}')
+            np.save(shard + '_X.npy', X_chunk)
+            np.save(shard + '_y.npy', np.asarray(y_chunk))
+            shards.append(shard)
+            n_rows += len(X_chunk)
+            classes.update(np.unique(y_chunk).tolist())
+            
+            # Reservoir sample for bin edges (algorithm R, vectorized per chunk)
+            if reservoir is None:
+                reservoir = np.empty((self.sample_rows, X_chunk.shape[1]), dtype=np.float32)
+            take = min(max(self.sample_rows - seen, 0), len(X_chunk))
+            reservoir[seen:seen + take] = X_chunk[:take]
+            if take < len(X_chunk):
+                positions = seen + np.arange(take, len(X_chunk))
+                slots = (self.rng.random(len(positions)) * (positions + 1)).astype(np.int64)
+                keep = slots < self.sample_rows
+                reservoir[slots[keep]] = X_chunk[take:][keep]
+            seen += len(X_chunk)
+        
+        if not shards:
+            raise ValueError("No training data to build a dataset from")
+        
+        sample = reservoir[:min(seen, self.sample_rows)]
+        quantiles = np.linspace(0, 100, N_BINS + 1)[1:-1]
+        self.bin_edges = np.percentile(sample, quantiles, axis=0).T.astype(np.float32)
+        
+        n_features = sample.shape[1]
+        X_path = os.path.join(self.work_dir, 'X_binned.npy')
+        y_dtype = np.load(shards[0] + '_y.npy', mmap_mode='r').dtype
+        X_out = np.lib.format.open_memmap(X_path, mode='w+', dtype=np.uint8, shape=(n_rows, n_features))
+        y_out = np.lib.format.open_memmap(os.path.join(self.work_dir, 'y.npy'), mode='w+',
+                                          dtype=y_dtype, shape=(n_rows,))
+        
+        offset = 0
+        for shard in shards:
+            X_chunk = np.load(shard + '_X.npy', mmap_mode='r')
+            rows = len(X_chunk)
+            X_out[offset:offset + rows] = bin_features(X_chunk, self.bin_edges)
+            y_out[offset:offset + rows] = np.load(shard + '_y.npy')
+            offset += rows
+        X_out.flush()
+        y_out.flush()
+        del X_out, y_out
+        shutil.rmtree(shard_dir)
+        
+        self.X = np.load(X_path, mmap_mode='r')
+        self.y = np.load(os.path.join(self.work_dir, 'y.npy'), mmap_mode='r')
+        self.classes = np.array(sorted(classes))
+        logger.info(f"Binned dataset built: {self.X.shape}, {self.X.nbytes / 1e6:.1f} MB on disk")
+        return self
+    
+    def cleanup(self):
+        """Remove the on-disk dataset"""
+        self.X = self.y = None
+        for path in glob.glob(os.path.join(self.work_dir, '*.npy')):
+            os.remove(path)
+
+
+def bin_features(X: np.ndarray, bin_edges: np.ndarray) -> np.ndarray:
+    """Map raw values to uint8 bin codes with per-feature edges"""
+    binned = np.empty(X.shape, dtype=np.uint8)
+    for f in range(X.shape[1]):
+        binned[:, f] = np.searchsorted(bin_edges[f], X[:, f], side='right')
+    return binned
+
+
+class ChunkBaggingClassifier:
+    """Soft-voting ensemble of histogram GBDTs, each fitted on one memory-sized bag
+    
+    Stores the bin edges so raw features can be passed at inference time.
+    """
+    
+    def __init__(self, bin_edges: np.ndarray, estimators: List, classes: np.ndarray):
+        self.bin_edges = bin_edges
+        self.estimators = estimators
+        self.classes_ = classes
+    
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Average class probabilities across bags"""
+        binned = bin_features(np.asarray(X, dtype=np.float32), self.bin_edges)
+        return self.predict_proba_binned(binned)
+    
+    def predict_proba_binned(self, binned: np.ndarray) -> np.ndarray:
+        """Probabilities for already-binned features, aligned to ``classes_``"""
+        proba = np.zeros((len(binned), len(self.classes_)))
+        for est in self.estimators:
+            columns = np.searchsorted(self.classes_, est.classes_)
+            proba[:, columns] += est.predict_proba(binned)
+        return proba / len(self.estimators)
+    
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Predict the class with the highest averaged probability"""
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def rows_for_budget(n_features: int, memory_budget_mb: float) -> int:
+    """Rows per bag so one GBDT fit stays under the memory budget
+    
+    The GBDT copies a bag to float64 and keeps its own uint8 bins plus a few
+    float arrays per row (gradients, hessians, raw predictions); half the
+    budget is reserved for the process, the model and the memmap page cache.
+    """
+    bytes_per_row = n_features * (8 + 1 + 4) + 64
+    return max(1000, int(memory_budget_mb * 1024 * 1024 / 2 / bytes_per_row))
+
+
+def train_out_of_core(chunks: Iterable[Tuple[np.ndarray, np.ndarray]], work_dir: str,
+                      memory_budget_mb: float = 512, max_bags: int = 10, max_iter: int = 100,
+                      validation_fraction: float = 0.1, random_state: int = 42) -> Tuple[ChunkBaggingClassifier, Dict]:
+    """Build a binned memmap dataset from chunks and fit a bagged GBDT under a memory budget"""
+    dataset = BinnedDataset(work_dir, random_state=random_state).build(chunks)
+    rng = np.random.default_rng(random_state)
+    
+    try:
+        n_rows, n_features = dataset.X.shape
+        classes = dataset.classes
+        
+        # Every k-th row is held out, so no per-row index arrays are needed
+        val_every = max(2, int(round(1 / validation_fraction)))
+        n_train = n_rows - (n_rows + val_every - 1) // val_every
+        
+        bag_rows = min(rows_for_budget(n_features, memory_budget_mb), n_train)
+        n_bags = min(max_bags, max(1, int(np.ceil(n_train / bag_rows))))
+        logger.info(f"Out-of-core training: {n_rows} rows, {n_bags} bags of ~{bag_rows} rows")
+        
+        estimators = []
+        for b in range(n_bags):
+            # Sorted indices keep memmap reads sequential
+            bag = np.unique(rng.integers(0, n_rows, size=bag_rows))
+            bag = bag[bag % val_every != 0]
+            est = HistGradientBoostingClassifier(
+                max_iter=max_iter, max_bins=N_BINS, early_stopping=False, random_state=random_state + b
+            )
+            est.fit(np.asarray(dataset.X[bag]), np.asarray(dataset.y[bag]))
+            estimators.append(est)
+        
+        model = ChunkBaggingClassifier(dataset.bin_edges, estimators, classes)
+        
+        # Stream the validation rows through a confusion matrix
+        confusion = np.zeros((len(classes), len(classes)), dtype=np.int64)
+        block = bag_rows * val_every
+        for start in range(0, n_rows, block):
+            X_val = np.asarray(dataset.X[start:start + block:val_every])
+            y_val = np.asarray(dataset.y[start:start + block:val_every])
+            y_true = np.searchsorted(classes, y_val)
+            y_pred = np.argmax(model.predict_proba_binned(X_val), axis=1)
+            np.add.at(confusion, (y_true, y_pred), 1)
+        
+        metrics = confusion_metrics(confusion)
+        metrics.update({'samples_count': int(n_rows), 'bags': n_bags, 'bag_rows': int(bag_rows)})
+        return model, metrics
+    finally:
+        dataset.cleanup()
@@ -0,0 +1,121 @@
+"""Fitted preprocessing shipped inside model artifacts and applied at serve time"""
+import sys
+import os
+# Add project root to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+import hashlib
+import json
+import numpy as np
+import pandas as pd
+from typing import Dict, List
+
+from shared.logger import setup_logger
+
+logger = setup_logger("preprocessing")
+
+PREPROCESSOR_FORMAT = 1
+
+
+class Preprocessor:
+    """Missing-value fill, label encoding and standard scaling as one transform
+    
+    Fitting matches the original client-side steps: median/mode fill,
+    ``LabelEncoder`` codes (sorted categories) and a ``StandardScaler`` over
+    every column. Each categorical column is served from its sorted category
+    array and a lookup table holding the already-scaled value of every code,
+    plus a last slot for unseen or missing values (the mode's value), so
+    encoding a batch is one ``searchsorted`` and one gather with no per-value
+    dict lookups. Numeric columns are scaled together with one vectorized
+    expression. ``version`` is a content hash of the fitted parameters.
+    """
+    
+    def __init__(self, columns: List[str], categorical: Dict[str, List[str]],
+                 fill: Dict[str, float], mean: List[float], scale: List[float]):
+        self.columns = list(columns)
+        self.categorical = {name: list(categories) for name, categories in categorical.items()}
+        self.fill = dict(fill)
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        
+        positions = {name: i for i, name in enumerate(self.columns)}
+        self.numeric_columns = [c for c in self.columns if c not in self.categorical]
+        self.numeric_index = np.array([positions[c] for c in self.numeric_columns], dtype=np.intp)
+        fill_values = np.array([self.fill[c] for c in self.numeric_columns])
+        self.numeric_fill = (fill_values - self.mean[self.numeric_index]) / self.scale[self.numeric_index]
+        self.lookup = {}
+        for name, categories in self.categorical.items():
+            i = positions[name]
+            codes = np.append(np.arange(len(categories)), self.fill[name])
+            self.lookup[name] = (i, np.array(categories, dtype=str), (codes - self.mean[i]) / self.scale[i])
+        self.version = self._content_hash()
+    
+    @classmethod
+    def fit(cls, df: pd.DataFrame) -> 'Preprocessor':
+        """Learn fill values, categories and scaling from a training frame"""
+        categorical, fill = {}, {}
+        encoded = np.empty(df.shape, dtype=np.float64)
+        for i, name in enumerate(df.columns):
+            column = df[name]
+            if pd.api.types.is_numeric_dtype(column) and not pd.api.types.is_bool_dtype(column):
+                fill[name] = float(column.median())
+                encoded[:, i] = column.fillna(fill[name]).to_numpy(dtype=np.float64)
+            else:
+                values = column.fillna(column.mode()[0]).astype(str)
+                categories, codes = np.unique(values.to_numpy(), return_inverse=True)
+                categorical[name] = categories.tolist()
+                fill[name] = float(np.searchsorted(categories, str(column.mode()[0])))
+                encoded[:, i] = codes
+        
+        mean = encoded.mean(axis=0)
+        scale = encoded.std(axis=0)
+        scale[scale == 0] = 1.0  # as StandardScaler
+        preprocessor = cls(list(df.columns), categorical, fill, mean, scale)
+        logger.info(f"Fitted preprocessor {preprocessor.version}: {len(df.columns)} columns, "
+                    f"{len(categorical)} categorical")
+        return preprocessor
+    
+    def transform(self, data) -> np.ndarray:
+        """Raw rows (DataFrame, list of dicts or 2-D list in column order) to model input"""
+        if isinstance(data, pd.DataFrame):
+            columns = {name: data[name].to_numpy() for name in self.columns}
+        elif len(data) and isinstance(data[0], dict):
+            columns = {name: [record.get(name) for record in data] for name in self.columns}
+        else:
+            rows = np.asarray(data, dtype=object).reshape(len(data), -1)
+            columns = {name: rows[:, i] for i, name in enumerate(self.columns)}
+        
+        out = np.empty((len(data), len(self.columns)), dtype=np.float64)
+        if len(self.numeric_index):
+            numeric = np.array([columns[name] for name in self.numeric_columns], dtype=np.float64).T
+            scaled = (numeric - self.mean[self.numeric_index]) / self.scale[self.numeric_index]
+            out[:, self.numeric_index] = np.where(np.isnan(scaled), self.numeric_fill, scaled)
+        for name, (i, categories, table) in self.lookup.items():
+            values = np.asarray(columns[name]).astype(str)
+            codes = np.minimum(np.searchsorted(categories, values), len(categories) - 1)
+            known = categories[codes] == values
+            out[:, i] = table[np.where(known, codes, len(categories))]
+        return out
+    
+    def to_dict(self) -> Dict:
+        """JSON-serializable fitted state"""
+        return {
+            'format': PREPROCESSOR_FORMAT,
+            'columns': self.columns,
+            'categorical': self.categorical,
+            'fill': self.fill,
+            'mean': self.mean.tolist(),
+            'scale': self.scale.tolist()
+        }
+    
+    @classmethod
+    def from_dict(cls, spec: Dict) -> 'Preprocessor':
+        """Rebuild from ``to_dict`` output"""
+        if spec.get('format') != PREPROCESSOR_FORMAT:
+            raise ValueError(f"Unsupported preprocessor format: {spec.get('format')}")
+        return cls(spec['columns'], spec['categorical'], spec['fill'], spec['mean'], spec['scale'])
+    
+    def _content_hash(self) -> str:
+        """Short hash identifying the fitted parameters"""
+        payload = json.dumps(self.to_dict(), sort_keys=True).encode()
+        return hashlib.sha256(payload).hexdigest()[:12]
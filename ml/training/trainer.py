@@ -6,79 +6,331 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../.
 
 import numpy as np
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import cross_val_score
+from sklearn.model_selection import cross_validate, train_test_split
 from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score
-import joblib
 import time
+from dataclasses import asdict, is_dataclass
 from datetime import datetime
-from typing import Dict, Tuple
+from typing import Dict, List, Tuple
 
 from shared.logger import setup_logger
+from ml.training.model_families import DEFAULT_FAMILY, get_family, save_artifact, store_artifact
+from ml.training.preprocessing import Preprocessor
+from registry.artifact_store import ArtifactStore
 
 logger = setup_logger("model_trainer")
 
+TRAINING_MODES = ('cv', 'oob', 'holdout')
+
+
+def new_model_version() -> str:
+    """Timestamped version id; microseconds keep fast incremental updates unique"""
+    return f"v_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}"
+
+
+class FoldEnsemble:
+    """Soft-voting ensemble of the models fitted during cross-validation"""
+    
+    def __init__(self, estimators: List):
+        self.estimators = estimators
+        self.classes_ = estimators[0].classes_
+    
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Average class probabilities across folds"""
+        return np.mean([est.predict_proba(X) for est in self.estimators], axis=0)
+    
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Predict the class with the highest averaged probability"""
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
 class ModelTrainer:
-    """Handles model training"""
+    """Handles model training for the configured model family
+    
+    Training modes:
+        cv      - k-fold CV with folds fitted in parallel, then a full refit
+                  (or, with ``cv_refit=False``, the fold models as an ensemble)
+        oob     - one forest fit, evaluated on its out-of-bag predictions
+                  (families without OOB estimates fall back to holdout)
+        holdout - one fit on a stratified split, evaluated on the rest
+    """
     
     def __init__(self, model_config=None, model_path="models/model.pkl"):
+        if is_dataclass(model_config):
+            model_config = asdict(model_config)
         self.config = model_config if model_config else {}
+        self.family = get_family(self.config.get('model_family', DEFAULT_FAMILY))
         self.model = None
+        self.model_family = None
+        self.cv_models = None
         self.model_path = model_path
-        
-    def train(self, X: np.ndarray, y: np.ndarray) -> Tuple[Dict, str]:
+    
+    def _build_model(self, n_jobs: int):
+        """Create an estimator of the configured family"""
+        return self.family.build(self.config, n_jobs)
+    
+    def _thread_budget(self) -> int:
+        """Total cores available to one training call"""
+        n_jobs = self.config.get('n_jobs', -1)
+        if n_jobs is None or n_jobs < 1:
+            return os.cpu_count() or 1
+        return n_jobs
+    
+    def train(self, X: np.ndarray, y: np.ndarray, mode: str = None) -> Tuple[Dict, str]:
         """Train a model"""
-        logger.info(f"Training model with {len(X)} samples...")
+        mode = mode or self.config.get('training_mode', 'cv')
+        if mode not in TRAINING_MODES:
+            raise ValueError(f"Unknown training mode: {mode}")
+        if mode == 'oob' and not self.family.supports_oob:
+            logger.warning(f"{self.family.name} has no OOB estimate, using holdout")
+            mode = 'holdout'
+        
+        logger.info(f"Training model with {len(X)} samples (mode={mode})...")
         start_time = time.time()
         
-        # Create model
-        self.model = RandomForestClassifier(
-            n_estimators=self.config.get('n_estimators', 100),
-            max_depth=self.config.get('max_depth', 10),
-            min_samples_split=self.config.get('min_samples_split', 2),
-            random_state=self.config.get('random_state', 42),
-            n_jobs=-1
+        if mode == 'oob':
+            y_true, y_pred, scores, timings = self._train_oob(X, y)
+        elif mode == 'holdout':
+            y_true, y_pred, scores, timings = self._train_holdout(X, y)
+        else:
+            y_true, y_pred, scores, timings = self._train_cv(X, y)
+        
+        training_time = time.time() - start_time
+        self.model_family = self.family.name
+        
+        metrics = {
+            'accuracy': float(accuracy_score(y_true, y_pred)),
+            'precision': float(precision_score(y_true, y_pred, average='weighted', zero_division=0)),
+            'recall': float(recall_score(y_true, y_pred, average='weighted', zero_division=0)),
+            'f1_score': float(f1_score(y_true, y_pred, average='weighted', zero_division=0)),
+            'cv_mean': float(np.mean(scores)),
+            'cv_std': float(np.std(scores)),
+            'training_mode': mode,
+            'model_family': self.family.name,
+            'training_time': training_time,
+            'samples_count': len(X)
+        }
+        metrics.update(timings)
+        
+        model_version = new_model_version()
+        
+        logger.info(f"Training complete: accuracy={metrics['accuracy']:.4f}, "
+                   f"f1={metrics['f1_score']:.4f}, time={training_time:.2f}s")
+        
+        return metrics, model_version
+    
+    def _train_cv(self, X: np.ndarray, y: np.ndarray):
+        """Parallel k-fold CV; metrics come from out-of-fold predictions"""
+        folds = self.config.get('cv_folds', 5)
+        budget = self._thread_budget()
+        
+        # Split cores between folds instead of nesting n_jobs=-1 inside n_jobs=-1
+        fold_jobs = min(folds, budget)
+        forest_jobs = max(1, budget // fold_jobs)
+        
+        cv_start = time.time()
+        cv_results = cross_validate(
+            self._build_model(forest_jobs), X, y, cv=folds, scoring='accuracy',
+            n_jobs=fold_jobs, return_estimator=True, return_indices=True
         )
+        cv_time = time.time() - cv_start
         
-        # Cross-validation
-        cv_scores = cross_val_score(self.model, X, y, cv=5, scoring='accuracy')
-        logger.info(f"CV scores: {cv_scores.mean():.4f} (+/- {cv_scores.std():.4f})")
+        scores = cv_results['test_score']
+        logger.info(f"CV scores: {scores.mean():.4f} (+/- {scores.std():.4f})")
         
-        # Train on full dataset
+        self.cv_models = cv_results['estimator']
+        y_pred = np.empty_like(y)
+        for estimator, test_idx in zip(self.cv_models, cv_results['indices']['test']):
+            y_pred[test_idx] = estimator.predict(X[test_idx])
+        
+        timings = {'cv_time': cv_time}
+        if self.config.get('cv_refit', True):
+            fit_start = time.time()
+            self.model = self._build_model(budget)
+            self.family.fit(self.model, X, y)
+            timings['fit_time'] = time.time() - fit_start
+        else:
+            self.model = FoldEnsemble(self.cv_models)
+        
+        return y, y_pred, scores, timings
+    
+    def _train_oob(self, X: np.ndarray, y: np.ndarray):
+        """Single fit, evaluated on out-of-bag votes"""
+        fit_start = time.time()
+        self.model = self._build_model(self._thread_budget()).set_params(oob_score=True)
         self.model.fit(X, y)
+        fit_time = time.time() - fit_start
+        
+        # Rows that were in-bag for every tree have no OOB vote
+        oob = self.model.oob_decision_function_
+        has_vote = ~np.isnan(oob).any(axis=1)
+        y_pred = self.model.classes_[np.argmax(oob[has_vote], axis=1)]
         
-        # Evaluate
-        y_pred = self.model.predict(X)
+        self.cv_models = None
+        return y[has_vote], y_pred, [self.model.oob_score_], {'fit_time': fit_time}
+    
+    def _train_holdout(self, X: np.ndarray, y: np.ndarray):
+        """Single fit on a stratified split, evaluated on the held-out rows"""
+        holdout_size = self.config.get('holdout_size', 0.2)
+        _, counts = np.unique(y, return_counts=True)
+        X_fit, X_val, y_fit, y_val = train_test_split(
+            X, y, test_size=holdout_size,
+            random_state=self.config.get('random_state', 42),
+            stratify=y if counts.min() >= 2 else None
+        )
+        
+        fit_start = time.time()
+        self.model = self._build_model(self._thread_budget())
+        self.family.fit(self.model, X_fit, y_fit)
+        fit_time = time.time() - fit_start
+        
+        y_pred = self.model.predict(X_val)
+        
+        self.cv_models = None
+        return y_val, y_pred, [accuracy_score(y_val, y_pred)], {'fit_time': fit_time}
+    
+    def train_incremental(self, X: np.ndarray, y: np.ndarray, base_model: RandomForestClassifier,
+                          sample_weight: np.ndarray = None) -> Tuple[Dict, str]:
+        """Grow a deployed forest with trees fitted on recent data only
+        
+        Each update replaces a ``1 - decay`` share of the forest: new trees are
+        added with ``warm_start`` and the oldest are dropped so the forest never
+        exceeds ``max_trees``. Older data therefore fades geometrically, and the
+        cost of an update depends on the new rows, not on total history.
+        """
+        max_trees = self.config.get('max_trees', 200)
+        decay = self.config.get('decay', 0.7)
+        new_trees = max(1, int(round(max_trees * (1 - decay))))
+        
+        logger.info(f"Incremental update with {len(X)} samples: +{new_trees} trees")
+        start_time = time.time()
+        
+        holdout_size = self.config.get('holdout_size', 0.2)
+        indices = np.arange(len(X))
+        _, counts = np.unique(y, return_counts=True)
+        fit_idx, val_idx = train_test_split(
+            indices, test_size=holdout_size,
+            random_state=self.config.get('random_state', 42),
+            stratify=y if counts.min() >= 2 else None
+        )
+        
+        model = base_model
+        model.set_params(
+            warm_start=True,
+            n_estimators=len(model.estimators_) + new_trees,
+            n_jobs=self._thread_budget()
+        )
+        
+        fit_start = time.time()
+        model.fit(X[fit_idx], y[fit_idx],
+                  sample_weight=None if sample_weight is None else sample_weight[fit_idx])
+        fit_time = time.time() - fit_start
+        
+        # Retire the oldest trees to keep the forest bounded
+        if len(model.estimators_) > max_trees:
+            model.estimators_ = model.estimators_[-max_trees:]
+        model.set_params(n_estimators=len(model.estimators_), warm_start=False)
+        self.model = model
+        self.model_family = 'random_forest'
+        self.cv_models = None
+        
+        y_val = y[val_idx]
+        y_pred = model.predict(X[val_idx])
         training_time = time.time() - start_time
         
         metrics = {
-            'accuracy': float(accuracy_score(y, y_pred)),
-            'precision': float(precision_score(y, y_pred, average='weighted', zero_division=0)),
-            'recall': float(recall_score(y, y_pred, average='weighted', zero_division=0)),
-            'f1_score': float(f1_score(y, y_pred, average='weighted', zero_division=0)),
-            'cv_mean': float(cv_scores.mean()),
-            'cv_std': float(cv_scores.std()),
+            'accuracy': float(accuracy_score(y_val, y_pred)),
+            'precision': float(precision_score(y_val, y_pred, average='weighted', zero_division=0)),
+            'recall': float(recall_score(y_val, y_pred, average='weighted', zero_division=0)),
+            'f1_score': float(f1_score(y_val, y_pred, average='weighted', zero_division=0)),
+            'training_mode': 'incremental',
+            'model_family': self.model_family,
+            'trees_added': new_trees,
+            'forest_size': len(model.estimators_),
+            'fit_time': fit_time,
             'training_time': training_time,
             'samples_count': len(X)
         }
         
-        model_version = f"v_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        model_version = new_model_version()
         
-        logger.info(f"Training complete: accuracy={metrics['accuracy']:.4f}, "
-                   f"f1={metrics['f1_score']:.4f}, time={training_time:.2f}s")
+        logger.info(f"Incremental update complete: accuracy={metrics['accuracy']:.4f}, "
+                   f"trees={metrics['forest_size']}, time={training_time:.2f}s")
+        
+        return metrics, model_version
+    
+    def tune(self, X: np.ndarray, y: np.ndarray, mlflow_client=None) -> Dict:
+        """Search forest hyperparameters and use the winner for later fits"""
+        from ml.training.tuning import HyperbandSearch
+        
+        if self.family.name != 'random_forest':
+            logger.warning(f"No search space for {self.family.name}, skipping tuning")
+            return {'best_params': None, 'trials': 0}
+        
+        search = HyperbandSearch(
+            metric=self.config.get('tuning_metric', 'f1_score'),
+            eta=self.config.get('tuning_eta', 3),
+            min_samples=self.config.get('tuning_min_samples', 500),
+            max_workers=self._thread_budget(),
+            time_budget=self.config.get('tuning_time_budget', 600),
+            mlflow_client=mlflow_client,
+            random_state=self.config.get('random_state', 42)
+        )
+        best_params = search.search(X, y)
+        if best_params:
+            self.config.update(best_params)
+        return {'best_params': best_params, 'trials': len(search.trials)}
+    
+    def train_out_of_core(self, chunks, work_dir: str = "data/ooc") -> Tuple[Dict, str]:
+        """Train from a stream of (X, y) chunks within ``memory_budget_mb``"""
+        from ml.training.out_of_core import train_out_of_core
+        
+        start_time = time.time()
+        self.model, metrics = train_out_of_core(
+            chunks, work_dir,
+            memory_budget_mb=self.config.get('memory_budget_mb', 512),
+            max_bags=self.config.get('ooc_max_bags', 10),
+            random_state=self.config.get('random_state', 42)
+        )
+        self.cv_models = None
+        self.model_family = 'binned_bagging'
+        training_time = time.time() - start_time
+        
+        metrics.update({'training_mode': 'out_of_core', 'model_family': self.model_family,
+                        'training_time': training_time})
+        model_version = new_model_version()
+        
+        logger.info(f"Out-of-core training complete: accuracy={metrics['accuracy']}, "
+                   f"rows={metrics['samples_count']}, time={training_time:.2f}s")
         
         return metrics, model_version
+    
+    @staticmethod
+    def can_update(model, X: np.ndarray, y: np.ndarray) -> bool:
+        """Whether a forest can be warm-started on this data"""
+        return (
+            isinstance(model, RandomForestClassifier)
+            and hasattr(model, 'estimators_')
+            and model.n_features_in_ == X.shape[1]
+            and set(np.unique(y)) == set(model.classes_)
+        )
+    
+    def save_model(self, path: str = None, preprocessor: Preprocessor = None,
+                   store: ArtifactStore = None) -> str:
+        """Save trained model, with the preprocessor its inputs came through; returns its path
         
-    def save_model(self, path: str = None):
-        """Save trained model"""
+        With ``store``, the artifact goes into the content-addressed store
+        and the returned manifest path is what the registry should hold.
+        """
         if self.model is None:
             raise ValueError("No model to save")
         
-        save_path = path or self.model_path
-        os.makedirs(os.path.dirname(save_path), exist_ok=True)
-            
-        joblib.dump({
-            'model': self.model,
-            'timestamp': datetime.now().isoformat()
-        }, save_path)
+        extra = {'preprocessor': preprocessor.to_dict()} if preprocessor is not None else {}
+        if store is not None:
+            save_path = store_artifact(self.model, self.model_family, store, **extra)
+        else:
+            save_path = path or self.model_path
+            save_artifact(self.model, self.model_family, save_path, **extra)
         
         logger.info(f"Model saved: {save_path}")
+        return save_path
@@ -0,0 +1,206 @@
+"""Hyperparameter search for the training forest"""
+import sys
+import os
+# Add project root to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+import math
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, wait
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score
+from sklearn.model_selection import train_test_split
+from typing import Dict, List, Optional, Tuple
+
+from shared.logger import setup_logger
+
+logger = setup_logger("tuning")
+
+SEARCH_SPACE = {
+    'n_estimators': [50, 100, 200, 300],
+    'max_depth': [5, 10, 20, None],
+    'min_samples_split': [2, 5, 10],
+    'min_samples_leaf': [1, 2, 4],
+    'max_features': ['sqrt', 'log2', 0.5]
+}
+
+METRICS = ('accuracy', 'precision', 'recall', 'f1_score')
+
+# Per-process training data, set once by the pool initializer
+_data = {}
+
+
+def _init_worker(X_fit: np.ndarray, y_fit: np.ndarray, X_val: np.ndarray, y_val: np.ndarray):
+    """Receive the data once per worker instead of once per trial"""
+    _data.update(X_fit=X_fit, y_fit=y_fit, X_val=X_val, y_val=y_val)
+
+
+def _run_trial(params: Dict, n_samples: int, random_state: int) -> Dict:
+    """Fit on the first ``n_samples`` (shuffled) training rows and score on the validation set"""
+    start = time.time()
+    model = RandomForestClassifier(**params, random_state=random_state, n_jobs=1)
+    model.fit(_data['X_fit'][:n_samples], _data['y_fit'][:n_samples])
+    
+    y_val = _data['y_val']
+    y_pred = model.predict(_data['X_val'])
+    return {
+        'accuracy': float(accuracy_score(y_val, y_pred)),
+        'precision': float(precision_score(y_val, y_pred, average='weighted', zero_division=0)),
+        'recall': float(recall_score(y_val, y_pred, average='weighted', zero_division=0)),
+        'f1_score': float(f1_score(y_val, y_pred, average='weighted', zero_division=0)),
+        'fit_time': time.time() - start
+    }
+
+
+def _shutdown_now(executor: ProcessPoolExecutor):
+    """Cancel queued trials and kill running ones, so none outlives the time budget"""
+    # The executor has no public way to stop a running task before Python 3.14
+    processes = list((executor._processes or {}).values())
+    executor.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+    for process in processes:
+        process.join()
+
+
+def sample_configs(space: Dict[str, List], n: int, rng: np.random.Generator) -> List[Dict]:
+    """Draw ``n`` random configurations from a grid of candidate values"""
+    configs = []
+    for _ in range(n):
+        config = {}
+        for name, values in space.items():
+            value = values[rng.integers(len(values))]
+            config[name] = value.item() if isinstance(value, np.generic) else value
+        configs.append(config)
+    return configs
+
+
+class HyperbandSearch:
+    """Hyperband over forest hyperparameters, using training rows as the budget
+    
+    Each bracket runs successive halving: many configurations are fitted on a
+    small subsample, and only the best ``1/eta`` move on to ``eta`` times more
+    rows. Trials within a rung run in parallel on a process pool. Once
+    ``time_budget`` seconds have passed the search stops, terminating trials
+    still running, and returns the best configuration seen, preferring scores
+    measured on more rows.
+    """
+    
+    def __init__(self, space: Dict[str, List] = None, metric: str = 'f1_score', eta: int = 3,
+                 min_samples: int = 500, max_workers: int = None, time_budget: float = 600.0,
+                 validation_size: float = 0.2, mlflow_client=None, random_state: int = 42):
+        if metric not in METRICS:
+            raise ValueError(f"Unknown tuning metric: {metric}")
+        self.space = space or SEARCH_SPACE
+        self.metric = metric
+        self.eta = eta
+        self.min_samples = min_samples
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.time_budget = time_budget
+        self.validation_size = validation_size
+        self.mlflow_client = mlflow_client
+        self.random_state = random_state
+        self.trials = []
+        self.best = None
+    
+    def _log_trial(self, trial: Dict):
+        """Record one trial as its own tracking run"""
+        if self.mlflow_client is None:
+            return
+        self.mlflow_client.start_run(f"trial_{trial['trial_id']}")
+        self.mlflow_client.log_params({**trial['params'], 'bracket': trial['bracket'],
+                                       'rung': trial['rung'], 'n_samples': trial['n_samples']})
+        self.mlflow_client.log_metrics(trial['metrics'])
+        self.mlflow_client.end_run()
+    
+    def _rank_key(self, trial: Dict) -> Tuple[int, float]:
+        """Scores on more rows beat scores on fewer"""
+        return trial['n_samples'], trial['metrics'][self.metric]
+    
+    def _run_rung(self, executor, configs: List[Dict], n_samples: int, bracket: int,
+                  rung: int, deadline: float) -> List[Dict]:
+        """Evaluate configs in parallel; returns finished trials best first"""
+        futures = {
+            executor.submit(_run_trial, params, n_samples, self.random_state): params
+            for params in configs
+        }
+        done, not_done = wait(futures, timeout=max(0.0, deadline - time.time()))
+        for future in not_done:
+            future.cancel()
+        
+        finished = []
+        for future in done:
+            if future.exception() is not None:
+                logger.warning(f"Trial failed for {futures[future]}: {future.exception()}")
+                continue
+            trial = {
+                'trial_id': len(self.trials),
+                'bracket': bracket,
+                'rung': rung,
+                'n_samples': n_samples,
+                'params': futures[future],
+                'metrics': future.result()
+            }
+            self.trials.append(trial)
+            self._log_trial(trial)
+            if self.best is None or self._rank_key(trial) > self._rank_key(self.best):
+                self.best = trial
+            finished.append(trial)
+        
+        finished.sort(key=lambda t: t['metrics'][self.metric], reverse=True)
+        return finished
+    
+    def search(self, X: np.ndarray, y: np.ndarray) -> Optional[Dict]:
+        """Run all brackets within the time budget; returns the best parameters or None"""
+        start = time.time()
+        deadline = start + self.time_budget
+        rng = np.random.default_rng(self.random_state)
+        self.trials = []
+        self.best = None
+        
+        _, counts = np.unique(y, return_counts=True)
+        X_fit, X_val, y_fit, y_val = train_test_split(
+            X, y, test_size=self.validation_size, random_state=self.random_state,
+            stratify=y if counts.min() >= 2 else None
+        )
+        
+        # Nested subsamples: rung r trains on a prefix of the same shuffled rows
+        max_samples = len(X_fit)
+        min_samples = min(self.min_samples, max_samples)
+        s_max = int(math.log(max_samples / min_samples, self.eta) + 1e-9)
+        
+        logger.info(f"Hyperband search: {s_max + 1} brackets, {min_samples}-{max_samples} rows, "
+                    f"budget {self.time_budget:.0f}s, {self.max_workers} workers")
+        
+        # Not a context manager: exiting one would wait for trials past the deadline
+        executor = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker,
+                                       initargs=(X_fit, y_fit, X_val, y_val))
+        try:
+            for s in range(s_max, -1, -1):
+                n_configs = int(math.ceil((s_max + 1) / (s + 1) * self.eta ** s))
+                configs = sample_configs(self.space, n_configs, rng)
+                
+                for rung in range(s + 1):
+                    if time.time() >= deadline or not configs:
+                        break
+                    n_samples = max_samples if rung == s else int(max_samples * self.eta ** (rung - s))
+                    finished = self._run_rung(executor, configs, n_samples, s, rung, deadline)
+                    keep = max(1, len(configs) // self.eta)
+                    configs = [t['params'] for t in finished[:keep]]
+                
+                if time.time() >= deadline:
+                    logger.warning(f"Tuning time budget reached after {len(self.trials)} trials")
+                    break
+        finally:
+            _shutdown_now(executor)
+        
+        if self.best is None:
+            logger.warning("Tuning finished without a completed trial")
+            return None
+        
+        logger.info(f"Best params ({self.metric}={self.best['metrics'][self.metric]:.4f} "
+                    f"on {self.best['n_samples']} rows): {self.best['params']}, "
+                    f"{len(self.trials)} trials in {time.time() - start:.1f}s")
+        return self.best['params']
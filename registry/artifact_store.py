@@ -0,0 +1,196 @@
+"""Content-addressed model artifact store with array deduplication and garbage collection"""
+import sys
+import os
+# Add project root to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import hashlib
+import io
+import pickle
+import tempfile
+import time
+import zlib
+import numpy as np
+from typing import Dict, Iterable, List
+
+from shared.logger import setup_logger
+
+logger = setup_logger("artifact_store")
+
+MANIFEST_MAGIC = b'MLARTIFACT1\n'
+ARRAY_THRESHOLD = 64 * 1024  # numeric arrays at least this large are stored as shared blobs
+COMPRESS_LEVEL = 3
+
+
+def is_stored_artifact(path: str) -> bool:
+    """Whether a file is an artifact store manifest (rather than a plain joblib file)"""
+    with open(path, 'rb') as f:
+        return f.read(len(MANIFEST_MAGIC)) == MANIFEST_MAGIC
+
+
+def load_stored_artifact(path: str) -> Dict:
+    """Artifact payload from a manifest path; the store root is two levels up"""
+    return ArtifactStore(os.path.dirname(os.path.dirname(path))).load(path)
+
+
+class _BlobPickler(pickle.Pickler):
+    """Pickles a payload, handing large numeric arrays to the store as blobs"""
+    
+    def __init__(self, file, store: 'ArtifactStore', blobs: List[str]):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.store = store
+        self.blobs = blobs
+    
+    def persistent_id(self, obj):
+        if type(obj) is np.ndarray and obj.nbytes >= self.store.array_threshold and not obj.dtype.hasobject:
+            digest = self.store.put_array(obj)
+            self.blobs.append(digest)
+            return ('array', digest)
+        return None
+
+
+class _BlobUnpickler(pickle.Unpickler):
+    """Unpickles a payload, reading array blobs back from the store"""
+    
+    def __init__(self, file, store: 'ArtifactStore'):
+        super().__init__(file)
+        self.store = store
+    
+    def persistent_load(self, pid):
+        kind, digest = pid
+        if kind != 'array':
+            raise pickle.UnpicklingError(f"Unknown stored object kind: {kind}")
+        return self.store.get_array(digest)
+
+
+class ArtifactStore:
+    """Model artifacts keyed by the SHA-256 of their content
+    
+    An artifact is a manifest (the pickled payload) plus one blob per
+    numeric array of at least ``array_threshold`` bytes, all stored
+    zlib-compressed under ``root/<2 hex>/<digest>``. Identical content is
+    stored once: writing a version only compresses and writes the arrays
+    not already present, so versions that share trees (incremental
+    retraining) share their blobs. Manifests list their blobs, so garbage
+    collection never unpickles a model. The registry's ``model_path``
+    rows are the references; ``collect_garbage`` removes everything they
+    do not reach.
+    """
+    
+    def __init__(self, root: str = "models/store", array_threshold: int = ARRAY_THRESHOLD):
+        self.root = root
+        self.array_threshold = array_threshold
+        self.stats = {'written': 0, 'deduplicated': 0, 'bytes_written': 0}
+    
+    def path(self, digest: str) -> str:
+        """File holding an object"""
+        return os.path.join(self.root, digest[:2], digest)
+    
+    def _exists(self, digest: str) -> bool:
+        """Whether an object is stored; an existing copy is touched, since it is live again"""
+        path = self.path(digest)
+        if not os.path.exists(path):
+            return False
+        os.utime(path)
+        self.stats['deduplicated'] += 1
+        return True
+    
+    def _write(self, digest: str, data: bytes) -> str:
+        """Write an object atomically, so readers never see a partial file"""
+        path = self.path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+        self.stats['written'] += 1
+        self.stats['bytes_written'] += len(data)
+        return path
+    
+    def put_array(self, array: np.ndarray) -> str:
+        """Store an array as a compressed .npy blob unless already present; returns its digest"""
+        buffer = io.BytesIO()
+        np.save(buffer, array, allow_pickle=False)
+        raw = buffer.getvalue()
+        digest = hashlib.sha256(raw).hexdigest()
+        if not self._exists(digest):
+            self._write(digest, zlib.compress(raw, COMPRESS_LEVEL))
+        return digest
+    
+    def get_array(self, digest: str) -> np.ndarray:
+        """Read an array blob"""
+        with open(self.path(digest), 'rb') as f:
+            return np.load(io.BytesIO(zlib.decompress(f.read())), allow_pickle=False)
+    
+    def put(self, payload: Dict) -> str:
+        """Store an artifact payload; returns the manifest path to register"""
+        blobs = []
+        buffer = io.BytesIO()
+        _BlobPickler(buffer, self, blobs).dump(payload)
+        manifest = pickle.dumps({'blobs': sorted(set(blobs)), 'payload': buffer.getvalue()},
+                                protocol=pickle.HIGHEST_PROTOCOL)
+        digest = hashlib.sha256(manifest).hexdigest()
+        if not self._exists(digest):
+            self._write(digest, MANIFEST_MAGIC + zlib.compress(manifest, COMPRESS_LEVEL))
+        logger.info(f"Stored artifact {digest[:12]} ({len(set(blobs))} array blobs; store totals: "
+                    f"{self.stats['written']} written, {self.stats['deduplicated']} deduplicated)")
+        return self.path(digest)
+    
+    def _manifest(self, path: str) -> Dict:
+        """Decoded manifest: its blob digests and the pickled payload"""
+        with open(path, 'rb') as f:
+            data = f.read()
+        if not data.startswith(MANIFEST_MAGIC):
+            raise ValueError(f"Not an artifact manifest: {path}")
+        return pickle.loads(zlib.decompress(data[len(MANIFEST_MAGIC):]))
+    
+    def load(self, path: str) -> Dict:
+        """Artifact payload from a manifest path"""
+        manifest = self._manifest(path)
+        return _BlobUnpickler(io.BytesIO(manifest['payload']), self).load()
+    
+    def collect_garbage(self, referenced_paths: Iterable[str], grace: float = 3600.0) -> Dict:
+        """Delete objects no referenced manifest reaches
+        
+        Objects modified within ``grace`` seconds are kept, so an artifact
+        written but not yet registered (or just deduplicated into a new
+        one) is never collected.
+        """
+        live = set()
+        root = os.path.abspath(self.root)
+        for path in referenced_paths:
+            if not path or os.path.dirname(os.path.dirname(os.path.abspath(path))) != root:
+                continue  # plain files outside the store
+            if not os.path.exists(path):
+                logger.warning(f"Registered artifact missing: {path}")
+                continue
+            live.add(os.path.basename(path))
+            live.update(self._manifest(path)['blobs'])
+        
+        cutoff = time.time() - grace
+        removed, freed, kept = 0, 0, 0
+        for prefix in os.listdir(self.root) if os.path.isdir(self.root) else []:
+            directory = os.path.join(self.root, prefix)
+            for name in os.listdir(directory):
+                path = os.path.join(directory, name)
+                if name in live:
+                    kept += 1
+                    continue
+                stat = os.stat(path)
+                if stat.st_mtime > cutoff:
+                    kept += 1
+                    continue
+                os.remove(path)
+                removed += 1
+                freed += stat.st_size
+        logger.info(f"Artifact GC: removed {removed} objects ({freed / 1e6:.1f} MB), kept {kept}")
+        return {'removed': removed, 'bytes_freed': freed, 'kept': kept, 'live': len(live)}
+    
+    def usage(self) -> Dict:
+        """Object count and bytes on disk"""
+        objects, size = 0, 0
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                objects += 1
+                size += os.path.getsize(os.path.join(directory, name))
+        return {'objects': objects, 'bytes': size}
@@ -4,39 +4,152 @@ import os
 # Add project root to Python path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
+import math
+import numbers
+import threading
+import time
+
 from shared.logger import setup_logger
+from registry.mlflow.tracking_store import (
+    MAX_METRICS_PER_BATCH, MAX_PARAMS_PER_BATCH, MAX_PARAM_LENGTH, create_store
+)
 
 logger = setup_logger("mlflow_client")
 
 class MLFlowClient:
-    """MLFlow tracking client (mock for now)"""
+    """MLFlow tracking client with buffered, background logging
+    
+    ``tracking_uri`` is a directory or ``file:`` URI for a local MLflow file
+    store, or the ``http(s)://`` address of an MLflow tracking server. Params,
+    metrics and artifacts are queued and written by a per-run flusher thread
+    every ``flush_interval`` seconds (or as soon as a full batch is waiting),
+    so callers never wait on tracking I/O; ``end_run`` flushes what is left.
+    Tracking failures are logged and never raised into training code.
+    """
     
-    def __init__(self, tracking_uri: str, experiment_name: str):
+    def __init__(self, tracking_uri: str, experiment_name: str, flush_interval: float = 1.0):
         self.tracking_uri = tracking_uri
         self.experiment_name = experiment_name
+        self.flush_interval = flush_interval
+        self.store = create_store(tracking_uri)
+        self.experiment_id = None
         self.current_run_id = None
+        self.lock = threading.Lock()
+        self.pending = {'metrics': [], 'params': [], 'artifacts': []}
+        self.wake = threading.Event()
+        self.stopping = threading.Event()
+        self.flusher = None
+        self.stats = {'batches': 0, 'artifacts': 0, 'failed': 0}
         logger.info(f"MLFlow client initialized: {tracking_uri}")
-        
+    
     def start_run(self, run_name: str) -> str:
-        """Start a new MLFlow run"""
-        import uuid
-        self.current_run_id = str(uuid.uuid4())
+        """Start a new MLFlow run; returns None if the tracking backend is unavailable"""
+        if self.current_run_id is not None:
+            self.end_run()
+        try:
+            if self.experiment_id is None:
+                self.experiment_id = self.store.get_or_create_experiment(self.experiment_name)
+            self.current_run_id = self.store.create_run(self.experiment_id, run_name)
+        except Exception as e:
+            logger.error(f"Could not start MLFlow run {run_name}: {str(e)}")
+            return None
+        
+        self.stopping.clear()
+        self.flusher = threading.Thread(target=self._flush_loop, args=(self.current_run_id,),
+                                        name="mlflow-flush", daemon=True)
+        self.flusher.start()
         logger.info(f"Started MLFlow run: {run_name} ({self.current_run_id})")
         return self.current_run_id
-        
+    
+    def _enqueue(self, kind: str, entries: list, limit: int):
+        """Buffer entries for the flusher, waking it once a full batch is waiting"""
+        if self.current_run_id is None:
+            return
+        with self.lock:
+            self.pending[kind].extend(entries)
+            full = len(self.pending[kind]) >= limit
+        if full:
+            self.wake.set()
+    
     def log_params(self, params: dict):
         """Log parameters"""
-        logger.debug(f"Logging params: {params}")
+        self._enqueue('params', [
+            {'key': str(key), 'value': str(value)[:MAX_PARAM_LENGTH]}
+            for key, value in params.items()
+        ], MAX_PARAMS_PER_BATCH)
+    
+    def log_metrics(self, metrics: dict, step: int = 0):
+        """Log numeric metrics; other values (lists, strings) are skipped
         
-    def log_metrics(self, metrics: dict):
-        """Log metrics"""
-        logger.info(f"Logging metrics: {metrics}")
+        NaN/inf are dropped with a warning: MLflow's REST API rejects them,
+        which would fail the whole batch on every flush.
+        """
+        timestamp = int(time.time() * 1000)
+        numeric = {
+            str(key): float(value) for key, value in metrics.items()
+            if isinstance(value, numbers.Real) and not isinstance(value, bool)
+        }
+        non_finite = [key for key, value in numeric.items() if not math.isfinite(value)]
+        if non_finite:
+            logger.warning(f"Skipping non-finite metrics: {non_finite}")
+        self._enqueue('metrics', [
+            {'key': key, 'value': value, 'timestamp': timestamp, 'step': step}
+            for key, value in numeric.items() if math.isfinite(value)
+        ], MAX_METRICS_PER_BATCH)
+    
+    def log_artifact(self, local_path: str, artifact_path: str = None):
+        """Log a file; it is streamed in chunks, never read whole"""
+        self._enqueue('artifacts', [(local_path, artifact_path)], 1)
+    
+    def log_model(self, model_path: str, artifact_path: str = 'model'):
+        """Log a saved model artifact"""
+        self.log_artifact(model_path, artifact_path)
+    
+    def _flush_loop(self, run_id: str):
+        """Write buffered entries until the run ends"""
+        while not self.stopping.is_set():
+            self.wake.wait(self.flush_interval)
+            self.wake.clear()
+            self._flush(run_id)
+    
+    def _flush(self, run_id: str):
+        """Send everything buffered, in batches within MLflow's request limits"""
+        with self.lock:
+            pending = self.pending
+            self.pending = {'metrics': [], 'params': [], 'artifacts': []}
         
-    def log_model(self, model, artifact_path: str):
-        """Log model artifact"""
-        logger.info(f"Logging model: {artifact_path}")
+        metrics, params = pending['metrics'], pending['params']
+        while metrics or params:
+            batch_metrics, metrics = metrics[:MAX_METRICS_PER_BATCH], metrics[MAX_METRICS_PER_BATCH:]
+            batch_params, params = params[:MAX_PARAMS_PER_BATCH], params[MAX_PARAMS_PER_BATCH:]
+            try:
+                self.store.log_batch(run_id, metrics=batch_metrics, params=batch_params)
+                self.stats['batches'] += 1
+            except Exception as e:
+                self.stats['failed'] += 1
+                logger.error(f"MLFlow batch for run {run_id} dropped: {str(e)}")
         
+        for local_path, artifact_path in pending['artifacts']:
+            try:
+                self.store.log_artifact(run_id, local_path, artifact_path)
+                self.stats['artifacts'] += 1
+            except Exception as e:
+                self.stats['failed'] += 1
+                logger.error(f"MLFlow artifact {local_path} for run {run_id} dropped: {str(e)}")
+    
     def end_run(self, status: str = 'FINISHED'):
-        """End current run"""
-        logger.info(f"Ended MLFlow run: {self.current_run_id} ({status})")
+        """Flush buffered logging and end current run"""
+        run_id = self.current_run_id
+        if run_id is None:
+            return
+        self.stopping.set()
+        self.wake.set()
+        self.flusher.join()
+        self._flush(run_id)
+        try:
+            self.store.update_run(run_id, status)
+        except Exception as e:
+            logger.error(f"Could not end MLFlow run {run_id}: {str(e)}")
+        logger.info(f"Ended MLFlow run: {run_id} ({status})")
         self.current_run_id = None
+        self.flusher = None
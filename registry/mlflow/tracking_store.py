@@ -0,0 +1,290 @@
+"""MLflow-compatible tracking stores: local file store and REST server"""
+import sys
+import os
+# Add project root to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+import json
+import shutil
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from typing import Dict, List
+
+from shared.logger import setup_logger
+
+logger = setup_logger("tracking_store")
+
+# MLflow RunStatus values as stored in the file store's meta.yaml
+RUN_STATUS = {'RUNNING': 1, 'SCHEDULED': 2, 'FINISHED': 3, 'FAILED': 4, 'KILLED': 5}
+
+# Per-request limits of MLflow's log-batch API
+MAX_METRICS_PER_BATCH = 1000
+MAX_PARAMS_PER_BATCH = 100
+MAX_PARAM_LENGTH = 6000
+
+_CHUNK_SIZE = 1024 * 1024
+
+
+def _now_ms() -> int:
+    """Wall clock in milliseconds, MLflow's timestamp unit"""
+    return int(time.time() * 1000)
+
+
+def _write_meta(path: str, meta: Dict):
+    """Write a flat meta.yaml (scalars only) atomically"""
+    lines = []
+    for key, value in meta.items():
+        if value is None:
+            value = 'null'
+        elif isinstance(value, str):
+            value = json.dumps(value)  # a JSON string is a valid YAML scalar
+        elif isinstance(value, list):
+            value = '[]' if not value else json.dumps(value)
+        lines.append(f"{key}: {value}")
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+    os.replace(tmp_path, path)
+
+
+def _read_meta(path: str) -> Dict:
+    """Read the flat meta.yaml files this store and MLflow write"""
+    meta = {}
+    with open(path) as f:
+        for line in f:
+            if ':' not in line or line.startswith(' '):
+                continue
+            key, value = line.split(':', 1)
+            value = value.strip()
+            if value.startswith('"'):
+                value = json.loads(value)
+            elif value.startswith("'"):
+                value = value[1:-1].replace("''", "'")
+            elif value in ('null', '~', ''):
+                value = None
+            elif value.lstrip('-').isdigit():
+                value = int(value)
+            meta[key.strip()] = value
+    return meta
+
+
+class FileStore:
+    """Tracking data in MLflow's ``mlruns`` directory layout
+    
+    ``<root>/<experiment_id>/meta.yaml`` describes an experiment and each run
+    lives in ``<root>/<experiment_id>/<run_id>/`` with ``meta.yaml`` plus one
+    file per metric (``timestamp value step`` lines), param and tag, and an
+    ``artifacts/`` directory. ``mlflow ui --backend-store-uri <root>`` can
+    browse the result.
+    """
+    
+    def __init__(self, root: str = "mlruns"):
+        self.root = os.path.abspath(root)
+        self.lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+    
+    def _experiment_dirs(self) -> List[str]:
+        """Experiment ids present on disk"""
+        return [
+            name for name in os.listdir(self.root)
+            if os.path.exists(os.path.join(self.root, name, 'meta.yaml'))
+        ]
+    
+    def get_or_create_experiment(self, name: str) -> str:
+        """Experiment id for ``name``, creating the experiment if needed"""
+        with self.lock:
+            for experiment_id in self._experiment_dirs():
+                meta = _read_meta(os.path.join(self.root, experiment_id, 'meta.yaml'))
+                if meta.get('name') == name:
+                    return experiment_id
+            
+            numeric = [int(e) for e in self._experiment_dirs() if e.isdigit()]
+            experiment_id = str(max(numeric, default=0) + 1)
+            experiment_dir = os.path.join(self.root, experiment_id)
+            os.makedirs(experiment_dir)
+            now = _now_ms()
+            _write_meta(os.path.join(experiment_dir, 'meta.yaml'), {
+                'artifact_location': f"file://{experiment_dir}",
+                'creation_time': now,
+                'experiment_id': experiment_id,
+                'last_update_time': now,
+                'lifecycle_stage': 'active',
+                'name': name
+            })
+            logger.info(f"Created experiment {name} ({experiment_id})")
+            return experiment_id
+    
+    def _run_dir(self, run_id: str) -> str:
+        """Directory of a run; run ids are unique across experiments"""
+        for experiment_id in self._experiment_dirs():
+            path = os.path.join(self.root, experiment_id, run_id)
+            if os.path.isdir(path):
+                return path
+        raise KeyError(f"Unknown run: {run_id}")
+    
+    def create_run(self, experiment_id: str, run_name: str, start_time: int = None) -> str:
+        """Create a RUNNING run and return its id"""
+        run_id = uuid.uuid4().hex
+        run_dir = os.path.join(self.root, experiment_id, run_id)
+        for sub in ('metrics', 'params', 'tags', 'artifacts'):
+            os.makedirs(os.path.join(run_dir, sub))
+        _write_meta(os.path.join(run_dir, 'meta.yaml'), {
+            'artifact_uri': f"file://{os.path.join(run_dir, 'artifacts')}",
+            'end_time': None,
+            'entry_point_name': '',
+            'experiment_id': experiment_id,
+            'lifecycle_stage': 'active',
+            'run_id': run_id,
+            'run_name': run_name,
+            'run_uuid': run_id,
+            'source_name': '',
+            'source_type': 4,
+            'source_version': '',
+            'start_time': start_time or _now_ms(),
+            'status': RUN_STATUS['RUNNING'],
+            'tags': [],
+            'user_id': os.getenv('USER', 'pipeline')
+        })
+        with open(os.path.join(run_dir, 'tags', 'mlflow.runName'), 'w') as f:
+            f.write(run_name)
+        return run_id
+    
+    def log_batch(self, run_id: str, metrics: List[Dict] = (), params: List[Dict] = (),
+                  tags: List[Dict] = ()):
+        """Append metrics and write params and tags; one open per key"""
+        run_dir = self._run_dir(run_id)
+        by_key = {}
+        for metric in metrics:
+            by_key.setdefault(metric['key'], []).append(
+                f"{metric['timestamp']} {metric['value']} {metric['step']}\n")
+        for key, lines in by_key.items():
+            with open(os.path.join(run_dir, 'metrics', key), 'a') as f:
+                f.writelines(lines)
+        for sub, entries in (('params', params), ('tags', tags)):
+            for entry in entries:
+                with open(os.path.join(run_dir, sub, entry['key']), 'w') as f:
+                    f.write(entry['value'])
+    
+    def update_run(self, run_id: str, status: str, end_time: int = None):
+        """Set the final status and end time"""
+        meta_path = os.path.join(self._run_dir(run_id), 'meta.yaml')
+        meta = _read_meta(meta_path)
+        meta['status'] = RUN_STATUS[status]
+        meta['end_time'] = end_time or _now_ms()
+        meta['tags'] = []
+        _write_meta(meta_path, meta)
+    
+    def log_artifact(self, run_id: str, local_path: str, artifact_path: str = None):
+        """Copy a file into the run's artifacts in fixed-size chunks"""
+        target_dir = os.path.join(self._run_dir(run_id), 'artifacts', artifact_path or '')
+        os.makedirs(target_dir, exist_ok=True)
+        with open(local_path, 'rb') as src, \
+                open(os.path.join(target_dir, os.path.basename(local_path)), 'wb') as dst:
+            shutil.copyfileobj(src, dst, _CHUNK_SIZE)
+    
+    def get_run(self, run_id: str) -> Dict:
+        """Run metadata with its latest metrics, params and tags"""
+        run_dir = self._run_dir(run_id)
+        run = _read_meta(os.path.join(run_dir, 'meta.yaml'))
+        run['metrics'], run['params'], run['tags'] = {}, {}, {}
+        for key in os.listdir(os.path.join(run_dir, 'metrics')):
+            with open(os.path.join(run_dir, 'metrics', key)) as f:
+                run['metrics'][key] = float(f.read().splitlines()[-1].split()[1])
+        for sub in ('params', 'tags'):
+            for key in os.listdir(os.path.join(run_dir, sub)):
+                with open(os.path.join(run_dir, sub, key)) as f:
+                    run[sub][key] = f.read()
+        return run
+
+
+class RestStore:
+    """Client for an MLflow tracking server's REST API (``mlflow server``)
+    
+    Artifacts are uploaded through the server's artifact proxy
+    (``--serve-artifacts``, the default since MLflow 2.0) as streamed PUTs.
+    """
+    
+    def __init__(self, tracking_uri: str, timeout: float = 10.0):
+        self.base = tracking_uri.rstrip('/')
+        self.timeout = timeout
+        self.run_experiments = {}
+    
+    def _call(self, method: str, endpoint: str, payload: Dict = None) -> Dict:
+        """One JSON request to /api/2.0/mlflow"""
+        url = f"{self.base}/api/2.0/mlflow/{endpoint}"
+        data = None
+        if method == 'GET' and payload:
+            url += '?' + urllib.parse.urlencode(payload)
+        elif payload is not None:
+            data = json.dumps(payload).encode()
+        request = urllib.request.Request(url, data=data, method=method,
+                                         headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            body = response.read()
+        return json.loads(body) if body else {}
+    
+    def get_or_create_experiment(self, name: str) -> str:
+        """Experiment id for ``name``, creating the experiment if needed"""
+        try:
+            found = self._call('GET', 'experiments/get-by-name', {'experiment_name': name})
+            return found['experiment']['experiment_id']
+        except urllib.error.HTTPError as e:
+            if e.code != 404:
+                raise
+        return self._call('POST', 'experiments/create', {'name': name})['experiment_id']
+    
+    def create_run(self, experiment_id: str, run_name: str, start_time: int = None) -> str:
+        """Create a RUNNING run and return its id"""
+        run = self._call('POST', 'runs/create', {
+            'experiment_id': experiment_id,
+            'run_name': run_name,
+            'start_time': start_time or _now_ms(),
+            'tags': [{'key': 'mlflow.runName', 'value': run_name}]
+        })['run']
+        run_id = run['info']['run_id']
+        self.run_experiments[run_id] = experiment_id
+        return run_id
+    
+    def log_batch(self, run_id: str, metrics: List[Dict] = (), params: List[Dict] = (),
+                  tags: List[Dict] = ()):
+        """Send metrics, params and tags in one runs/log-batch request"""
+        self._call('POST', 'runs/log-batch', {
+            'run_id': run_id,
+            'metrics': list(metrics),
+            'params': list(params),
+            'tags': list(tags)
+        })
+    
+    def update_run(self, run_id: str, status: str, end_time: int = None):
+        """Set the final status and end time"""
+        self._call('POST', 'runs/update', {'run_id': run_id, 'status': status,
+                                           'end_time': end_time or _now_ms()})
+        self.run_experiments.pop(run_id, None)
+    
+    def log_artifact(self, run_id: str, local_path: str, artifact_path: str = None):
+        """Upload a file without reading it into memory"""
+        relative = '/'.join(p for p in (artifact_path, os.path.basename(local_path)) if p)
+        experiment_id = self.run_experiments[run_id]
+        url = (f"{self.base}/api/2.0/mlflow-artifacts/artifacts/"
+               f"{experiment_id}/{run_id}/artifacts/{urllib.parse.quote(relative)}")
+        with open(local_path, 'rb') as f:
+            # A file body with a known length is sent by http.client in blocks
+            request = urllib.request.Request(url, data=f, method='PUT', headers={
+                'Content-Type': 'application/octet-stream',
+                'Content-Length': str(os.path.getsize(local_path))
+            })
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+
+
+def create_store(tracking_uri: str):
+    """File store for paths and file: URIs, REST store for http(s) URIs"""
+    if tracking_uri.startswith(('http://', 'https://')):
+        return RestStore(tracking_uri)
+    if tracking_uri.startswith('file:'):
+        tracking_uri = urllib.parse.urlparse(tracking_uri).path or tracking_uri[len('file:'):]
+    return FileStore(tracking_uri)
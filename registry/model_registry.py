@@ -0,0 +1,97 @@
+"""Model registry: stage pointers per model name with cached, version-stamped reads"""
+import sys
+import os
+# Add project root to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from shared.database import DEFAULT_MODEL_NAME, MODEL_STAGES, DatabaseManager
+from shared.logger import setup_logger
+
+logger = setup_logger("model_registry")
+
+
+class ModelRegistry:
+    """Resolves a model name's stages to registered versions from memory
+    
+    Each (model name, stage) is one pointer row in ``model_pointers``;
+    moving a stage bumps that row's generation, and the sum over the
+    name's rows is the version stamp. ``resolve`` only reads the cached
+    pointers. A background thread (``start``) reads the stamp every
+    ``check_interval`` seconds, reloads the pointers only when it moved,
+    and then calls the ``on_change`` listeners with (previous, current).
+    """
+    
+    def __init__(self, db: DatabaseManager = None, model_name: str = DEFAULT_MODEL_NAME,
+                 check_interval: float = 5.0):
+        self.db = db or DatabaseManager()
+        self.model_name = model_name
+        self.check_interval = check_interval
+        self.lock = threading.Lock()
+        self.generation = None  # stamp of the cached pointers, None before the first load
+        self.pointers: Dict[str, Dict] = {}
+        self.listeners = []
+        self.running = False
+        self.thread = None
+    
+    def start(self):
+        """Start the background stamp checks"""
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True, name="registry-watch")
+        self.thread.start()
+        logger.info(f"Watching registry {self.model_name} (every {self.check_interval}s)")
+    
+    def stop(self):
+        """Stop the background stamp checks"""
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=self.check_interval + 1)
+    
+    def _run(self):
+        """Check the stamp until stopped"""
+        while self.running:
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Registry check failed: {e}")
+            time.sleep(self.check_interval)
+    
+    def resolve(self, stage: str = 'production') -> Optional[Dict]:
+        """Registered model holding a stage, or None; loads the pointers only on first use"""
+        if self.generation is None:
+            self.refresh()
+        return self.pointers.get(stage)
+    
+    def refresh(self) -> bool:
+        """Reload the pointers if the stamp moved; returns True if they changed"""
+        with self.lock:
+            generation = self.db.get_registry_generation(self.model_name)
+            if generation == self.generation:
+                return False
+            generation, pointers = self.db.get_model_pointers(self.model_name)
+            previous, self.pointers, self.generation = self.pointers, pointers, generation
+        versions = {stage: pointer['model_version'] for stage, pointer in pointers.items()}
+        logger.info(f"Registry {self.model_name} at generation {generation}: {versions}")
+        for listener in self.listeners:
+            try:
+                listener(previous, pointers)
+            except Exception as e:
+                logger.error(f"Registry listener failed: {e}")
+        return True
+    
+    def on_change(self, listener: Callable[[Dict, Dict], None]):
+        """Call ``listener(previous, current)`` whenever the pointers change"""
+        self.listeners.append(listener)
+    
+    def promote(self, model_version: str, stage: str) -> int:
+        """Move a version to a stage and pick the change up here immediately"""
+        if stage not in MODEL_STAGES:
+            raise ValueError(f"Unknown model stage: {stage}")
+        generation = self.db.set_model_stage(model_version, stage)
+        self.refresh()
+        return generation
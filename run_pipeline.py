@@ -19,7 +19,9 @@ import numpy as np
 import requests
 import time
 from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import LabelEncoder, StandardScaler
+from sklearn.preprocessing import LabelEncoder
+
+from ml.training.preprocessing import Preprocessor
 
 # API endpoints
 BASE_URL_INGESTION = "http://localhost:8001"
@@ -98,38 +100,28 @@ def load_and_preprocess(csv_path: str, target_column: str):
     if before != after:
         print(f"✓ Removed {before - after} duplicate rows")
     
-    # Handle missing values
-    numeric_cols = df_processed.select_dtypes(include=['int64', 'float64']).columns
-    categorical_cols = df_processed.select_dtypes(include=['object', 'category', 'bool']).columns
-    
-    for col in numeric_cols:
-        if df_processed[col].isnull().sum() > 0:
-            df_processed[col] = df_processed[col].fillna(df_processed[col].median())
-            print(f"✓ Filled missing values in '{col}' with median")
-    
-    for col in categorical_cols:
-        if df_processed[col].isnull().sum() > 0:
-            df_processed[col] = df_processed[col].fillna(df_processed[col].mode()[0])
-            print(f"✓ Filled missing values in '{col}' with mode")
-    
-    # Encode categorical columns
-    encoders = {}
-    for col in categorical_cols:
-        le = LabelEncoder()
-        df_processed[col] = le.fit_transform(df_processed[col].astype(str))
-        encoders[col] = le
-        print(f"✓ Encoded '{col}' ({len(le.classes_)} categories)")
-    
-    # Separate features and target
-    X = df_processed.drop(target_column, axis=1).values
-    y = df_processed[target_column].values
-    
-    # Scale numeric features
-    scaler = StandardScaler()
-    X = scaler.fit_transform(X)
-    print(f"✓ Scaled features")
-    
-    feature_names = [c for c in df_processed.columns if c != target_column]
+    # Fill missing values, encode categoricals and scale, as one fitted
+    # preprocessor that ships with the model and is applied at serve time
+    features = df_processed.drop(target_column, axis=1)
+    preprocessor = Preprocessor.fit(features)
+    for col in features.columns:
+        if features[col].isnull().sum() > 0:
+            how = "mode" if col in preprocessor.categorical else "median"
+            print(f"✓ Filling missing values in '{col}' with {how}")
+    for col, categories in preprocessor.categorical.items():
+        print(f"✓ Encoding '{col}' ({len(categories)} categories)")
+    X = preprocessor.transform(features)
+    print(f"✓ Scaled features (preprocessor {preprocessor.version})")
+    
+    y = df_processed[target_column]
+    if not pd.api.types.is_numeric_dtype(y) or pd.api.types.is_bool_dtype(y):
+        y = y.fillna(y.mode()[0]).astype(str)
+        y = LabelEncoder().fit_transform(y)
+    else:
+        y = y.fillna(y.median())
+    y = np.asarray(y)
+    
+    feature_names = list(features.columns)
     
     # Target distribution
     unique, counts = np.unique(y, return_counts=True)
@@ -137,7 +129,20 @@ def load_and_preprocess(csv_path: str, target_column: str):
     for u, c in zip(unique, counts):
         print(f"  Class {u}: {c} samples ({c/len(y)*100:.1f}%)")
     
-    return X, y, feature_names
+    return X, y, feature_names, preprocessor, features.reset_index(drop=True)
+
+
+def register_preprocessor(preprocessor):
+    """Register the preprocessor so retrained models ship with it"""
+    try:
+        response = requests.post(f"{BASE_URL_INGESTION}/preprocessor",
+                                 json=preprocessor.to_dict(), timeout=10)
+        if response.status_code == 200:
+            print(f"✓ Registered preprocessor {preprocessor.version}")
+        else:
+            print(f"✗ Preprocessor registration failed")
+    except Exception as e:
+        print(f"✗ Preprocessor registration error - {str(e)}")
 
 
 def ingest_data(X_train, y_train, batch_size=20):
@@ -180,22 +185,23 @@ def ingest_data(X_train, y_train, batch_size=20):
     time.sleep(5)
 
 
-def make_predictions(X_test, y_test, batch_size=10):
-    """Make predictions on test data"""
+def make_predictions(raw_test, y_test, batch_size=10):
+    """Make predictions on raw test rows; the service applies the model's preprocessor"""
     print_section("MAKING PREDICTIONS")
     
-    print(f"Test samples: {len(X_test)}")
+    print(f"Test samples: {len(raw_test)}")
     
     all_predictions = []
-    total_batches = (len(X_test) + batch_size - 1) // batch_size
+    total_batches = (len(raw_test) + batch_size - 1) // batch_size
     
-    for i in range(0, len(X_test), batch_size):
-        batch_X = X_test[i:i+batch_size]
+    for i in range(0, len(raw_test), batch_size):
+        batch = raw_test.iloc[i:i+batch_size].astype(object)
+        records = batch.where(batch.notna(), None).to_dict('records')
         
         try:
             response = requests.post(
                 f"{BASE_URL_PREDICTION}/predict",
-                json={'features': batch_X.tolist()},
+                json={'records': records},
                 timeout=10
             )
             
@@ -315,12 +321,13 @@ Examples:
         return
     
     # Load and preprocess data
-    X, y, feature_names = load_and_preprocess(args.data, args.target)
+    X, y, feature_names, preprocessor, raw = load_and_preprocess(args.data, args.target)
     
     # Split data
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=args.test_size, random_state=42
+    train_idx, test_idx = train_test_split(
+        np.arange(len(y)), test_size=args.test_size, random_state=42
     )
+    X_train, X_test, y_train, y_test = X[train_idx], X[test_idx], y[train_idx], y[test_idx]
     
     print_section("DATA SPLIT")
     print(f"Training: {len(X_train)} samples")
@@ -328,10 +335,11 @@ Examples:
     
     try:
         # Ingest training data
+        register_preprocessor(preprocessor)
         ingest_data(X_train, y_train, args.batch_size)
         
         # Make predictions
-        predictions = make_predictions(X_test, y_test)
+        predictions = make_predictions(raw.iloc[test_idx], y_test)
         
         # Drift detection (optional)
         if not args.no_drift:
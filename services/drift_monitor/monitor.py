@@ -6,19 +6,39 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../.
 
 import time
 import numpy as np
-from threading import Thread
 
 from shared.config import Config
 from shared.logger import setup_logger
 from shared.database import DatabaseManager
 from shared.redis_client import RedisClient
+from shared.timeseries import bucket_rows
 from ml.evaluation.drift_detector import DriftDetector
+from ml.evaluation.concept_drift import ConceptDriftDetector, window_start
+from ml.evaluation.segmented_drift import SegmentedDriftDetector
+from registry.model_registry import ModelRegistry
+from services.drift_monitor.scheduler import DriftCheckScheduler, MonitorTarget
 
 logger = setup_logger("drift_monitor")
 config = Config()
 db = DatabaseManager()
 redis_client = RedisClient(config.redis.host, config.redis.port)
-drift_detector = DriftDetector(config.drift.threshold, config.drift.window_size)
+registry = ModelRegistry(db, config.registry.model_name, config.registry.check_interval)
+drift_detector = DriftDetector(config.drift.threshold, config.drift.window_size,
+                               n_jobs=config.drift.n_jobs,
+                               parallel_min_features=config.drift.parallel_min_features)
+concept_detector = ConceptDriftDetector(
+    psi_threshold=config.drift.output_psi_threshold,
+    accuracy_drop_threshold=config.drift.accuracy_drop_threshold,
+    confidence_bins=config.drift.confidence_bins,
+    min_labeled_samples=config.drift.min_labeled_samples
+)
+
+def cache_reference_data(data: np.ndarray, feature_names: list = None):
+    """Cache the reference window, with its feature names, for the monitor to load"""
+    redis_client.set('reference_data', {
+        'data': np.asarray(data).tolist(),
+        'feature_names': list(feature_names) if feature_names is not None else None
+    })
 
 class DriftMonitor:
     """Monitors for data drift and triggers retraining"""
@@ -26,49 +46,94 @@ class DriftMonitor:
     def __init__(self):
         self.running = False
         self.reference_data = None
+        self.rows_seen = redis_client.get('prediction_buffer:rows') or 0
+        self.scheduler = None
+        self.segment_detector = None
+        if config.drift.segment_column:
+            column = config.drift.segment_column
+            self.segment_detector = SegmentedDriftDetector(
+                int(column) if column.isdigit() else column,
+                threshold=config.drift.threshold,
+                min_segment_samples=config.drift.min_segment_samples
+            )
         
     def load_reference_data(self):
-        """Load reference data from database"""
+        """Load reference data and its feature names from the cache
+        
+        The cache holds ``{'data': rows, 'feature_names': names}`` (see
+        ``cache_reference_data``). A bare row list is still accepted; its
+        features are unnamed, so a segment column can then only be an index.
+        """
         # In production, load from feature store
         logger.info("Loading reference data...")
         # For now, use cached data
         cached = redis_client.get('reference_data')
-        if cached:
-            self.reference_data = np.array(cached)
-            drift_detector.set_reference(self.reference_data)
-            logger.info(f"Reference data loaded: {self.reference_data.shape}")
-        else:
+        if not cached:
             logger.warning("No reference data found")
+            return
+        
+        if isinstance(cached, dict):
+            reference, feature_names = np.array(cached['data']), cached.get('feature_names')
+        else:
+            reference, feature_names = np.array(cached), None
+        drift_detector.set_reference(reference, feature_names)
+        if self.segment_detector:
+            try:
+                self.segment_detector.set_reference(reference, drift_detector.feature_names)
+            except (ValueError, IndexError):
+                logger.error(f"Segment column {self.segment_detector.segment_column!r} is not a reference "
+                             f"feature; segment drift disabled")
+                self.segment_detector = None
+        self.reference_data = reference
+        logger.info(f"Reference data loaded: {self.reference_data.shape}")
             
     def collect_recent_data(self) -> np.ndarray:
-        """Collect recent predictions from buffer"""
-        buffer = []
-        
-        # Get from Redis prediction buffer
-        for _ in range(config.drift.window_size):
-            item = redis_client.rpop('prediction_buffer')
-            if item:
-                buffer.extend(item['features'])
-            else:
+        """Collect the most recent window of rows from the prediction buffer
+        
+        The service lpushes whole batches, so the buffer is drained in one
+        pop from the head, newest batch first. Batches are kept until they
+        cover ``window_size`` rows; older batches are dropped on purpose:
+        their rows were already counted as seen, and checking them later
+        would mix stale traffic into the next window.
+        """
+        items = redis_client.lpop('prediction_buffer', count=config.drift.buffer_max_size)
+        if not items:
+            return None
+        
+        window, rows, batches = config.drift.window_size, 0, []
+        for item in items:
+            # The newest rows of a batch that overshoots the window
+            batch = np.asarray(item['features'], dtype=float)[-(window - rows):]
+            batches.append(batch)
+            rows += len(batch)
+            if rows >= window:
                 break
         
-        if buffer:
-            return np.array(buffer)
-        return None
+        dropped = sum(len(item['features']) for item in items) - rows
+        if dropped:
+            logger.debug(f"Dropped {dropped} buffered rows older than the drift window")
+        # Oldest first, as the rows were served
+        return np.vstack(batches[::-1])
+        
+    def pending_rows(self) -> int:
+        """Rows published to the prediction buffer since the last check"""
+        published = redis_client.get('prediction_buffer:rows') or 0
+        return published - self.rows_seen
         
-    def check_drift(self):
-        """Check for drift in recent data"""
+    def check_drift(self) -> int:
+        """Check for drift in recent data; returns the number of rows checked"""
         if self.reference_data is None:
             self.load_reference_data()
             if self.reference_data is None:
-                return
+                return 0
         
         # Collect recent data
+        self.rows_seen = redis_client.get('prediction_buffer:rows') or 0
         recent_data = self.collect_recent_data()
         
         if recent_data is None or len(recent_data) < config.drift.min_samples:
             logger.debug(f"Insufficient data for drift check: {len(recent_data) if recent_data is not None else 0}")
-            return
+            return 0
         
         logger.info(f"Checking drift on {len(recent_data)} samples...")
         
@@ -90,20 +155,110 @@ class DriftMonitor:
             drift_metrics=drift_metrics,
             action_taken='retraining_triggered' if drift_detected else 'none'
         )
+        db.record_metric_buckets(bucket_rows({'drift_score': (1, drift_score, drift_score)}, time.time()))
+        
+        if self.segment_detector:
+            self.check_segment_drift(recent_data)
         
         if drift_detected:
             logger.warning(f"⚠️  DRIFT DETECTED! Score: {drift_score:.2f}, "
                          f"Affected features: {len(affected_features)}")
             
             # Trigger retraining
-            self.trigger_retraining(drift_metrics)
+            self.trigger_retraining(drift_metrics, drift_score)
         else:
             logger.info(f"✅ No drift detected. Score: {drift_score:.2f}")
+        
+        return len(recent_data)
+            
+    def check_segment_drift(self, recent_data: np.ndarray):
+        """Check every cohort of the segment column and log one event per segment"""
+        _, segment_metrics = self.segment_detector.detect_drift(recent_data)
+        
+        events = []
+        for segment, metrics in segment_metrics['segments'].items():
+            affected = [name for name, m in metrics['features'].items() if m['drift_detected']]
+            events.append((
+                metrics['drift_detected'],
+                metrics['drift_score'],
+                affected,
+                metrics,
+                'segment_alert' if metrics['drift_detected'] else 'none',
+                f"{segment_metrics['segment_column']}={segment}"
+            ))
+        
+        if events:
+            db.log_drift_events(events)
+        
+        drifting = segment_metrics['summary']['drifting_segments']
+        if drifting:
+            logger.warning(f"⚠️  Segment drift on {segment_metrics['segment_column']}: {drifting}")
             
-    def trigger_retraining(self, drift_metrics: dict):
-        """Trigger retraining job"""
+    def check_concept_drift(self) -> int:
+        """Check prediction outputs and labeled performance for concept drift
+        
+        Only the production model's outputs and labels are compared, so
+        canary/shadow traffic and a newly deployed model are not mistaken for
+        drift. Returns the number of predictions in the current window.
+        """
+        production = registry.resolve('production')
+        if production is None:
+            logger.debug("No production model; skipping concept drift check")
+            return 0
+        version = production['model_version']
+        
+        window = config.drift.performance_window
+        current_since = window_start(time.time(), window)
+        since = current_since - window * config.drift.performance_lookback
+        
+        output_metrics = concept_detector.output_drift(db.get_output_distribution(since, version), current_since)
+        performance_metrics = concept_detector.performance_drift(db.get_confusion_counts(since, version),
+                                                                 current_since)
+        
+        if output_metrics['current_samples'] < config.drift.min_samples:
+            logger.debug(f"Insufficient predictions for concept drift check: {output_metrics['current_samples']}")
+            return 0
+        
+        affected = []
+        if output_metrics['drift_detected']:
+            affected.append('prediction_output')
+        if performance_metrics['drift_detected']:
+            affected.append('labeled_performance')
+        
+        drift_detected = bool(affected)
+        drift_score = max(output_metrics['class_psi'], output_metrics['confidence_psi'])
+        drift_metrics = {
+            'type': 'concept',
+            'output': output_metrics,
+            'performance': {
+                'reference': performance_metrics['reference'],
+                'current': performance_metrics['current']
+            }
+        }
+        
+        db.log_drift_event(
+            drift_detected=drift_detected,
+            drift_score=drift_score,
+            affected_features=affected,
+            drift_metrics=drift_metrics,
+            action_taken='retraining_triggered' if drift_detected else 'none'
+        )
+        db.record_metric_buckets(bucket_rows({'concept_psi': (1, drift_score, drift_score)}, time.time()))
+        
+        if drift_detected:
+            logger.warning(f"⚠️  CONCEPT DRIFT DETECTED! Signals: {affected}")
+            self.trigger_retraining(drift_metrics, drift_score)
+        else:
+            logger.info(f"✅ No concept drift detected. Output PSI: {drift_score:.3f}")
+        
+        return output_metrics['current_samples']
+            
+    def trigger_retraining(self, drift_metrics: dict, drift_score: float = 0.0):
+        """Trigger retraining job; the worker coalesces triggers and ranks them by drift score"""
         job_data = {
             'trigger': 'drift_detected',
+            'model': 'default',
+            'drift_score': drift_score,
             'drift_metrics': drift_metrics,
             'timestamp': time.time()
         }
@@ -112,21 +267,42 @@ class DriftMonitor:
         logger.info("🔄 Retraining job triggered")
         
     def run(self):
-        """Main monitoring loop"""
+        """Main monitoring loop
+        
+        Feature drift is checked as soon as ``min_samples`` new rows are buffered
+        or ``check_interval`` has passed; concept drift runs on the interval.
+        Polling backs off while traffic is idle.
+        """
         self.running = True
+        self.scheduler = DriftCheckScheduler(
+            min_poll_interval=config.drift.min_poll_interval,
+            max_poll_interval=config.drift.max_poll_interval,
+            error_backoff=config.drift.error_backoff,
+            max_workers=config.drift.scheduler_workers
+        )
+        self.scheduler.add_target(MonitorTarget(
+            name='feature_drift',
+            check=self.check_drift,
+            pending_rows=self.pending_rows,
+            min_samples=config.drift.min_samples,
+            max_interval=config.drift.check_interval
+        ))
+        self.scheduler.add_target(MonitorTarget(
+            name='concept_drift',
+            check=self.check_concept_drift,
+            max_interval=config.drift.check_interval
+        ))
+        registry.start()
         logger.info("Drift monitor started")
         
-        while self.running:
-            try:
-                self.check_drift()
-                time.sleep(config.drift.check_interval)
-            except Exception as e:
-                logger.error(f"Error in drift monitoring: {str(e)}")
-                time.sleep(60)
+        self.scheduler.run(report_every=config.drift.check_interval)
                 
     def stop(self):
         """Stop monitoring"""
         self.running = False
+        if self.scheduler:
+            self.scheduler.stop()
+        registry.stop()
         logger.info("Drift monitor stopped")
 
 if __name__ == '__main__':
@@ -0,0 +1,158 @@
+"""Adaptive scheduler for drift checks"""
+import sys
+import os
+# Add project root to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional
+
+from shared.logger import setup_logger
+
+logger = setup_logger("drift_scheduler")
+
+
+@dataclass
+class MonitorTarget:
+    """A monitored model or feature group
+    
+    ``check`` runs one drift check and returns the number of rows it evaluated.
+    ``pending_rows`` returns how many new rows arrived since the last check, or
+    None when the target has no row count and only runs on the max interval.
+    """
+    name: str
+    check: Callable[[], int]
+    pending_rows: Optional[Callable[[], Optional[int]]] = None
+    min_samples: int = 100
+    max_interval: float = 300.0
+    last_check: float = field(default_factory=time.time)
+    not_before: float = 0.0
+    running: bool = False
+    stats: Dict = field(default_factory=lambda: {
+        'checks_run': 0,
+        'checks_skipped': 0,
+        'checks_failed': 0,
+        'rows_checked': 0,
+        'last_latency': None,
+        'total_latency': 0.0
+    })
+
+
+class DriftCheckScheduler:
+    """Triggers checks on sample count or max interval, backing off when idle"""
+    
+    def __init__(self, min_poll_interval: float = 5.0, max_poll_interval: float = 60.0,
+                 error_backoff: float = 60.0, max_workers: int = 2):
+        self.min_poll_interval = min_poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.error_backoff = error_backoff
+        self.poll_interval = min_poll_interval
+        self.targets: Dict[str, MonitorTarget] = {}
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="drift_check")
+        self.running = False
+    
+    def add_target(self, target: MonitorTarget):
+        """Register a model or feature group to monitor"""
+        self.targets[target.name] = target
+        logger.info(f"Monitoring target registered: {target.name}")
+    
+    def _run_check(self, target: MonitorTarget):
+        """Run one check and record its latency and row count
+        
+        ``running`` is cleared last, so a target is never resubmitted before
+        its stats and error backoff are recorded.
+        """
+        start = time.perf_counter()
+        try:
+            rows = target.check() or 0
+            latency = time.perf_counter() - start
+            if rows:
+                target.stats['checks_run'] += 1
+                target.stats['rows_checked'] += rows
+                target.stats['last_latency'] = latency
+                target.stats['total_latency'] += latency
+            else:
+                target.stats['checks_skipped'] += 1
+            logger.debug(f"Check {target.name}: rows={rows}, latency={latency:.3f}s")
+        except Exception as e:
+            logger.error(f"Drift check failed for {target.name}: {str(e)}")
+            target.stats['checks_failed'] += 1
+            target.not_before = time.time() + self.error_backoff
+        finally:
+            target.last_check = time.time()
+            target.running = False
+    
+    def tick(self, now: float = None) -> int:
+        """Submit every due target; returns the number of checks submitted"""
+        now = now or time.time()
+        submitted = 0
+        saw_traffic = False
+        
+        for target in self.targets.values():
+            if target.running or now < target.not_before:
+                continue
+            
+            pending = target.pending_rows() if target.pending_rows else None
+            if pending:
+                saw_traffic = True
+            
+            enough_rows = pending is not None and pending >= target.min_samples
+            interval_elapsed = now - target.last_check >= target.max_interval
+            
+            if not (enough_rows or interval_elapsed):
+                continue
+            
+            if pending is not None and not enough_rows:
+                # Max interval hit but too little data; leave the rows buffered
+                target.stats['checks_skipped'] += 1
+                target.last_check = now
+                continue
+            
+            target.running = True
+            self.executor.submit(self._run_check, target)
+            submitted += 1
+        
+        # Back off while idle, snap back as soon as traffic shows up
+        if saw_traffic or submitted:
+            self.poll_interval = self.min_poll_interval
+        else:
+            self.poll_interval = min(self.poll_interval * 2, self.max_poll_interval)
+        
+        return submitted
+    
+    def get_stats(self) -> Dict[str, Dict]:
+        """Per-target check latency, rows per check and skipped checks"""
+        report = {}
+        for name, target in self.targets.items():
+            stats = target.stats
+            runs = stats['checks_run']
+            report[name] = {
+                'checks_run': runs,
+                'checks_skipped': stats['checks_skipped'],
+                'checks_failed': stats['checks_failed'],
+                'last_latency': stats['last_latency'],
+                'mean_latency': stats['total_latency'] / runs if runs else None,
+                'rows_per_check': stats['rows_checked'] / runs if runs else None
+            }
+        return report
+    
+    def run(self, report_every: float = 300.0):
+        """Scheduler loop"""
+        self.running = True
+        last_report = time.time()
+        
+        while self.running:
+            self.tick()
+            
+            if time.time() - last_report >= report_every:
+                logger.info(f"Drift scheduler stats: {self.get_stats()}")
+                last_report = time.time()
+            
+            time.sleep(self.poll_interval)
+    
+    def stop(self):
+        """Stop scheduling and wait for in-flight checks"""
+        self.running = False
+        self.executor.shutdown(wait=True)
@@ -7,11 +7,13 @@ from flask import Flask, request, jsonify, render_template_string
 from flask_cors import CORS
 import numpy as np
 import json
+import time
 
 from shared.config import Config
 from shared.logger import setup_logger
 from shared.database import DatabaseManager
 from shared.redis_client import RedisClient
+from ml.training.preprocessing import Preprocessor
 
 app = Flask(__name__)
 CORS(app)
@@ -58,6 +60,7 @@ NAV_HTML = """
     <a href="/stats" class="{stats}">Stats</a>
     <a href="/ingest/batch" class="{batch}">Batch Ingest</a>
     <a href="/ingest/stream" class="{stream}">Stream Ingest</a>
+    <a href="/ingest/labels" class="{labels}">Label Ingest</a>
 </div>
 """
 
@@ -70,7 +73,7 @@ def index():
     <html>
     <head><title>Ingestion API - Home</title>{BASE_STYLE}</head>
     <body>
-        {NAV_HTML.format(home='active', health='', stats='', batch='', stream='')}
+        {NAV_HTML.format(home='active', health='', stats='', batch='', stream='', labels='')}
         <div class="container">
             <h1>Data Ingestion API</h1>
             <span class="status">Running</span>
@@ -94,6 +97,8 @@ def index():
                 <tr><td>GET</td><td>/stats</td><td>Queue statistics</td></tr>
                 <tr><td>POST</td><td>/ingest/batch</td><td>Ingest batch data</td></tr>
                 <tr><td>POST</td><td>/ingest/stream</td><td>Ingest single sample</td></tr>
+                <tr><td>POST</td><td>/ingest/labels</td><td>Attach delayed ground-truth labels</td></tr>
+                <tr><td>POST</td><td>/preprocessor</td><td>Register the preprocessor ingested features were built with</td></tr>
             </table>
         </div>
     </body>
@@ -112,7 +117,7 @@ def health_check():
     <html>
     <head><title>Ingestion API - Health</title>{BASE_STYLE}</head>
     <body>
-        {NAV_HTML.format(home='', health='active', stats='', batch='', stream='')}
+        {NAV_HTML.format(home='', health='active', stats='', batch='', stream='', labels='')}
         <div class="container">
             <h1>Health Check</h1>
             <div class="stats">
@@ -151,7 +156,7 @@ def get_stats():
     <html>
     <head><title>Ingestion API - Stats</title>{BASE_STYLE}</head>
     <body>
-        {NAV_HTML.format(home='', health='', stats='active', batch='', stream='')}
+        {NAV_HTML.format(home='', health='', stats='active', batch='', stream='', labels='')}
         <div class="container">
             <h1>Queue Statistics</h1>
             <div class="stats">
@@ -173,6 +178,12 @@ def get_stats():
     return html
 
 
+def current_preprocessor_version():
+    """Version of the most recently registered preprocessor, or None"""
+    spec = db.get_current_preprocessor()
+    return Preprocessor.from_dict(spec).version if spec else None
+
+
 @app.route('/ingest/batch', methods=['GET', 'POST'])
 def ingest_batch():
     result_html = ""
@@ -186,13 +197,22 @@ def ingest_batch():
             
             X = np.array(data['features'])
             y = data.get('labels')
+            # The preprocessor the features were built with; defaults to the current one
+            preprocessor = data.get('preprocessor_version') or current_preprocessor_version()
             
+            error = None
             if len(X.shape) != 2:
+                error = 'Features must be 2D array'
+            elif preprocessor is not None and db.get_preprocessor(preprocessor) is None:
+                error = f'Unknown preprocessor version: {preprocessor}'
+            
+            if error:
                 if request.is_json:
-                    return jsonify({'status': 'error', 'message': 'Features must be 2D array'}), 400
-                result_html = '<div class="result error">Error: Features must be 2D array</div>'
+                    return jsonify({'status': 'error', 'message': error}), 400
+                result_html = f'<div class="result error">Error: {error}</div>'
             else:
-                batch_data = {'features': X.tolist(), 'labels': y, 'batch_id': data.get('batch_id')}
+                batch_data = {'features': X.tolist(), 'labels': y, 'batch_id': data.get('batch_id'),
+                              'preprocessor': preprocessor, 'timestamp': time.time()}
                 redis_client.lpush('data_queue', batch_data)
                 logger.info(f"Ingested batch: {X.shape[0]} samples")
                 
@@ -216,7 +236,7 @@ def ingest_batch():
     <html>
     <head><title>Ingestion API - Batch Ingest</title>{BASE_STYLE}</head>
     <body>
-        {NAV_HTML.format(home='', health='', stats='', batch='active', stream='')}
+        {NAV_HTML.format(home='', health='', stats='', batch='active', stream='', labels='')}
         <div class="container">
             <h1>Batch Data Ingestion</h1>
             <p>Ingest multiple samples at once</p>
@@ -280,7 +300,7 @@ def ingest_stream():
     <html>
     <head><title>Ingestion API - Stream Ingest</title>{BASE_STYLE}</head>
     <body>
-        {NAV_HTML.format(home='', health='', stats='', batch='', stream='active')}
+        {NAV_HTML.format(home='', health='', stats='', batch='', stream='active', labels='')}
         <div class="container">
             <h1>Stream Data Ingestion</h1>
             <p>Ingest a single sample</p>
@@ -303,6 +323,92 @@ def ingest_stream():
     return html
 
 
+@app.route('/ingest/labels', methods=['GET', 'POST'])
+def ingest_labels():
+    result_html = ""
+    
+    if request.method == 'POST':
+        try:
+            if request.is_json:
+                data = request.json
+            else:
+                data = json.loads(request.form.get('data', '{}'))
+            
+            prediction_ids = data['prediction_ids']
+            labels = data['labels']
+            
+            error = None
+            if not isinstance(prediction_ids, list) or not isinstance(labels, list) or len(prediction_ids) != len(labels):
+                error = 'prediction_ids and labels must be lists of equal length'
+            else:
+                # bool is an int subclass; a wrong class index would land in another confusion cell
+                invalid = [label for label in labels if isinstance(label, bool) or not isinstance(label, int)
+                           or not 0 <= label < config.model.n_classes]
+                if invalid:
+                    error = f'labels must be class indices 0..{config.model.n_classes - 1}, got {invalid[:5]}'
+            
+            if error:
+                if request.is_json:
+                    return jsonify({'status': 'error', 'message': error}), 400
+                result_html = f'<div class="result error">Error: {error}</div>'
+            else:
+                labeled = db.update_true_labels(prediction_ids, labels, config.drift.performance_window)
+                logger.info(f"Ingested labels: {labeled}/{len(labels)} predictions updated")
+                
+                response = {'status': 'success', 'labels_received': len(labels), 'predictions_labeled': labeled}
+                if request.is_json:
+                    return jsonify(response)
+                result_html = f'<div class="result success">{json.dumps(response, indent=2)}</div>'
+        except Exception as e:
+            if request.is_json:
+                return jsonify({'status': 'error', 'message': str(e)}), 500
+            result_html = f'<div class="result error">Error: {str(e)}</div>'
+    
+    sample_data = json.dumps({
+        "prediction_ids": [101, 102, 103],
+        "labels": [0, 1, 1]
+    }, indent=2)
+    
+    html = f"""
+    <!DOCTYPE html>
+    <html>
+    <head><title>Ingestion API - Label Ingest</title>{BASE_STYLE}</head>
+    <body>
+        {NAV_HTML.format(home='', health='', stats='', batch='', stream='', labels='active')}
+        <div class="container">
+            <h1>Delayed Label Ingestion</h1>
+            <p>Attach ground-truth labels to previously served predictions</p>
+            
+            <form method="POST">
+                <div class="form-group">
+                    <label>Data (JSON format):</label>
+                    <textarea name="data" placeholder="Enter JSON data...">{sample_data}</textarea>
+                </div>
+                <button type="submit">Ingest Labels</button>
+            </form>
+            {result_html}
+            
+            <h2>Expected Format</h2>
+            <div class="result">{sample_data}</div>
+        </div>
+    </body>
+    </html>
+    """
+    return html
+
+
+
+@app.route('/preprocessor', methods=['POST'])
+def register_preprocessor():
+    """Register the fitted preprocessor behind subsequently ingested features"""
+    try:
+        preprocessor = Preprocessor.from_dict(request.json)
+        db.save_preprocessor(preprocessor.version, preprocessor.to_dict())
+        logger.info(f"Registered preprocessor {preprocessor.version}")
+        return jsonify({'status': 'success', 'version': preprocessor.version})
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+
 if __name__ == '__main__':
     logger.info(f"Starting Ingestion API on port {config.service.ingestion_port}")
     app.run(host='0.0.0.0', port=config.service.ingestion_port, debug=False)
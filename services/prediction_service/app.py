@@ -6,15 +6,18 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../.
 from flask import Flask, request, jsonify, render_template_string
 from flask_cors import CORS
 import numpy as np
-import joblib
 import time
-import glob
 import json
 
 from shared.config import Config
 from shared.logger import setup_logger
 from shared.database import DatabaseManager
 from shared.redis_client import RedisClient
+from ml.evaluation.concept_drift import OutputDistributionTracker
+from ml.training.model_families import load_serving_artifact
+from shared.timeseries import bucket_rows, prediction_points
+from services.prediction_service.model_router import ModelRouter, ServedModel
+from registry.model_registry import ModelRegistry
 
 app = Flask(__name__)
 CORS(app)
@@ -23,10 +26,24 @@ config = Config()
 logger = setup_logger("prediction_service")
 db = DatabaseManager()
 redis_client = RedisClient(config.redis.host, config.redis.port)
+registry = ModelRegistry(db, config.registry.model_name, config.registry.check_interval)
+output_tracker = OutputDistributionTracker(
+    confidence_bins=config.drift.confidence_bins,
+    window_seconds=config.drift.performance_window
+)
+
+router = ModelRouter(
+    canary_fraction=config.serving.canary_fraction,
+    shadow_workers=config.serving.shadow_workers,
+    shadow_queue_max=config.serving.shadow_queue_max,
+    on_shadow=db.log_shadow_predictions
+)
 
 current_model = None
+current_family = None
 model_version = None
 total_predictions = 0
+buffer_rng = np.random.default_rng()
 
 BASE_STYLE = """
 <style>
@@ -68,31 +85,69 @@ NAV_HTML = """
     <a href="/health" class="{health}">Health</a>
     <a href="/predict" class="{predict}">Predict</a>
     <a href="/reload_model" class="{reload}">Reload Model</a>
+    <a href="/serving" class="{serving}">Serving</a>
 </div>
 """
 
 
 def load_model():
-    global current_model, model_version
+    global current_model, current_family, model_version
     
-    model_files = glob.glob('models/*.pkl')
-    if not model_files:
-        logger.warning("No model files found")
+    # Serve the production version; before any deployment, the newest registered one
+    active = registry.resolve('production') or db.get_latest_model(config.registry.model_name)
+    if active is None or not os.path.exists(active['model_path']):
+        logger.warning("No registered model found")
         return False
-    
-    latest_model = max(model_files, key=os.path.getmtime)
+    latest_model, version = active['model_path'], active['model_version']
     
     try:
-        model_data = joblib.load(latest_model)
-        current_model = model_data['model']
-        model_version = os.path.basename(latest_model).replace('.pkl', '')
-        logger.info(f"Model loaded: {model_version}")
+        current_model, current_family, preprocessor = load_serving_artifact(latest_model)
+        model_version = version
+        router.set_model('primary', ServedModel(model_version, current_model, current_family, preprocessor))
+        logger.info(f"Model loaded: {model_version} ({current_family.name}, "
+                    f"preprocessor {preprocessor.version if preprocessor else None})")
+        
+        for role, configured in (('canary', config.serving.canary_version),
+                                 ('shadow', config.serving.shadow_version)):
+            if configured and router.models[role] is None:
+                router.set_model(role, load_version(configured))
         return True
     except Exception as e:
         logger.error(f"Failed to load model: {e}")
         return False
 
 
+def on_registry_change(previous, pointers):
+    """Swap the primary model when the production pointer moves to another version"""
+    active = pointers.get('production')
+    if active and active['model_version'] != model_version:
+        load_model()
+
+
+def load_version(version: str):
+    """Load a registered model version for canary or shadow serving"""
+    entry = db.get_model(version)
+    if entry is None or entry['model_path'] is None or not os.path.exists(entry['model_path']):
+        logger.warning(f"Model version not found: {version}")
+        return None
+    return ServedModel(version, *load_serving_artifact(entry['model_path']))
+
+
+def publish_to_buffer(X: np.ndarray):
+    """Push a sampled copy of the inference batch to the bounded drift buffer"""
+    rate = config.drift.buffer_sample_rate
+    if rate <= 0:
+        return
+    if rate < 1:
+        X = X[buffer_rng.random(len(X)) < rate]
+        if len(X) == 0:
+            return
+    
+    redis_client.lpush('prediction_buffer', {'features': X.tolist()})
+    redis_client.ltrim('prediction_buffer', 0, config.drift.buffer_max_size - 1)
+    redis_client.incrby('prediction_buffer:rows', len(X))
+
+
 @app.route('/', methods=['GET'])
 def index():
     model_status = "Loaded" if current_model else "Not Loaded"
@@ -103,7 +158,7 @@ def index():
     <html>
     <head><title>Prediction Service - Home</title>{BASE_STYLE}</head>
     <body>
-        {NAV_HTML.format(home='active', health='', predict='', reload='')}
+        {NAV_HTML.format(home='active', health='', predict='', reload='', serving='')}
         <div class="container">
             <h1>Prediction Service</h1>
             <span class="status {status_class}">{model_status}</span>
@@ -125,7 +180,8 @@ def index():
                 <tr><th>Method</th><th>Endpoint</th><th>Description</th></tr>
                 <tr><td>GET</td><td>/health</td><td>Health check</td></tr>
                 <tr><td>GET/POST</td><td>/predict</td><td>Make predictions</td></tr>
-                <tr><td>GET/POST</td><td>/reload_model</td><td>Reload model from disk</td></tr>
+                <tr><td>GET/POST</td><td>/reload_model</td><td>Reload the production model from the registry</td></tr>
+                <tr><td>GET/POST</td><td>/serving</td><td>Canary/shadow versions and per-version stats</td></tr>
             </table>
         </div>
     </body>
@@ -140,7 +196,8 @@ def health_check():
         'status': 'healthy',
         'service': 'prediction_service',
         'model_loaded': current_model is not None,
-        'model_version': model_version
+        'model_version': model_version,
+        'model_family': current_family.name if current_family else None
     }
     
     if request.headers.get('Accept', '').find('application/json') != -1:
@@ -154,7 +211,7 @@ def health_check():
     <html>
     <head><title>Prediction Service - Health</title>{BASE_STYLE}</head>
     <body>
-        {NAV_HTML.format(home='', health='active', predict='', reload='')}
+        {NAV_HTML.format(home='', health='active', predict='', reload='', serving='')}
         <div class="container">
             <h1>Health Check</h1>
             <div class="stats">
@@ -201,31 +258,54 @@ def predict():
                 else:
                     data = json.loads(request.form.get('data', '{}'))
                 
-                X = np.array(data['features'])
-                if len(X.shape) == 1:
-                    X = X.reshape(1, -1)
+                role, served = router.route()
                 
-                start_time = time.time()
-                predictions = current_model.predict(X)
-                probabilities = current_model.predict_proba(X)
-                prediction_time = time.time() - start_time
+                # Raw records go through the preprocessor shipped with the model
+                records = data.get('records')
+                transform_time = 0.0
+                if records is not None:
+                    if isinstance(records, dict):
+                        records = [records]
+                    start = time.perf_counter()
+                    X = served.prepare(records)
+                    transform_time = time.perf_counter() - start
+                else:
+                    X = np.array(data['features'])
+                    if len(X.shape) == 1:
+                        X = X.reshape(1, -1)
+                
+                predictions, probabilities, prediction_time = router.predict(served, X)
                 
                 total_predictions += len(predictions)
                 
-                for i, (pred, prob) in enumerate(zip(predictions, probabilities)):
-                    db.log_prediction(
+                confidences = probabilities.max(axis=1)
+                prediction_ids = []
+                for i, (pred, conf) in enumerate(zip(predictions, confidences)):
+                    prediction_ids.append(db.log_prediction(
                         features=X[i].tolist(),
                         prediction=int(pred),
-                        probability=float(prob.max()),
-                        model_version=model_version
-                    )
+                        probability=float(conf),
+                        model_version=served.version
+                    ))
+                
+                window, class_counts, confidence_counts = output_tracker.update(predictions, confidences)
+                db.record_output_distribution(window, served.version, class_counts, confidence_counts)
+                db.record_metric_buckets(bucket_rows(
+                    prediction_points(predictions, confidences, prediction_time), time.time()
+                ))
+                publish_to_buffer(X)
+                router.mirror(X, predictions, prediction_ids, records)
                 
                 response = {
                     'status': 'success',
+                    'prediction_ids': prediction_ids,
                     'predictions': predictions.tolist(),
                     'probabilities': probabilities.tolist(),
                     'prediction_time': round(prediction_time, 4),
-                    'model_version': model_version
+                    'transform_time': round(transform_time, 4),
+                    'model_version': served.version,
+                    'preprocessor_version': served.preprocessor.version if served.preprocessor else None,
+                    'serving_role': role
                 }
                 
                 if request.is_json:
@@ -268,7 +348,7 @@ def predict():
     <html>
     <head><title>Prediction Service - Predict</title>{BASE_STYLE}</head>
     <body>
-        {NAV_HTML.format(home='', health='', predict='active', reload='')}
+        {NAV_HTML.format(home='', health='', predict='active', reload='', serving='')}
         <div class="container">
             <h1>Make Predictions</h1>
             {model_info}
@@ -296,6 +376,7 @@ def reload_model_endpoint():
     result_html = ""
     
     if request.method == 'POST':
+        registry.refresh()
         success = load_model()
         if success:
             response = {'status': 'success', 'model_version': model_version}
@@ -308,20 +389,20 @@ def reload_model_endpoint():
                 return jsonify(response), 500
             result_html = f'<div class="result error">{json.dumps(response, indent=2)}</div>'
     
-    model_files = glob.glob('models/*.pkl')
-    files_html = "<ul>" + "".join([f"<li>{os.path.basename(f)}</li>" for f in model_files]) + "</ul>" if model_files else "<p>No model files found</p>"
+    stages = {stage: registry.resolve(stage) for stage in ('production', 'staging')}
+    files_html = "<ul>" + "".join([f"<li>{stage}: {entry['model_version']}</li>" for stage, entry in stages.items() if entry]) + "</ul>" if any(stages.values()) else "<p>No staged models</p>"
     
     html = f"""
     <!DOCTYPE html>
     <html>
     <head><title>Prediction Service - Reload Model</title>{BASE_STYLE}</head>
     <body>
-        {NAV_HTML.format(home='', health='', predict='', reload='active')}
+        {NAV_HTML.format(home='', health='', predict='', reload='active', serving='')}
         <div class="container">
             <h1>Reload Model</h1>
             <p>Current model: <strong>{model_version or 'None'}</strong></p>
             
-            <h2>Available Models</h2>
+            <h2>Registry Stages</h2>
             {files_html}
             
             <form method="POST">
@@ -335,7 +416,87 @@ def reload_model_endpoint():
     return html
 
 
+@app.route('/serving', methods=['GET', 'POST'])
+def serving():
+    result_html = ""
+    
+    if request.method == 'POST':
+        data = request.json if request.is_json else request.form
+        role = data.get('role')
+        version = data.get('version') or None
+        fraction = data.get('fraction')
+        try:
+            if role not in ('canary', 'shadow'):
+                raise ValueError("role must be 'canary' or 'shadow'")
+            served = load_version(version) if version else None
+            if version and served is None:
+                raise ValueError(f"Unknown model version: {version}")
+            router.set_model(role, served, float(fraction) if fraction not in (None, '') else None)
+            response = {'status': 'success', 'role': role, 'version': version}
+            if request.is_json:
+                return jsonify(response)
+            result_html = f'<div class="result success">{json.dumps(response, indent=2)}</div>'
+        except Exception as e:
+            if request.is_json:
+                return jsonify({'status': 'error', 'message': str(e)}), 400
+            result_html = f'<div class="result error">Error: {str(e)}</div>'
+    
+    stats = router.get_stats()
+    if request.headers.get('Accept', '').find('application/json') != -1:
+        return jsonify(stats)
+    
+    def fmt(value, digits=2):
+        return '-' if value is None else round(value, digits)
+    
+    rows_html = "".join(
+        f"<tr><td>{version}</td><td>{s['role']}</td><td>{s['requests']}</td><td>{s['rows']}</td>"
+        f"<td>{fmt(s['mean_latency_ms'])}</td><td>{fmt(s['p95_latency_ms'])}</td>"
+        f"<td>{fmt(s['disagreement_rate'], 4)}</td></tr>"
+        for version, s in stats['versions'].items()
+    )
+    
+    html = f"""
+    <!DOCTYPE html>
+    <html>
+    <head><title>Prediction Service - Serving</title>{BASE_STYLE}</head>
+    <body>
+        {NAV_HTML.format(home='', health='', predict='', reload='', serving='active')}
+        <div class="container">
+            <h1>Serving</h1>
+            <p>Canary fraction: <strong>{stats['canary_fraction']}</strong> | Shadow batches dropped: <strong>{stats['shadow_dropped']}</strong></p>
+            
+            <table>
+                <tr><th>Version</th><th>Role</th><th>Requests</th><th>Rows</th><th>Mean ms</th><th>p95 ms</th><th>Disagreement</th></tr>
+                {rows_html}
+            </table>
+            
+            <h2>Set Canary / Shadow</h2>
+            <form method="POST">
+                <div class="form-group">
+                    <label>Role (canary or shadow):</label>
+                    <input name="role" value="shadow">
+                </div>
+                <div class="form-group">
+                    <label>Model version (empty to remove):</label>
+                    <input name="version">
+                </div>
+                <div class="form-group">
+                    <label>Canary fraction:</label>
+                    <input name="fraction" placeholder="0.1">
+                </div>
+                <button type="submit">Apply</button>
+            </form>
+            {result_html}
+        </div>
+    </body>
+    </html>
+    """
+    return html
+
+
 if __name__ == '__main__':
     load_model()
+    registry.on_change(on_registry_change)
+    registry.start()
     logger.info(f"Starting Prediction Service on port {config.service.prediction_port}")
     app.run(host='0.0.0.0', port=config.service.prediction_port, debug=False)
@@ -0,0 +1,164 @@
+"""Multi-model serving: primary, canary and shadow versions"""
+import sys
+import os
+# Add project root to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+import threading
+import time
+import numpy as np
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from shared.logger import setup_logger
+
+logger = setup_logger("model_router")
+
+ROLES = ('primary', 'canary', 'shadow')
+
+
+@dataclass
+class ServedModel:
+    """A loaded model version and its serving counters"""
+    version: str
+    model: Any
+    family: Any
+    preprocessor: Any = None
+    requests: int = 0
+    rows: int = 0
+    total_latency: float = 0.0
+    latencies: deque = field(default_factory=lambda: deque(maxlen=1000))
+    compared_rows: int = 0
+    disagreements: int = 0
+    
+    def prepare(self, records) -> np.ndarray:
+        """Model input from raw records, through the preprocessor shipped with this version"""
+        if self.preprocessor is None:
+            raise ValueError(f"Model {self.version} has no preprocessor; send transformed 'features'")
+        return self.preprocessor.transform(records)
+    
+    def predict(self, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray, float]:
+        """Predictions, probabilities and latency in seconds"""
+        start = time.perf_counter()
+        probabilities = self.family.predict_proba(self.model, X)
+        predictions = self.model.classes_[np.argmax(probabilities, axis=1)]
+        return predictions, probabilities, time.perf_counter() - start
+
+
+class ModelRouter:
+    """Routes requests to the primary or canary model and mirrors them to a shadow
+    
+    A ``canary_fraction`` share of requests is answered by the canary. Every
+    request is also copied to the shadow model on a separate thread pool
+    after the primary response is computed; shadow work that would exceed
+    ``shadow_queue_max`` in-flight batches is dropped rather than queued.
+    ``on_shadow(prediction_ids, version, predictions)`` records shadow output.
+    """
+    
+    def __init__(self, canary_fraction: float = 0.0, shadow_workers: int = 2,
+                 shadow_queue_max: int = 100, on_shadow: Callable = None, seed: int = None):
+        self.models: Dict[str, Optional[ServedModel]] = {role: None for role in ROLES}
+        self.canary_fraction = canary_fraction
+        self.shadow_queue_max = shadow_queue_max
+        self.on_shadow = on_shadow
+        self.rng = np.random.default_rng(seed)
+        self.lock = threading.Lock()
+        self.shadow_pool = ThreadPoolExecutor(max_workers=shadow_workers, thread_name_prefix="shadow")
+        self.shadow_in_flight = 0
+        self.shadow_dropped = 0
+    
+    def set_model(self, role: str, served: Optional[ServedModel], canary_fraction: float = None):
+        """Install (or with None, remove) the model for a role"""
+        if role not in ROLES:
+            raise ValueError(f"Unknown serving role: {role}")
+        with self.lock:
+            self.models[role] = served
+            if canary_fraction is not None:
+                self.canary_fraction = canary_fraction
+        logger.info(f"{role} model: {served.version if served else None}")
+    
+    def route(self) -> Tuple[str, ServedModel]:
+        """Pick the model that answers this request"""
+        canary = self.models['canary']
+        if canary is not None and self.rng.random() < self.canary_fraction:
+            return 'canary', canary
+        return 'primary', self.models['primary']
+    
+    def _record(self, served: ServedModel, rows: int, latency: float):
+        """Update per-version request, row and latency counters"""
+        with self.lock:
+            served.requests += 1
+            served.rows += rows
+            served.total_latency += latency
+            served.latencies.append(latency)
+    
+    def predict(self, served: ServedModel, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray, float]:
+        """Answer a request with the routed model"""
+        predictions, probabilities, latency = served.predict(X)
+        self._record(served, len(X), latency)
+        return predictions, probabilities, latency
+    
+    def mirror(self, X: np.ndarray, predictions: np.ndarray, prediction_ids: List[int],
+               records=None) -> bool:
+        """Queue shadow inference for a served batch; returns False if skipped
+        
+        When the request carried raw ``records``, the shadow transforms them
+        with its own preprocessor instead of reusing ``X``.
+        """
+        shadow = self.models['shadow']
+        if shadow is None:
+            return False
+        with self.lock:
+            if self.shadow_in_flight >= self.shadow_queue_max:
+                self.shadow_dropped += 1
+                return False
+            self.shadow_in_flight += 1
+        self.shadow_pool.submit(self._run_shadow, shadow, X, predictions, prediction_ids, records)
+        return True
+    
+    def _run_shadow(self, shadow: ServedModel, X: np.ndarray, served_predictions: np.ndarray,
+                    prediction_ids: List[int], records=None):
+        """Score the mirrored batch and compare it with what was served"""
+        try:
+            if records is not None and shadow.preprocessor is not None:
+                X = shadow.prepare(records)
+            predictions, _, latency = shadow.predict(X)
+            self._record(shadow, len(X), latency)
+            with self.lock:
+                shadow.compared_rows += len(X)
+                shadow.disagreements += int(np.sum(predictions != served_predictions))
+            if self.on_shadow is not None:
+                self.on_shadow(prediction_ids, shadow.version, predictions)
+        except Exception as e:
+            logger.error(f"Shadow inference failed for {shadow.version}: {str(e)}")
+        finally:
+            with self.lock:
+                self.shadow_in_flight -= 1
+    
+    def get_stats(self) -> Dict:
+        """Per-version latency, traffic and shadow disagreement"""
+        report = {'canary_fraction': self.canary_fraction, 'shadow_dropped': self.shadow_dropped,
+                  'versions': {}}
+        with self.lock:
+            for role, served in self.models.items():
+                if served is None:
+                    continue
+                latencies = np.array(served.latencies)
+                report['versions'][served.version] = {
+                    'role': role,
+                    'requests': served.requests,
+                    'rows': served.rows,
+                    'mean_latency_ms': 1000 * served.total_latency / served.requests if served.requests else None,
+                    'p95_latency_ms': float(1000 * np.percentile(latencies, 95)) if len(latencies) else None,
+                    'disagreement_rate': (served.disagreements / served.compared_rows
+                                          if served.compared_rows else None)
+                }
+        return report
+    
+    def wait_for_shadow(self, timeout: float = 5.0):
+        """Block until mirrored work drains (tests and shutdown)"""
+        deadline = time.time() + timeout
+        while self.shadow_in_flight and time.time() < deadline:
+            time.sleep(0.01)
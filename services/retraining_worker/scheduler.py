@@ -0,0 +1,140 @@
+"""Retraining job scheduler: coalescing, cool-down, priority and parallel workers"""
+import sys
+import os
+# Add project root to Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List
+
+from shared.logger import setup_logger
+
+logger = setup_logger("retraining_scheduler")
+
+
+@dataclass
+class RetrainingJob:
+    """A pending retraining request for one model
+    
+    Triggers that arrive while the job is pending are folded into it:
+    ``priority`` keeps the highest drift score and ``triggers`` counts them.
+    """
+    model: str
+    trigger: str
+    priority: float = 0.0
+    payload: Dict = field(default_factory=dict)
+    job_id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    queued_at: float = field(default_factory=time.time)
+    triggers: int = 1
+
+
+class RetrainingScheduler:
+    """Runs at most one job per model, highest drift score first
+    
+    ``run_job(job, n_jobs)`` trains and returns True on success; ``n_jobs`` is
+    the job's share of ``cpu_budget``. ``on_transition(job, status)`` is called
+    for queued, started, completed and failed so state can be recorded.
+    """
+    
+    def __init__(self, run_job: Callable[[RetrainingJob, int], bool],
+                 on_transition: Callable[[RetrainingJob, str], None] = None,
+                 max_workers: int = 1, cooldown: float = 1800.0, cpu_budget: int = None):
+        self.run_job = run_job
+        self.on_transition = on_transition
+        self.max_workers = max_workers
+        self.cooldown = cooldown
+        self.cpu_budget = cpu_budget or os.cpu_count() or 1
+        self.pending: Dict[str, RetrainingJob] = {}
+        self.running: Dict[str, RetrainingJob] = {}
+        self.last_finished: Dict[str, float] = {}
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="retrain")
+        self.stats = {'submitted': 0, 'coalesced': 0, 'completed': 0, 'failed': 0}
+    
+    def _transition(self, job: RetrainingJob, status: str):
+        """Report a state change, never letting the hook break scheduling"""
+        if self.on_transition is None:
+            return
+        try:
+            self.on_transition(job, status)
+        except Exception as e:
+            logger.error(f"Could not record {status} for job {job.job_id}: {str(e)}")
+    
+    def submit(self, job_data: Dict) -> RetrainingJob:
+        """Queue a trigger, folding it into a pending job for the same model"""
+        model = job_data.get('model', 'default')
+        priority = float(job_data.get('drift_score') or 0.0)
+        
+        with self.lock:
+            self.stats['submitted'] += 1
+            job = self.pending.get(model)
+            if job is not None:
+                job.priority = max(job.priority, priority)
+                job.triggers += 1
+                job.payload = job_data
+                self.stats['coalesced'] += 1
+                logger.info(f"Coalesced trigger into job {job.job_id} for {model} "
+                            f"({job.triggers} triggers)")
+                return job
+            
+            job = RetrainingJob(model=model, trigger=job_data.get('trigger', 'manual'),
+                                priority=priority, payload=job_data)
+            self.pending[model] = job
+        
+        self._transition(job, 'queued')
+        return job
+    
+    def _eligible(self, now: float) -> List[RetrainingJob]:
+        """Pending jobs whose model is idle and out of its cool-down"""
+        return [
+            job for model, job in self.pending.items()
+            if model not in self.running
+            and now - self.last_finished.get(model, float('-inf')) >= self.cooldown
+        ]
+    
+    def dispatch(self, now: float = None) -> int:
+        """Start eligible jobs up to the worker limit; returns the number started"""
+        now = now or time.time()
+        started = []
+        
+        with self.lock:
+            free = self.max_workers - len(self.running)
+            ready = sorted(self._eligible(now), key=lambda j: (-j.priority, j.queued_at))
+            for job in ready[:max(free, 0)]:
+                del self.pending[job.model]
+                self.running[job.model] = job
+                started.append(job)
+        
+        n_jobs = max(1, self.cpu_budget // self.max_workers)
+        for job in started:
+            self._transition(job, 'started')
+            self.executor.submit(self._run, job, n_jobs)
+        return len(started)
+    
+    def _run(self, job: RetrainingJob, n_jobs: int):
+        """Run one job and release its model"""
+        try:
+            ok = bool(self.run_job(job, n_jobs))
+        except Exception as e:
+            logger.error(f"Retraining job {job.job_id} crashed: {str(e)}")
+            ok = False
+        
+        status = 'completed' if ok else 'failed'
+        with self.lock:
+            del self.running[job.model]
+            self.last_finished[job.model] = time.time()
+            self.stats[status] += 1
+        self._transition(job, status)
+    
+    def get_stats(self) -> Dict:
+        """Queue depth and job counters"""
+        with self.lock:
+            return {**self.stats, 'pending': len(self.pending), 'running': len(self.running)}
+    
+    def stop(self):
+        """Wait for running jobs"""
+        self.executor.shutdown(wait=True)
@@ -6,19 +6,32 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../.
 
 import time
 import uuid
+import threading
+import numpy as np
+from dataclasses import asdict
 
 from shared.config import Config
 from shared.logger import setup_logger
 from shared.database import DatabaseManager
 from shared.redis_client import RedisClient
 from ml.training.trainer import ModelTrainer
+from ml.training.model_families import load_serving_artifact
+from ml.training.preprocessing import Preprocessor
+from ml.feature_store.training_data import TrainingDataStore
+from ml.evaluation.champion_challenger import ChampionChallenger
+from services.retraining_worker.scheduler import RetrainingJob, RetrainingScheduler
 from registry.mlflow.mlflow_client import MLFlowClient
+from registry.model_registry import ModelRegistry
+from registry.artifact_store import ArtifactStore
 
 logger = setup_logger("retraining_worker")
 config = Config()
 db = DatabaseManager()
 redis_client = RedisClient(config.redis.host, config.redis.port)
-mlflow_client = MLFlowClient(config.mlflow.tracking_uri, config.mlflow.experiment_name)
+training_store = TrainingDataStore(config.model.training_data_dir, config.model.holdout_every)
+evaluator = ChampionChallenger(db, config.model.promotion_metric, config.model.promotion_margin)
+registry = ModelRegistry(db, config.registry.model_name, config.registry.check_interval)
+artifact_store = ArtifactStore(config.registry.artifact_dir)
 
 class RetrainingWorker:
     """Worker that processes retraining jobs"""
@@ -26,29 +39,48 @@ class RetrainingWorker:
     def __init__(self):
         self.running = False
         self.trainer = ModelTrainer(config.model)
+        self.last_shard = None  # newest shard used by a successful job
+        self.last_preprocessor = None  # preprocessor version of that job's rows
+        self.data_lock = threading.Lock()  # the training store has a single writer
+        self.scheduler = None
         
-    def process_job(self, job_data: dict):
-        """Process a retraining job"""
-        job_id = str(uuid.uuid4())
+    def process_job(self, job_data: dict, job_id: str = None, n_jobs: int = None) -> bool:
+        """Process a retraining job; returns True on success
+        
+        ``n_jobs`` caps the cores this job may use when several run in parallel.
+        """
+        if job_id is None:
+            job_id = str(uuid.uuid4())
+            db.log_job_transition(job_id, 'started', trigger_reason=job_data.get('trigger', 'manual'))
         logger.info(f"Processing retraining job: {job_id}")
         
-        # Log job start
-        db.log_training_job(
-            job_id=job_id,
-            status='started',
-            trigger_reason=job_data.get('trigger', 'manual')
-        )
+        # Per-job trainer and tracking client so parallel jobs don't share state
+        trainer = ModelTrainer({**asdict(config.model), 'n_jobs': n_jobs or config.model.n_jobs})
+        mlflow_client = MLFlowClient(config.mlflow.tracking_uri, config.mlflow.experiment_name,
+                                     config.mlflow.flush_interval)
         
         try:
+            if config.model.retrain_strategy == 'out_of_core':
+                self.process_out_of_core_job(job_id, job_data, trainer, mlflow_client)
+                return True
+            
             # Get training data
-            training_data = self.get_training_data()
+            with self.data_lock:
+                training_data = self.get_training_data()
             
             if training_data is None:
                 logger.error("No training data available")
                 db.log_training_job(job_id=job_id, status='failed')
-                return
+                return False
+            
+            X_train, y_train, batch_age, snapshot_id = training_data
+            preprocessor_version = training_store.get_snapshot(snapshot_id).get('preprocessor')
+            db.log_training_job(job_id=job_id, status='started', snapshot_id=snapshot_id)
             
-            X_train, y_train = training_data
+            # Tune before the retraining run; each trial is logged as its own run
+            tuning = None
+            if config.model.tuning_enabled and config.model.retrain_strategy == 'full':
+                tuning = trainer.tune(X_train, y_train, mlflow_client)
             
             # Start MLFlow run
             run_id = mlflow_client.start_run(f"retrain_{job_id}")
@@ -57,26 +89,42 @@ class RetrainingWorker:
             mlflow_client.log_params({
                 'trigger': job_data.get('trigger'),
                 'samples': len(X_train),
+                'snapshot_id': snapshot_id,
+                'preprocessor_version': preprocessor_version,
                 'job_id': job_id
             })
+            if tuning and tuning['best_params']:
+                mlflow_client.log_params({**tuning['best_params'], 'tuning_trials': tuning['trials']})
             
             # Train model
-            logger.info(f"Training model with {len(X_train)} samples...")
-            metrics, model_version = self.trainer.train(X_train, y_train)
+            base_model = (self.load_base_model(preprocessor_version)
+                          if config.model.retrain_strategy == 'incremental' else None)
+            if base_model is not None and trainer.can_update(base_model, X_train, y_train):
+                logger.info(f"Updating deployed model with {len(X_train)} samples...")
+                metrics, model_version = trainer.train_incremental(
+                    X_train, y_train, base_model,
+                    sample_weight=config.model.decay ** batch_age
+                )
+            else:
+                logger.info(f"Training model with {len(X_train)} samples...")
+                metrics, model_version = trainer.train(X_train, y_train)
             
             # Log metrics to MLFlow
             mlflow_client.log_metrics(metrics)
             
             # Register model
-            model_path = f"models/model_{model_version}.pkl"
-            self.trainer.save_model(model_path)
+            model_path = trainer.save_model(preprocessor=self.snapshot_preprocessor(snapshot_id),
+                                            store=artifact_store)
+            mlflow_client.log_model(model_path)
             
             db.register_model(
                 model_version=model_version,
                 model_path=model_path,
                 metrics=metrics,
-                status='trained'
+                status='trained',
+                model_name=config.registry.model_name
             )
+            registry.promote(model_version, 'staging')
             
             # Log success
             db.log_training_job(
@@ -85,63 +133,233 @@ class RetrainingWorker:
                 metrics=metrics,
                 model_version=model_version,
                 trigger_reason=job_data.get('trigger'),
-                mlflow_run_id=run_id
+                mlflow_run_id=run_id,
+                snapshot_id=snapshot_id
             )
+            with self.data_lock:
+                newest_shard = training_store.get_snapshot(snapshot_id)['shards'][-1]
+                # Parallel jobs finish in any order; only a newer snapshot moves the
+                # incremental cursor (shard ids are zero-padded, so they sort in order)
+                if self.last_shard is None or newest_shard > self.last_shard:
+                    self.last_shard = newest_shard
+                    self.last_preprocessor = preprocessor_version
+                    self.trainer = trainer
+            
+            logger.info(f"✅ Retraining completed: {model_version}, "
+                       f"Accuracy: {metrics['accuracy']:.4f}")
+            
+            promoted = self.promote_if_better(model_version, model_path, snapshot_id)
+            mlflow_client.log_params({'promoted': promoted})
+            self.collect_artifacts()
             
             # End MLFlow run
             mlflow_client.end_run()
+            return True
             
-            logger.info(f"✅ Retraining completed: {model_version}, "
-                       f"Accuracy: {metrics['accuracy']:.4f}")
+        except Exception as e:
+            logger.error(f"Retraining failed: {str(e)}")
+            db.log_training_job(job_id=job_id, status='failed')
+            mlflow_client.end_run(status='FAILED')
+            return False
             
+    def process_out_of_core_job(self, job_id: str, job_data: dict, trainer: ModelTrainer,
+                                mlflow_client: MLFlowClient):
+        """Retrain from the full labeled history, streamed in chunks"""
+        run_id = mlflow_client.start_run(f"retrain_{job_id}")
+        mlflow_client.log_params({
+            'trigger': job_data.get('trigger'),
+            'strategy': 'out_of_core',
+            'memory_budget_mb': config.model.memory_budget_mb,
+            'job_id': job_id
+        })
+        
+        chunks = db.iter_labeled_predictions(config.model.ooc_chunk_rows)
+        metrics, model_version = trainer.train_out_of_core(chunks, f"data/ooc/{job_id}")
+        mlflow_client.log_metrics(metrics)
+        
+        # Labeled predictions carry no preprocessor version, so they are taken
+        # to be in the feature space of the model that served them
+        model_path = trainer.save_model(preprocessor=self.serving_preprocessor(), store=artifact_store)
+        mlflow_client.log_model(model_path)
+        db.register_model(model_version=model_version, model_path=model_path,
+                          metrics=metrics, status='trained', model_name=config.registry.model_name)
+        registry.promote(model_version, 'staging')
+        db.log_training_job(
+            job_id=job_id,
+            status='completed',
+            metrics=metrics,
+            model_version=model_version,
+            trigger_reason=job_data.get('trigger'),
+            mlflow_run_id=run_id
+        )
+        logger.info(f"✅ Out-of-core retraining completed: {model_version}, "
+                   f"rows: {metrics['samples_count']}")
+        
+        # Evaluate on the same holdout split the in-memory path uses
+        with self.data_lock:
+            self.drain_data_queue()
+            snapshot_id = training_store.create_snapshot()
+        promoted = self.promote_if_better(model_version, model_path, snapshot_id)
+        mlflow_client.log_params({'promoted': promoted})
+        self.collect_artifacts()
+        mlflow_client.end_run()
+        
+    def promote_if_better(self, model_version: str, model_path: str, snapshot_id: str) -> bool:
+        """Champion/challenger on the snapshot's holdout; deploys and notifies serving on a win"""
+        if not config.model.auto_deploy:
+            return False
+        if snapshot_id is None:
+            logger.warning(f"No holdout data to evaluate {model_version}; leaving it undeployed")
+            return False
+        
+        decision = evaluator.evaluate(
+            model_version, model_path, snapshot_id,
+            lambda: training_store.load_snapshot(snapshot_id, split='holdout')[:2]
+        )
+        registry.refresh()
+        if decision['promoted']:
             # Notify prediction service to reload model
             redis_client.set('model_update', {
                 'version': model_version,
                 'timestamp': time.time()
             })
-            
+        return decision['promoted']
+    
+    def collect_artifacts(self):
+        """Apply the retention policy, then delete stored artifacts no registered version references"""
+        try:
+            db.release_model_artifacts(config.registry.model_name, config.registry.keep_versions,
+                                       protected=[config.serving.canary_version, config.serving.shadow_version])
+            artifact_store.collect_garbage(db.get_artifact_refcounts(), config.registry.gc_grace)
         except Exception as e:
-            logger.error(f"Retraining failed: {str(e)}")
-            db.log_training_job(job_id=job_id, status='failed')
-            mlflow_client.end_run(status='FAILED')
-            
-    def get_training_data(self):
-        """Get training data from feature store or buffer"""
-        # In production, fetch from feature store
-        # For now, get from Redis buffer
-        data_buffer = []
-        label_buffer = []
-        
-        # Get recent data
-        for _ in range(config.drift.window_size):
-            item = redis_client.rpop('data_queue')
-            if item:
-                data_buffer.extend(item['features'])
-                if item.get('labels'):
-                    label_buffer.extend(item['labels'])
-            else:
-                break
+            logger.error(f"Artifact garbage collection failed: {str(e)}")
         
-        if data_buffer and label_buffer:
-            import numpy as np
-            return np.array(data_buffer), np.array(label_buffer)
+    def load_base_model(self, preprocessor_version: str = None):
+        """Model to warm-start from: the production one, else the last one trained here
         
+        Only a model trained on features from ``preprocessor_version`` qualifies.
+        """
+        active = registry.resolve('production')
+        if active and os.path.exists(active['model_path']):
+            try:
+                model, _, preprocessor = load_serving_artifact(active['model_path'])
+                if (preprocessor.version if preprocessor else None) == preprocessor_version:
+                    return model
+                logger.info(f"Deployed model {active['model_version']} uses another preprocessor")
+            except Exception as e:
+                logger.warning(f"Could not load deployed model {active['model_version']}: {e}")
+        return self.trainer.model if self.last_preprocessor == preprocessor_version else None
+    
+    def snapshot_preprocessor(self, snapshot_id: str):
+        """Preprocessor the snapshot's rows were produced with, shipped in the artifact"""
+        version = training_store.get_snapshot(snapshot_id).get('preprocessor')
+        spec = db.get_preprocessor(version) if version else None
+        if version and spec is None:
+            raise ValueError(f"Preprocessor {version} of snapshot {snapshot_id} is not registered")
+        return Preprocessor.from_dict(spec) if spec else None
+        
+    def serving_preprocessor(self):
+        """Preprocessor shipped with the production model, or None"""
+        active = registry.resolve('production')
+        if active and os.path.exists(active['model_path']):
+            return load_serving_artifact(active['model_path'])[2]
         return None
         
+    def drain_data_queue(self) -> int:
+        """Persist queued labeled batches to the training store; returns rows added
+        
+        Batches are grouped by the preprocessor version they were ingested
+        with, one shard per version, so no shard mixes feature spaces.
+        """
+        batches = {}  # preprocessor version -> (features, labels, timestamps)
+        
+        while True:
+            items = redis_client.rpop('data_queue', count=config.drift.window_size)
+            if not items:
+                break
+            for item in items:
+                if not item.get('labels'):
+                    continue
+                features, labels, timestamps = batches.setdefault(item.get('preprocessor'), ([], [], []))
+                features.extend(item['features'])
+                labels.extend(item['labels'])
+                timestamps.extend([item.get('timestamp', time.time())] * len(item['features']))
+        
+        added = 0
+        for version, (features, labels, timestamps) in batches.items():
+            added += training_store.append(np.array(features), np.array(labels), np.array(timestamps),
+                                           preprocessor=version)
+        return added
+        
+    def get_training_data(self):
+        """Snapshot training data from the durable store
+        
+        Queued batches are persisted first, so a failed job loses nothing and
+        the next job sees the same rows. The snapshot holds rows of a single
+        preprocessor version, the newest one. Returns (X, y, batch_age, snapshot_id)
+        where batch_age counts how many newer shards are in the snapshot (0
+        for the newest).
+        """
+        self.drain_data_queue()
+        
+        window = config.model.training_window
+        start = time.time() - window if window else None
+        if config.model.retrain_strategy == 'incremental' and self.last_shard:
+            # Only data that arrived after the last successful job
+            snapshot_id = training_store.create_snapshot(after_shard=self.last_shard)
+            if (snapshot_id is not None and
+                    training_store.get_snapshot(snapshot_id).get('preprocessor') != self.last_preprocessor):
+                # A new preprocessor means a new feature space: retrain on the window
+                snapshot_id = training_store.create_snapshot(start=start)
+        else:
+            snapshot_id = training_store.create_snapshot(start=start)
+        
+        if snapshot_id is None:
+            return None
+        
+        X, y, shard_index = training_store.load_snapshot(snapshot_id, split='train')
+        if len(X) == 0:
+            return None
+        return X, y, shard_index.max() - shard_index, snapshot_id
+        
+    def run_scheduled_job(self, job: RetrainingJob, n_jobs: int) -> bool:
+        """Scheduler entry point for one coalesced job"""
+        job_data = {**job.payload, 'coalesced_triggers': job.triggers}
+        return self.process_job(job_data, job_id=job.job_id, n_jobs=n_jobs)
+        
+    def record_transition(self, job: RetrainingJob, status: str):
+        """Stamp a job state change in training_jobs"""
+        db.log_job_transition(job.job_id, status, trigger_reason=job.trigger)
+        
     def run(self):
-        """Main worker loop"""
+        """Main worker loop
+        
+        Drift triggers are coalesced per model, held back during the
+        cool-down after that model's last job, and dispatched highest drift
+        score first onto ``config.retraining.workers`` parallel workers.
+        """
         self.running = True
+        self.scheduler = RetrainingScheduler(
+            run_job=self.run_scheduled_job,
+            on_transition=self.record_transition,
+            max_workers=config.retraining.workers,
+            cooldown=config.retraining.cooldown,
+            cpu_budget=config.retraining.cpu_budget
+        )
+        registry.start()
         logger.info("Retraining worker started")
         
         while self.running:
             try:
-                # Check for jobs
-                job_data = redis_client.rpop('retraining_queue')
+                # Move every queued trigger into the scheduler
+                while True:
+                    job_data = redis_client.rpop('retraining_queue')
+                    if not job_data:
+                        break
+                    self.scheduler.submit(job_data)
                 
-                if job_data:
-                    self.process_job(job_data)
-                else:
-                    time.sleep(10)  # Wait for jobs
+                if self.scheduler.dispatch() == 0:
+                    time.sleep(config.retraining.poll_interval)  # Wait for jobs
                     
             except Exception as e:
                 logger.error(f"Worker error: {str(e)}")
@@ -150,6 +368,9 @@ class RetrainingWorker:
     def stop(self):
         """Stop worker"""
         self.running = False
+        registry.stop()
+        if self.scheduler:
+            self.scheduler.stop()
         logger.info("Retraining worker stopped")
 
 if __name__ == '__main__':
@@ -25,16 +25,49 @@ class RedisConfig:
 @dataclass
 class MLFlowConfig:
     """MLFlow tracking configuration"""
-    tracking_uri: str = os.getenv("MLFLOW_TRACKING_URI", "http://localhost:5000")
+    tracking_uri: str = os.getenv("MLFLOW_TRACKING_URI", "file:./mlruns")  # or http://host:5000
     experiment_name: str = os.getenv("MLFLOW_EXPERIMENT", "drift_detection_pipeline")
+    flush_interval: float = float(os.getenv("MLFLOW_FLUSH_INTERVAL", "1.0"))
     
 @dataclass
 class ModelConfig:
     """Model training configuration"""
+    model_family: str = os.getenv("MODEL_FAMILY", "random_forest")  # see ml/training/model_families.py
+    n_classes: int = int(os.getenv("MODEL_N_CLASSES", "2"))  # labels are 0 .. n_classes - 1
     n_estimators: int = 100
     max_depth: int = 10
     min_samples_split: int = 2
     random_state: int = 42
+    training_mode: str = os.getenv("TRAINING_MODE", "cv")  # cv, oob or holdout
+    cv_folds: int = 5
+    cv_refit: bool = True  # False serves the fold models as an ensemble
+    holdout_size: float = 0.2
+    n_jobs: int = int(os.getenv("TRAINING_N_JOBS", "-1"))  # total thread budget
+    retrain_strategy: str = os.getenv("RETRAIN_STRATEGY", "full")  # full, incremental or out_of_core
+    max_trees: int = 200  # forest size cap for incremental updates
+    decay: float = 0.7  # weight kept by older data/trees per update
+    memory_budget_mb: int = int(os.getenv("TRAINING_MEMORY_BUDGET_MB", "512"))
+    ooc_chunk_rows: int = 10000  # rows per chunk read from the predictions table
+    ooc_max_bags: int = 10
+    training_data_dir: str = os.getenv("TRAINING_DATA_DIR", "data/training")
+    training_window: int = int(os.getenv("TRAINING_WINDOW_SECONDS", "0"))  # 0 = all stored history
+    holdout_every: int = 10  # every n-th row (by content hash) is held out for evaluation
+    auto_deploy: bool = os.getenv("AUTO_DEPLOY", "true").lower() == "true"
+    promotion_metric: str = os.getenv("PROMOTION_METRIC", "f1_score")
+    promotion_margin: float = float(os.getenv("PROMOTION_MARGIN", "0.01"))  # challenger must win by this
+    tuning_enabled: bool = os.getenv("TUNING_ENABLED", "false").lower() == "true"
+    tuning_metric: str = os.getenv("TUNING_METRIC", "f1_score")
+    tuning_time_budget: float = float(os.getenv("TUNING_TIME_BUDGET", "600"))  # seconds
+    tuning_eta: int = 3  # successive-halving reduction factor
+    tuning_min_samples: int = 500  # rows in the smallest rung
+    
+@dataclass
+class RetrainingConfig:
+    """Retraining job scheduling configuration"""
+    workers: int = int(os.getenv("RETRAIN_WORKERS", "1"))  # jobs run in parallel
+    cooldown: float = float(os.getenv("RETRAIN_COOLDOWN_SECONDS", "1800"))  # per model, after a job
+    cpu_budget: int = int(os.getenv("RETRAIN_CPU_BUDGET", "0"))  # cores split across workers, 0 = all
+    poll_interval: float = 10.0  # seconds
     
 @dataclass
 class DriftConfig:
@@ -42,7 +75,23 @@ class DriftConfig:
     threshold: float = 0.05
     window_size: int = 1000
     min_samples: int = 100
-    check_interval: int = 300  # seconds
+    check_interval: int = 300  # seconds, max time between checks
+    min_poll_interval: float = 5.0  # seconds, poll cadence under traffic
+    max_poll_interval: float = 60.0  # seconds, poll cadence after idle back-off
+    error_backoff: float = 60.0  # seconds
+    scheduler_workers: int = 2
+    n_jobs: int = int(os.getenv("DRIFT_N_JOBS", "1"))
+    parallel_min_features: int = 32
+    performance_window: int = 3600  # seconds per output/confusion window
+    confidence_bins: int = 10
+    output_psi_threshold: float = 0.2
+    accuracy_drop_threshold: float = 0.05
+    min_labeled_samples: int = 100  # labeled predictions each period needs before accuracy is compared
+    performance_lookback: int = 24  # windows compared against the latest one
+    buffer_sample_rate: float = float(os.getenv("DRIFT_BUFFER_SAMPLE_RATE", "1.0"))
+    buffer_max_size: int = int(os.getenv("DRIFT_BUFFER_MAX_SIZE", "1000"))  # batches
+    segment_column: str = os.getenv("DRIFT_SEGMENT_COLUMN", "")  # name or column index
+    min_segment_samples: int = 30
     
 @dataclass
 class ServiceConfig:
@@ -53,6 +102,36 @@ class ServiceConfig:
     retraining_port: int = 8004
     dashboard_port: int = 8050
     
+@dataclass
+class ServingConfig:
+    """Multi-model serving configuration"""
+    canary_version: str = os.getenv("CANARY_MODEL_VERSION", "")
+    canary_fraction: float = float(os.getenv("CANARY_FRACTION", "0.0"))  # share of requests
+    shadow_version: str = os.getenv("SHADOW_MODEL_VERSION", "")
+    shadow_workers: int = 2
+    shadow_queue_max: int = 100  # in-flight mirrored batches before shadow work is dropped
+    
+@dataclass
+class FeatureStoreConfig:
+    """Feature store configuration"""
+    cache_size: int = int(os.getenv("FEATURE_CACHE_SIZE", "100000"))  # entities kept in-process
+    cache_ttl: float = float(os.getenv("FEATURE_CACHE_TTL", "60"))  # seconds before a cached row is re-read
+    
+@dataclass
+class DashboardConfig:
+    """Monitoring dashboard configuration"""
+    poll_interval: float = float(os.getenv("DASHBOARD_POLL_INTERVAL", "5"))  # seconds between DB polls
+    cache_ttl: float = float(os.getenv("DASHBOARD_CACHE_TTL", "15"))  # max snapshot age before a read refreshes it
+    
+@dataclass
+class RegistryConfig:
+    """Model registry configuration"""
+    model_name: str = os.getenv("MODEL_NAME", "retail")  # registry name the services serve and train
+    check_interval: float = float(os.getenv("REGISTRY_CHECK_INTERVAL", "5"))  # seconds between stage pointer checks
+    artifact_dir: str = os.getenv("ARTIFACT_STORE_DIR", "models/store")  # content-addressed model artifacts
+    keep_versions: int = int(os.getenv("ARTIFACT_KEEP_VERSIONS", "5"))  # unstaged versions whose artifacts are kept
+    gc_grace: float = float(os.getenv("ARTIFACT_GC_GRACE_SECONDS", "3600"))  # never collect objects younger than this
+
 class Config:
     """Main configuration class"""
     def __init__(self):
@@ -60,5 +139,10 @@ class Config:
         self.redis = RedisConfig()
         self.mlflow = MLFlowConfig()
         self.model = ModelConfig()
+        self.retraining = RetrainingConfig()
         self.drift = DriftConfig()
         self.service = ServiceConfig()
+        self.serving = ServingConfig()
+        self.feature_store = FeatureStoreConfig()
+        self.dashboard = DashboardConfig()
+        self.registry = RegistryConfig()
@@ -2,7 +2,14 @@
 import os
 from datetime import datetime
 from typing import List, Dict, Optional
+from collections import Counter
+import calendar
+import csv
+import io
 import json
+import math
+import numbers
+import time
 
 # Load environment variables from .env file
 from dotenv import load_dotenv
@@ -18,7 +25,7 @@ USE_POSTGRES = os.getenv('USE_POSTGRES', 'false').lower() == 'true'
 if USE_POSTGRES:
     try:
         import psycopg2
-        from psycopg2.extras import RealDictCursor
+        from psycopg2.extras import RealDictCursor, execute_values
         POSTGRES_AVAILABLE = True
         logger.info("PostgreSQL driver loaded successfully")
     except ImportError:
@@ -31,6 +38,18 @@ else:
 if not USE_POSTGRES:
     import sqlite3
 
+# training_jobs column stamped by each job state
+JOB_TRANSITION_COLUMNS = {
+    'queued': 'queued_at',
+    'started': 'started_at',
+    'completed': 'finished_at',
+    'failed': 'finished_at'
+}
+
+# Registry stages; staging and production each hold one version per model name
+MODEL_STAGES = ('staging', 'production', 'archived')
+DEFAULT_MODEL_NAME = os.getenv('MODEL_NAME', 'retail')
+
 class DatabaseManager:
     """Centralized database management - supports both PostgreSQL and SQLite"""
     
@@ -90,7 +109,8 @@ class DatabaseManager:
                     drift_score REAL,
                     affected_features JSONB,
                     drift_metrics JSONB,
-                    action_taken TEXT
+                    action_taken TEXT,
+                    segment TEXT
                 )
             """)
             
@@ -108,7 +128,11 @@ class DatabaseManager:
                     samples_count INTEGER,
                     model_version TEXT,
                     trigger_reason TEXT,
-                    mlflow_run_id TEXT
+                    mlflow_run_id TEXT,
+                    snapshot_id TEXT,
+                    queued_at REAL,
+                    started_at REAL,
+                    finished_at REAL
                 )
             """)
             
@@ -135,6 +159,78 @@ class DatabaseManager:
                 )
             """)
             
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS output_distribution (
+                    window_start BIGINT,
+                    model_version TEXT,
+                    kind TEXT,
+                    bucket INTEGER,
+                    count BIGINT DEFAULT 0,
+                    PRIMARY KEY (window_start, model_version, kind, bucket)
+                )
+            """)
+            
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS performance_confusion (
+                    window_start BIGINT,
+                    model_version TEXT,
+                    true_label INTEGER,
+                    predicted_label INTEGER,
+                    count BIGINT DEFAULT 0,
+                    PRIMARY KEY (window_start, model_version, true_label, predicted_label)
+                )
+            """)
+            
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS model_evaluations (
+                    model_version TEXT,
+                    snapshot_id TEXT,
+                    metrics TEXT,
+                    PRIMARY KEY (model_version, snapshot_id)
+                )
+            """)
+            
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS online_features (
+                    entity_id TEXT NOT NULL,
+                    feature_group TEXT NOT NULL,
+                    features JSONB NOT NULL,
+                    updated_at DOUBLE PRECISION,
+                    PRIMARY KEY (entity_id, feature_group)
+                )
+            """)
+            
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS preprocessors (
+                    version TEXT PRIMARY KEY,
+                    spec TEXT NOT NULL,
+                    created_at DOUBLE PRECISION
+                )
+            """)
+        
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS model_pointers (
+                    model_name TEXT NOT NULL,
+                    stage TEXT NOT NULL,
+                    model_version TEXT,
+                    generation INTEGER NOT NULL DEFAULT 0,
+                    updated_at DOUBLE PRECISION,
+                    PRIMARY KEY (model_name, stage)
+                )
+            """)
+            
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS metric_buckets (
+                    resolution INTEGER,
+                    bucket_start BIGINT,
+                    metric TEXT,
+                    count DOUBLE PRECISION,
+                    total DOUBLE PRECISION,
+                    maximum DOUBLE PRECISION,
+                    PRIMARY KEY (resolution, bucket_start, metric)
+                )
+            """)
+        
         else:
             # SQLite table creation
             cursor.execute("""
@@ -158,7 +254,8 @@ class DatabaseManager:
                     drift_score REAL,
                     affected_features TEXT,
                     drift_metrics TEXT,
-                    action_taken TEXT
+                    action_taken TEXT,
+                    segment TEXT
                 )
             """)
             
@@ -176,7 +273,11 @@ class DatabaseManager:
                     samples_count INTEGER,
                     model_version TEXT,
                     trigger_reason TEXT,
-                    mlflow_run_id TEXT
+                    mlflow_run_id TEXT,
+                    snapshot_id TEXT,
+                    queued_at REAL,
+                    started_at REAL,
+                    finished_at REAL
                 )
             """)
             
@@ -202,6 +303,126 @@ class DatabaseManager:
                     feature_group TEXT
                 )
             """)
+            
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS output_distribution (
+                    window_start INTEGER,
+                    model_version TEXT,
+                    kind TEXT,
+                    bucket INTEGER,
+                    count INTEGER DEFAULT 0,
+                    PRIMARY KEY (window_start, model_version, kind, bucket)
+                )
+            """)
+            
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS performance_confusion (
+                    window_start INTEGER,
+                    model_version TEXT,
+                    true_label INTEGER,
+                    predicted_label INTEGER,
+                    count INTEGER DEFAULT 0,
+                    PRIMARY KEY (window_start, model_version, true_label, predicted_label)
+                )
+            """)
+            
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS model_evaluations (
+                    model_version TEXT,
+                    snapshot_id TEXT,
+                    metrics TEXT,
+                    PRIMARY KEY (model_version, snapshot_id)
+                )
+            """)
+            
+            # Clustered on the key, so a lookup is a single B-tree seek
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS online_features (
+                    entity_id TEXT NOT NULL,
+                    feature_group TEXT NOT NULL,
+                    features TEXT NOT NULL,
+                    updated_at REAL,
+                    PRIMARY KEY (entity_id, feature_group)
+                ) WITHOUT ROWID
+            """)
+            
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS preprocessors (
+                    version TEXT PRIMARY KEY,
+                    spec TEXT NOT NULL,
+                    created_at REAL
+                )
+            """)
+            
+            # One row per (model name, stage): moving a stage is a single-row upsert
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS model_pointers (
+                    model_name TEXT NOT NULL,
+                    stage TEXT NOT NULL,
+                    model_version TEXT,
+                    generation INTEGER NOT NULL DEFAULT 0,
+                    updated_at REAL,
+                    PRIMARY KEY (model_name, stage)
+                ) WITHOUT ROWID
+            """)
+            
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS metric_buckets (
+                    resolution INTEGER,
+                    bucket_start INTEGER,
+                    metric TEXT,
+                    count REAL,
+                    total REAL,
+                    maximum REAL,
+                    PRIMARY KEY (resolution, bucket_start, metric)
+                ) WITHOUT ROWID
+            """)
+        
+        # Columns added after the original schema
+        self._add_column_if_missing(cursor, 'drift_events', 'segment', 'TEXT')
+        self._add_column_if_missing(cursor, 'training_jobs', 'snapshot_id', 'TEXT')
+        self._add_column_if_missing(cursor, 'predictions', 'shadow_version', 'TEXT')
+        self._add_column_if_missing(cursor, 'predictions', 'shadow_prediction', 'INTEGER')
+        for column in ('queued_at', 'started_at', 'finished_at'):
+            self._add_column_if_missing(cursor, 'training_jobs', column, 'REAL')
+        self._add_column_if_missing(cursor, 'model_registry', 'model_name', 'TEXT')
+        self._add_column_if_missing(cursor, 'model_registry', 'stage', 'TEXT')
+        
+        # Registries from before stage pointers: the deployed model becomes production
+        query = "UPDATE model_registry SET model_name = {0} WHERE model_name IS NULL"
+        cursor.execute(query.format('%s' if self.use_postgres else '?'), (DEFAULT_MODEL_NAME,))
+        query = """
+            INSERT INTO model_pointers (model_name, stage, model_version, generation, updated_at)
+            SELECT model_name, 'production', model_version, 1, {0} FROM model_registry r
+            WHERE deployed = {0} AND NOT EXISTS (
+                SELECT 1 FROM model_pointers p WHERE p.model_name = r.model_name AND p.stage = 'production'
+            )
+            ORDER BY timestamp DESC LIMIT 1
+        """
+        cursor.execute(query.format('%s' if self.use_postgres else '?'), (time.time(), True))
+        cursor.execute("""
+            UPDATE model_registry SET stage = 'production'
+            WHERE stage IS NULL AND model_version IN (SELECT model_version FROM model_pointers WHERE stage = 'production')
+        """)
+        
+        # Feature history keyed by event time (epoch seconds) for point-in-time reads
+        if self.use_postgres:
+            self._add_column_if_missing(cursor, 'feature_store', 'event_timestamp', 'DOUBLE PRECISION')
+            cursor.execute("""
+                UPDATE feature_store SET event_timestamp = EXTRACT(EPOCH FROM timestamp)
+                WHERE event_timestamp IS NULL
+            """)
+        else:
+            self._add_column_if_missing(cursor, 'feature_store', 'event_timestamp', 'REAL')
+            cursor.execute("""
+                UPDATE feature_store SET event_timestamp = CAST(strftime('%s', timestamp) AS REAL)
+                WHERE event_timestamp IS NULL
+            """)
+        # Covering, so history scans read the index in time order and never the table
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_feature_store_group_time
+            ON feature_store (feature_group, event_timestamp, id, feature_name, entity_id, feature_value)
+        """)
         
         conn.commit()
         conn.close()
@@ -209,10 +430,19 @@ class DatabaseManager:
         db_type = "PostgreSQL" if self.use_postgres else "SQLite"
         logger.info(f"{db_type} database initialized successfully")
         
+    def _add_column_if_missing(self, cursor, table: str, column: str, column_type: str):
+        """Add a column to an existing table created by an older schema"""
+        if self.use_postgres:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column} {column_type}")
+        else:
+            cursor.execute(f"PRAGMA table_info({table})")
+            if column not in [row[1] for row in cursor.fetchall()]:
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+        
     def log_prediction(self, features: List[float], prediction: int, 
                       probability: float = None, true_label: Optional[int] = None, 
                       model_version: str = "v1", service_id: str = "prediction_service"):
-        """Log a prediction"""
+        """Log a prediction and return its row id"""
         conn = self._get_connection()
         cursor = conn.cursor()
         
@@ -221,47 +451,62 @@ class DatabaseManager:
                 INSERT INTO predictions 
                 (features, prediction, probability, true_label, model_version, service_id)
                 VALUES (%s, %s, %s, %s, %s, %s)
+                RETURNING id
             """, (json.dumps(features), prediction, probability, true_label, model_version, service_id))
+            prediction_id = cursor.fetchone()[0]
         else:
             cursor.execute("""
                 INSERT INTO predictions 
                 (features, prediction, probability, true_label, model_version, service_id)
                 VALUES (?, ?, ?, ?, ?, ?)
             """, (json.dumps(features), prediction, probability, true_label, model_version, service_id))
+            prediction_id = cursor.lastrowid
         
         conn.commit()
         conn.close()
+        return prediction_id
         
     def log_drift_event(self, drift_detected: bool, drift_score: float,
                        affected_features: List[str], drift_metrics: Dict, 
-                       action_taken: str):
-        """Log a drift detection event"""
+                       action_taken: str, segment: str = None):
+        """Log a drift detection event (segment is None for global checks)"""
+        self.log_drift_events([(drift_detected, drift_score, affected_features,
+                                drift_metrics, action_taken, segment)])
+        logger.info(f"Drift event logged: detected={drift_detected}, action={action_taken}")
+        
+    def log_drift_events(self, events: List[tuple]):
+        """Log several drift events in one transaction
+        
+        Each event is (drift_detected, drift_score, affected_features,
+        drift_metrics, action_taken, segment).
+        """
+        rows = [
+            (bool(detected), score, json.dumps(features), json.dumps(metrics), action, segment)
+            for detected, score, features, metrics, action, segment in events
+        ]
         conn = self._get_connection()
         cursor = conn.cursor()
         
         if self.use_postgres:
-            cursor.execute("""
+            cursor.executemany("""
                 INSERT INTO drift_events 
-                (drift_detected, drift_score, affected_features, drift_metrics, action_taken)
-                VALUES (%s, %s, %s, %s, %s)
-            """, (drift_detected, drift_score, json.dumps(affected_features), 
-                  json.dumps(drift_metrics), action_taken))
+                (drift_detected, drift_score, affected_features, drift_metrics, action_taken, segment)
+                VALUES (%s, %s, %s, %s, %s, %s)
+            """, rows)
         else:
-            cursor.execute("""
+            cursor.executemany("""
                 INSERT INTO drift_events 
-                (drift_detected, drift_score, affected_features, drift_metrics, action_taken)
-                VALUES (?, ?, ?, ?, ?)
-            """, (drift_detected, drift_score, json.dumps(affected_features), 
-                  json.dumps(drift_metrics), action_taken))
+                (drift_detected, drift_score, affected_features, drift_metrics, action_taken, segment)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, rows)
         
         conn.commit()
         conn.close()
-        logger.info(f"Drift event logged: detected={drift_detected}, action={action_taken}")
         
     def log_training_job(self, job_id: str, status: str, metrics: Dict = None,
                         model_version: str = None, trigger_reason: str = None,
-                        mlflow_run_id: str = None):
-        """Log a training job"""
+                        mlflow_run_id: str = None, snapshot_id: str = None):
+        """Log a training job, updating the row if the job was logged before"""
         conn = self._get_connection()
         cursor = conn.cursor()
         
@@ -270,92 +515,149 @@ class DatabaseManager:
                 cursor.execute("""
                     INSERT INTO training_jobs 
                     (job_id, status, accuracy, f1_score, precision_score, recall_score,
-                     training_time, samples_count, model_version, trigger_reason, mlflow_run_id)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                     training_time, samples_count, model_version, trigger_reason, mlflow_run_id,
+                     snapshot_id)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    ON CONFLICT (job_id) DO UPDATE SET
+                        status = EXCLUDED.status,
+                        accuracy = EXCLUDED.accuracy,
+                        f1_score = EXCLUDED.f1_score,
+                        precision_score = EXCLUDED.precision_score,
+                        recall_score = EXCLUDED.recall_score,
+                        training_time = EXCLUDED.training_time,
+                        samples_count = EXCLUDED.samples_count,
+                        model_version = EXCLUDED.model_version,
+                        trigger_reason = COALESCE(EXCLUDED.trigger_reason, training_jobs.trigger_reason),
+                        mlflow_run_id = EXCLUDED.mlflow_run_id,
+                        snapshot_id = COALESCE(EXCLUDED.snapshot_id, training_jobs.snapshot_id)
                 """, (job_id, status, metrics.get('accuracy'), metrics.get('f1_score'),
                       metrics.get('precision'), metrics.get('recall'),
                       metrics.get('training_time'), metrics.get('samples_count'),
-                      model_version, trigger_reason, mlflow_run_id))
+                      model_version, trigger_reason, mlflow_run_id, snapshot_id))
             else:
                 cursor.execute("""
-                    INSERT INTO training_jobs (job_id, status)
-                    VALUES (%s, %s)
-                """, (job_id, status))
+                    INSERT INTO training_jobs (job_id, status, trigger_reason, snapshot_id)
+                    VALUES (%s, %s, %s, %s)
+                    ON CONFLICT (job_id) DO UPDATE SET
+                        status = EXCLUDED.status,
+                        trigger_reason = COALESCE(EXCLUDED.trigger_reason, training_jobs.trigger_reason),
+                        snapshot_id = COALESCE(EXCLUDED.snapshot_id, training_jobs.snapshot_id)
+                """, (job_id, status, trigger_reason, snapshot_id))
         else:
             if metrics:
                 cursor.execute("""
                     INSERT INTO training_jobs 
                     (job_id, status, accuracy, f1_score, precision_score, recall_score,
-                     training_time, samples_count, model_version, trigger_reason, mlflow_run_id)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                     training_time, samples_count, model_version, trigger_reason, mlflow_run_id,
+                     snapshot_id)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (job_id) DO UPDATE SET
+                        status = excluded.status,
+                        accuracy = excluded.accuracy,
+                        f1_score = excluded.f1_score,
+                        precision_score = excluded.precision_score,
+                        recall_score = excluded.recall_score,
+                        training_time = excluded.training_time,
+                        samples_count = excluded.samples_count,
+                        model_version = excluded.model_version,
+                        trigger_reason = COALESCE(excluded.trigger_reason, training_jobs.trigger_reason),
+                        mlflow_run_id = excluded.mlflow_run_id,
+                        snapshot_id = COALESCE(excluded.snapshot_id, training_jobs.snapshot_id)
                 """, (job_id, status, metrics.get('accuracy'), metrics.get('f1_score'),
                       metrics.get('precision'), metrics.get('recall'),
                       metrics.get('training_time'), metrics.get('samples_count'),
-                      model_version, trigger_reason, mlflow_run_id))
+                      model_version, trigger_reason, mlflow_run_id, snapshot_id))
             else:
                 cursor.execute("""
-                    INSERT INTO training_jobs (job_id, status)
-                    VALUES (?, ?)
-                """, (job_id, status))
+                    INSERT INTO training_jobs (job_id, status, trigger_reason, snapshot_id)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT (job_id) DO UPDATE SET
+                        status = excluded.status,
+                        trigger_reason = COALESCE(excluded.trigger_reason, training_jobs.trigger_reason),
+                        snapshot_id = COALESCE(excluded.snapshot_id, training_jobs.snapshot_id)
+                """, (job_id, status, trigger_reason, snapshot_id))
         
         conn.commit()
         conn.close()
         logger.info(f"Training job logged: {job_id} - {status}")
         
-    def register_model(self, model_version: str, model_path: str, 
-                      metrics: Dict, status: str = "registered"):
-        """Register a model in the registry"""
+    def log_job_transition(self, job_id: str, status: str, trigger_reason: str = None,
+                           timestamp: float = None):
+        """Record a job state change with its epoch timestamp"""
+        column = JOB_TRANSITION_COLUMNS[status]
+        timestamp = timestamp or time.time()
         conn = self._get_connection()
         cursor = conn.cursor()
         
         if self.use_postgres:
-            cursor.execute("""
-                INSERT INTO model_registry (model_version, model_path, metrics, status)
+            cursor.execute(f"""
+                INSERT INTO training_jobs (job_id, status, trigger_reason, {column})
                 VALUES (%s, %s, %s, %s)
-            """, (model_version, model_path, json.dumps(metrics), status))
+                ON CONFLICT (job_id) DO UPDATE SET
+                    status = EXCLUDED.status,
+                    trigger_reason = COALESCE(EXCLUDED.trigger_reason, training_jobs.trigger_reason),
+                    {column} = EXCLUDED.{column}
+            """, (job_id, status, trigger_reason, timestamp))
         else:
-            cursor.execute("""
-                INSERT INTO model_registry (model_version, model_path, metrics, status)
+            cursor.execute(f"""
+                INSERT INTO training_jobs (job_id, status, trigger_reason, {column})
                 VALUES (?, ?, ?, ?)
-            """, (model_version, model_path, json.dumps(metrics), status))
+                ON CONFLICT (job_id) DO UPDATE SET
+                    status = excluded.status,
+                    trigger_reason = COALESCE(excluded.trigger_reason, training_jobs.trigger_reason),
+                    {column} = excluded.{column}
+            """, (job_id, status, trigger_reason, timestamp))
         
         conn.commit()
         conn.close()
-        logger.info(f"Model registered: {model_version}")
         
-    def get_active_model(self) -> Optional[Dict]:
-        """Get the currently deployed model"""
+    def get_training_jobs(self, limit: int = 50) -> List[Dict]:
+        """Most recent training jobs with their state timestamps"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        query = """
+            SELECT job_id, status, trigger_reason, model_version, snapshot_id,
+                   queued_at, started_at, finished_at
+            FROM training_jobs
+            ORDER BY id DESC
+            LIMIT {}
+        """.format('%s' if self.use_postgres else '?')
+        cursor.execute(query, (limit,))
+        
+        columns = ['job_id', 'status', 'trigger_reason', 'model_version', 'snapshot_id',
+                   'queued_at', 'started_at', 'finished_at']
+        rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        conn.close()
+        return rows
+        
+    def register_model(self, model_version: str, model_path: str, 
+                      metrics: Dict, status: str = "registered", model_name: str = DEFAULT_MODEL_NAME):
+        """Register a model version under a model name (no stage until one is set)"""
         conn = self._get_connection()
         cursor = conn.cursor()
         
         if self.use_postgres:
             cursor.execute("""
-                SELECT model_version, model_path, metrics 
-                FROM model_registry 
-                WHERE deployed = TRUE 
-                ORDER BY timestamp DESC 
-                LIMIT 1
-            """)
+                INSERT INTO model_registry (model_version, model_path, metrics, status, model_name)
+                VALUES (%s, %s, %s, %s, %s)
+            """, (model_version, model_path, json.dumps(metrics), status, model_name))
         else:
             cursor.execute("""
-                SELECT model_version, model_path, metrics 
-                FROM model_registry 
-                WHERE deployed = 1 
-                ORDER BY timestamp DESC 
-                LIMIT 1
-            """)
+                INSERT INTO model_registry (model_version, model_path, metrics, status, model_name)
+                VALUES (?, ?, ?, ?, ?)
+            """, (model_version, model_path, json.dumps(metrics), status, model_name))
         
-        row = cursor.fetchone()
+        conn.commit()
         conn.close()
+        logger.info(f"Model registered: {model_version}")
         
-        if row:
-            metrics_data = row[2] if self.use_postgres else json.loads(row[2])
-            return {
-                'model_version': row[0],
-                'model_path': row[1],
-                'metrics': metrics_data
-            }
-        return None
+    def get_active_model(self, model_name: str = DEFAULT_MODEL_NAME) -> Optional[Dict]:
+        """Get the production version of a model, through its stage pointer"""
+        pointer = self.get_model_pointers(model_name)[1].get('production')
+        if pointer is None:
+            return None
+        return {key: pointer[key] for key in ('model_version', 'model_path', 'metrics')}
     
     def get_recent_predictions(self, limit: int = 100) -> List[Dict]:
         """Get recent predictions for drift monitoring"""
@@ -391,26 +693,757 @@ class DatabaseManager:
         
         return predictions
     
+    def get_prediction_counts_since(self, after_id: int = 0) -> tuple:
+        """(highest id, {prediction: count}) over predictions with id > after_id"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        query = "SELECT prediction, COUNT(*), MAX(id) FROM predictions WHERE id > {0} GROUP BY prediction"
+        cursor.execute(query.format('%s' if self.use_postgres else '?'), (after_id,))
+        
+        rows = cursor.fetchall()
+        conn.close()
+        return max([after_id] + [row[2] for row in rows]), {row[0]: row[1] for row in rows}
+    
+    def get_predictions_after(self, after_id: int, limit: int, max_id: int = None) -> List[Dict]:
+        """Newest ``limit`` predictions with after_id < id <= max_id, newest first"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        ph = '%s' if self.use_postgres else '?'
+        query = f"SELECT id, prediction, probability, timestamp FROM predictions WHERE id > {ph}"
+        params = [after_id]
+        if max_id is not None:
+            query += f" AND id <= {ph}"
+            params.append(max_id)
+        query += f" ORDER BY id DESC LIMIT {ph}"
+        params.append(limit)
+        cursor.execute(query, params)
+        
+        rows = cursor.fetchall()
+        conn.close()
+        return [{'id': row[0], 'prediction': row[1], 'probability': row[2], 'timestamp': row[3]}
+                for row in rows]
+    
+    def get_drift_counts_since(self, after_id: int = 0) -> tuple:
+        """(highest id, events with drift detected) over drift events with id > after_id"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        query = """
+            SELECT MAX(id), COUNT(CASE WHEN drift_detected THEN 1 END)
+            FROM drift_events WHERE id > {0}
+        """
+        cursor.execute(query.format('%s' if self.use_postgres else '?'), (after_id,))
+        
+        row = cursor.fetchone()
+        conn.close()
+        return row[0] or after_id, row[1]
+    
+    def get_models_since(self, after_id: int = 0) -> List[Dict]:
+        """Registered models with id > after_id, in registration order"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        query = "SELECT id, model_version, metrics FROM model_registry WHERE id > {0} ORDER BY id"
+        cursor.execute(query.format('%s' if self.use_postgres else '?'), (after_id,))
+        
+        rows = cursor.fetchall()
+        conn.close()
+        return [{
+            'id': row[0],
+            'model_version': row[1],
+            'metrics': row[2] if self.use_postgres else json.loads(row[2])
+        } for row in rows]
+    
     def deploy_model(self, model_version: str):
-        """Mark a model as deployed and undeploy others"""
+        """Move a model to production, archiving the version it replaces"""
+        self.set_model_stage(model_version, 'production')
+        logger.info(f"Model deployed: {model_version}")
+    
+    def set_model_stage(self, model_version: str, stage: str) -> int:
+        """Move a registered version to a stage; returns the stage pointer's new generation
+        
+        Staging and production are single pointer rows per model name, so a
+        move is one upsert that swaps the version and bumps the generation;
+        the version it displaces is archived in the same transaction and
+        only the two affected registry rows are written. Archiving a version
+        clears any pointer still naming it.
+        """
+        if stage not in MODEL_STAGES:
+            raise ValueError(f"Unknown model stage: {stage}")
+        ph = '%s' if self.use_postgres else '?'
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute(f"SELECT model_name, model_path FROM model_registry WHERE model_version = {ph}",
+                           (model_version,))
+            row = cursor.fetchone()
+            if row is None:
+                raise ValueError(f"Model version not registered: {model_version}")
+            if row[1] is None and stage != 'archived':
+                raise ValueError(f"Artifact of {model_version} was released; it can only stay archived")
+            model_name, now = row[0], time.time()
+        
+            if stage != 'archived':
+                cursor.execute(f"""
+                    UPDATE model_registry SET stage = 'archived', deployed = {ph}
+                    WHERE model_version = (
+                        SELECT model_version FROM model_pointers WHERE model_name = {ph} AND stage = {ph}
+                    ) AND model_version != {ph}
+                """, (False, model_name, stage, model_version))
+                cursor.execute(f"""
+                    INSERT INTO model_pointers (model_name, stage, model_version, generation, updated_at)
+                    VALUES ({ph}, {ph}, {ph}, 1, {ph})
+                    ON CONFLICT (model_name, stage) DO UPDATE SET
+                        model_version = excluded.model_version,
+                        generation = model_pointers.generation + 1,
+                        updated_at = excluded.updated_at
+                """, (model_name, stage, model_version, now))
+            # A version holds one stage: drop it from any other pointer
+            cursor.execute(f"""
+                UPDATE model_pointers SET model_version = NULL, generation = generation + 1, updated_at = {ph}
+                WHERE model_name = {ph} AND stage != {ph} AND model_version = {ph}
+            """, (now, model_name, stage, model_version))
+            cursor.execute(f"UPDATE model_registry SET stage = {ph}, deployed = {ph} WHERE model_version = {ph}",
+                           (stage, stage == 'production', model_version))
+            
+            cursor.execute(f"SELECT generation FROM model_pointers WHERE model_name = {ph} AND stage = {ph}",
+                           (model_name, stage))
+            row = cursor.fetchone()
+            conn.commit()
+        finally:
+            conn.close()
+        logger.info(f"Model {model_name}/{model_version} -> {stage}")
+        return row[0] if row else 0
+    
+    def get_registry_generation(self, model_name: str = DEFAULT_MODEL_NAME) -> int:
+        """Version stamp of a model name's stage pointers; grows on every move"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        query = "SELECT COALESCE(SUM(generation), 0) FROM model_pointers WHERE model_name = {0}"
+        cursor.execute(query.format('%s' if self.use_postgres else '?'), (model_name,))
+        
+        row = cursor.fetchone()
+        conn.close()
+        return row[0]
+    
+    def get_model_pointers(self, model_name: str = DEFAULT_MODEL_NAME) -> tuple:
+        """(version stamp, {stage: registered model}) for a model name's set pointers"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        query = """
+            SELECT p.stage, p.generation, r.model_version, r.model_path, r.metrics
+            FROM model_pointers p LEFT JOIN model_registry r ON r.model_version = p.model_version
+            WHERE p.model_name = {0}
+        """
+        cursor.execute(query.format('%s' if self.use_postgres else '?'), (model_name,))
+        
+        rows = cursor.fetchall()
+        conn.close()
+        pointers = {}
+        for stage, generation, version, path, metrics in rows:
+            if version is not None:
+                pointers[stage] = {
+                    'model_name': model_name,
+                    'model_version': version,
+                    'model_path': path,
+                    'metrics': metrics if self.use_postgres or metrics is None else json.loads(metrics),
+                    'generation': generation
+                }
+        return sum(row[1] for row in rows), pointers
+    
+    def get_latest_model(self, model_name: str = DEFAULT_MODEL_NAME) -> Optional[Dict]:
+        """Newest registered version of a model that still has its artifact"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        query = """
+            SELECT model_version, model_path FROM model_registry
+            WHERE model_name = {0} AND model_path IS NOT NULL ORDER BY id DESC LIMIT 1
+        """
+        cursor.execute(query.format('%s' if self.use_postgres else '?'), (model_name,))
+        
+        row = cursor.fetchone()
+        conn.close()
+        return {'model_version': row[0], 'model_path': row[1]} if row else None
+    
+    def get_artifact_refcounts(self) -> Dict[str, int]:
+        """Registered versions referencing each artifact path (the artifact store's roots)"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT model_path, COUNT(*) FROM model_registry
+            WHERE model_path IS NOT NULL GROUP BY model_path
+        """)
+        
+        rows = cursor.fetchall()
+        conn.close()
+        return {row[0]: row[1] for row in rows}
+    
+    def release_model_artifacts(self, model_name: str = DEFAULT_MODEL_NAME, keep: int = 5,
+                                protected: List[str] = ()) -> List[str]:
+        """Drop the artifact reference of archived or unstaged versions beyond the newest ``keep``
+        
+        Rows stay for history; a released version can no longer be staged.
+        Returns the released versions.
+        """
+        ph = '%s' if self.use_postgres else '?'
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute(f"""
+            SELECT model_version FROM model_registry
+            WHERE model_name = {ph} AND model_path IS NOT NULL AND (stage IS NULL OR stage = 'archived')
+            ORDER BY id DESC
+        """, (model_name,))
+        released = [row[0] for row in cursor.fetchall()[keep:] if row[0] not in protected]
+        cursor.executemany(f"UPDATE model_registry SET model_path = NULL WHERE model_version = {ph}",
+                           [(version,) for version in released])
+        
+        conn.commit()
+        conn.close()
+        if released:
+            logger.info(f"Released artifacts of {len(released)} {model_name} versions")
+        return released
+
+    def get_model(self, model_version: str) -> Optional[Dict]:
+        """Look up a registered model by version"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        query = """
+            SELECT model_version, model_path, status, deployed, model_name, stage
+            FROM model_registry WHERE model_version = {}
+        """
+        cursor.execute(query.format('%s' if self.use_postgres else '?'), (model_version,))
+        
+        row = cursor.fetchone()
+        conn.close()
+        if row:
+            return {'model_version': row[0], 'model_path': row[1], 'status': row[2], 'deployed': bool(row[3]),
+                    'model_name': row[4], 'stage': row[5]}
+        return None
+        
+    def log_shadow_predictions(self, prediction_ids: List[int], shadow_version: str,
+                               predictions: List[int]):
+        """Attach a shadow model's outputs to already-logged predictions"""
+        rows = [(shadow_version, int(pred), int(pid)) for pid, pred in zip(prediction_ids, predictions)]
+        if not rows:
+            return
+        
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        if self.use_postgres:
+            cursor.executemany("""
+                UPDATE predictions SET shadow_version = %s, shadow_prediction = %s WHERE id = %s
+            """, rows)
+        else:
+            cursor.executemany("""
+                UPDATE predictions SET shadow_version = ?, shadow_prediction = ? WHERE id = ?
+            """, rows)
+        
+        conn.commit()
+        conn.close()
+        
+    def update_model_status(self, model_version: str, status: str):
+        """Set a registered model's status (trained, deployed, rejected)"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        if self.use_postgres:
+            cursor.execute("UPDATE model_registry SET status = %s WHERE model_version = %s",
+                           (status, model_version))
+        else:
+            cursor.execute("UPDATE model_registry SET status = ? WHERE model_version = ?",
+                           (status, model_version))
+        
+        conn.commit()
+        conn.close()
+        
+    def save_model_evaluation(self, model_version: str, snapshot_id: str, metrics: Dict):
+        """Cache a model's holdout metrics for one snapshot"""
         conn = self._get_connection()
         cursor = conn.cursor()
         
         if self.use_postgres:
-            cursor.execute("UPDATE model_registry SET deployed = FALSE")
             cursor.execute("""
-                UPDATE model_registry 
-                SET deployed = TRUE 
-                WHERE model_version = %s
-            """, (model_version,))
+                INSERT INTO model_evaluations (model_version, snapshot_id, metrics)
+                VALUES (%s, %s, %s)
+                ON CONFLICT (model_version, snapshot_id) DO UPDATE SET metrics = EXCLUDED.metrics
+            """, (model_version, snapshot_id, json.dumps(metrics)))
         else:
-            cursor.execute("UPDATE model_registry SET deployed = 0")
             cursor.execute("""
-                UPDATE model_registry 
-                SET deployed = 1 
-                WHERE model_version = ?
-            """, (model_version,))
+                INSERT INTO model_evaluations (model_version, snapshot_id, metrics)
+                VALUES (?, ?, ?)
+                ON CONFLICT (model_version, snapshot_id) DO UPDATE SET metrics = excluded.metrics
+            """, (model_version, snapshot_id, json.dumps(metrics)))
         
         conn.commit()
         conn.close()
-        logger.info(f"Model deployed: {model_version}")
+        
+    def get_model_evaluation(self, model_version: str, snapshot_id: str) -> Optional[Dict]:
+        """Cached holdout metrics, or None if the pair was never scored"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        query = "SELECT metrics FROM model_evaluations WHERE model_version = {0} AND snapshot_id = {0}"
+        cursor.execute(query.format('%s' if self.use_postgres else '?'), (model_version, snapshot_id))
+        
+        row = cursor.fetchone()
+        conn.close()
+        return json.loads(row[0]) if row else None
+        
+    def save_preprocessor(self, version: str, spec: Dict):
+        """Register a fitted preprocessor; re-registering a version makes it current again"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        if self.use_postgres:
+            cursor.execute("""
+                INSERT INTO preprocessors (version, spec, created_at) VALUES (%s, %s, %s)
+                ON CONFLICT (version) DO UPDATE SET created_at = EXCLUDED.created_at
+            """, (version, json.dumps(spec), time.time()))
+        else:
+            cursor.execute("""
+                INSERT INTO preprocessors (version, spec, created_at) VALUES (?, ?, ?)
+                ON CONFLICT (version) DO UPDATE SET created_at = excluded.created_at
+            """, (version, json.dumps(spec), time.time()))
+        
+        conn.commit()
+        conn.close()
+    
+    def get_current_preprocessor(self) -> Optional[Dict]:
+        """Spec of the most recently registered preprocessor, or None"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT spec FROM preprocessors ORDER BY created_at DESC LIMIT 1")
+        
+        row = cursor.fetchone()
+        conn.close()
+        return json.loads(row[0]) if row else None
+    
+    def get_preprocessor(self, version: str) -> Optional[Dict]:
+        """Spec of a registered preprocessor version, or None"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+
+        ph = '%s' if self.use_postgres else '?'
+        cursor.execute(f"SELECT spec FROM preprocessors WHERE version = {ph}", (version,))
+
+        row = cursor.fetchone()
+        conn.close()
+        return json.loads(row[0]) if row else None
+
+    def _upsert_online(self, cursor, rows: List[tuple]):
+        """Upsert (entity_id, feature_group, features, updated_at) rows on an open cursor"""
+        params = [(entity_id, group, _features_json(features), updated_at)
+                  for entity_id, group, features, updated_at in rows]
+        
+        if self.use_postgres:
+            execute_values(cursor, """
+                INSERT INTO online_features (entity_id, feature_group, features, updated_at)
+                VALUES %s
+                ON CONFLICT (entity_id, feature_group) DO UPDATE SET
+                    features = online_features.features || EXCLUDED.features,
+                    updated_at = EXCLUDED.updated_at
+                WHERE online_features.updated_at <= EXCLUDED.updated_at
+            """, params, page_size=1000)
+        else:
+            cursor.executemany("""
+                INSERT INTO online_features (entity_id, feature_group, features, updated_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (entity_id, feature_group) DO UPDATE SET
+                    features = json_patch(online_features.features, excluded.features),
+                    updated_at = excluded.updated_at
+                WHERE online_features.updated_at <= excluded.updated_at
+            """, params)
+        
+    def upsert_online_features(self, rows: List[tuple], updated_at: float = None):
+        """Merge (entity_id, feature_group, features) into the latest-value rows
+        
+        Features not present in an update, or non-finite (NaN/inf) in it,
+        keep their stored value. Updates older than the stored row (e.g.
+        backfills) are ignored.
+        """
+        if not rows:
+            return
+        updated_at = time.time() if updated_at is None else updated_at
+        
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        self._upsert_online(cursor, [(entity_id, group, features, updated_at)
+                                     for entity_id, group, features in rows])
+        conn.commit()
+        conn.close()
+        
+    def write_features(self, history_rows, online_rows: List[tuple]):
+        """Append feature history and upsert online rows in one transaction
+        
+        ``history_rows`` yields (feature_name, feature_value, entity_id,
+        feature_group, event_timestamp); PostgreSQL loads them with COPY.
+        ``online_rows`` are (entity_id, feature_group, features, updated_at),
+        at most one per key.
+        """
+        conn = self._get_connection()
+        try:
+            cursor = conn.cursor()
+            
+            if self.use_postgres:
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                for name, value, entity_id, group, timestamp in history_rows:
+                    writer.writerow((name, '' if value is None or value != value else value,
+                                     entity_id, group, timestamp))
+                buffer.seek(0)
+                cursor.copy_expert("""
+                    COPY feature_store (feature_name, feature_value, entity_id, feature_group, event_timestamp)
+                    FROM STDIN WITH (FORMAT csv)
+                """, buffer)
+            else:
+                cursor.executemany("""
+                    INSERT INTO feature_store (feature_name, feature_value, entity_id, feature_group, event_timestamp)
+                    VALUES (?, ?, ?, ?, ?)
+                """, history_rows)
+            
+            self._upsert_online(cursor, online_rows)
+            conn.commit()
+        finally:
+            conn.close()
+        
+    def get_online_features(self, entity_ids: List[str], feature_group: str,
+                            chunk_size: int = 500) -> Dict[str, Dict]:
+        """Latest features per entity by primary-key lookup; unknown entities are omitted"""
+        found = {}
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        marker = '%s' if self.use_postgres else '?'
+        for start in range(0, len(entity_ids), chunk_size):
+            chunk = list(entity_ids[start:start + chunk_size])
+            cursor.execute(f"""
+                SELECT entity_id, features FROM online_features
+                WHERE feature_group = {marker} AND entity_id IN ({', '.join([marker] * len(chunk))})
+            """, [feature_group] + chunk)
+            for entity_id, features in cursor.fetchall():
+                # psycopg2 decodes JSONB itself
+                found[entity_id] = json.loads(features) if isinstance(features, str) else features
+        
+        conn.close()
+        return found
+        
+    def get_feature_names(self, feature_group: str) -> List[str]:
+        """Distinct feature names recorded for a feature group"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        query = "SELECT DISTINCT feature_name FROM feature_store WHERE feature_group = {}"
+        cursor.execute(query.format('%s' if self.use_postgres else '?'), (feature_group,))
+        
+        names = sorted(row[0] for row in cursor.fetchall())
+        conn.close()
+        return names
+        
+    def iter_feature_history(self, feature_group: str, feature_names: List[str] = None,
+                             end: float = None, chunk_size: int = 100000):
+        """Stream feature history in event-time order as columnar chunks
+        
+        Yields (entity_ids, feature_names, values, event_timestamps) arrays,
+        using keyset pagination on (event_timestamp, id). ``end`` stops at
+        rows later than that epoch time.
+        """
+        import numpy as np
+        
+        marker = '%s' if self.use_postgres else '?'
+        filters = [f"feature_group = {marker}", f"(event_timestamp, id) > ({marker}, {marker})"]
+        filter_params = [feature_group]
+        if feature_names:
+            filters.append(f"feature_name IN ({', '.join([marker] * len(feature_names))})")
+        if end is not None:
+            filters.append(f"event_timestamp <= {marker}")
+        query = f"""
+            SELECT id, event_timestamp, entity_id, feature_name, feature_value FROM feature_store
+            WHERE {' AND '.join(filters)}
+            ORDER BY event_timestamp, id LIMIT {marker}
+        """
+        
+        last = (float('-inf'), 0)
+        while True:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            cursor.execute(query, filter_params + list(last) + list(feature_names or [])
+                           + ([end] if end is not None else []) + [chunk_size])
+            rows = cursor.fetchall()
+            conn.close()
+            if not rows:
+                return
+            
+            last = (rows[-1][1], rows[-1][0])
+            _, ts, entity_ids, names, values = zip(*rows)
+            yield (np.array(entity_ids, dtype=object), np.array(names, dtype=object),
+                   np.array(values, dtype=np.float64), np.array(ts, dtype=np.float64))
+            if len(rows) < chunk_size:
+                return
+        
+    def update_true_labels(self, prediction_ids: List[int], labels: List[int],
+                           window_seconds: int = 3600) -> int:
+        """Attach delayed ground-truth labels to logged predictions in bulk
+        
+        Only predictions that were still unlabeled are updated, and each one
+        increments its cell in ``performance_confusion`` for the time window of
+        the original prediction, so rolling metrics never rescan predictions.
+        Returns the number of predictions labeled.
+        """
+        label_by_id = {int(pid): int(label) for pid, label in zip(prediction_ids, labels)}
+        if not label_by_id:
+            return 0
+        
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        ids = list(label_by_id)
+        if self.use_postgres:
+            cursor.execute("""
+                SELECT id, prediction, model_version, timestamp
+                FROM predictions
+                WHERE id = ANY(%s) AND true_label IS NULL
+                FOR UPDATE
+            """, (ids,))
+        else:
+            # Take the write lock before reading, so a concurrent labeling of the
+            # same ids waits and then sees them labeled (Postgres: FOR UPDATE)
+            cursor.execute("BEGIN IMMEDIATE")
+            placeholders = ','.join('?' * len(ids))
+            cursor.execute(f"""
+                SELECT id, prediction, model_version, timestamp
+                FROM predictions
+                WHERE id IN ({placeholders}) AND true_label IS NULL
+            """, ids)
+        rows = cursor.fetchall()
+        
+        cells = Counter()
+        updates = []
+        for pred_id, prediction, version, timestamp in rows:
+            label = label_by_id[pred_id]
+            window_start = _window_start(timestamp, window_seconds)
+            cells[(window_start, version, label, prediction)] += 1
+            updates.append((label, pred_id))
+        
+        cell_rows = [key + (count,) for key, count in cells.items()]
+        
+        if self.use_postgres:
+            cursor.executemany("UPDATE predictions SET true_label = %s WHERE id = %s AND true_label IS NULL",
+                               updates)
+            cursor.executemany("""
+                INSERT INTO performance_confusion
+                (window_start, model_version, true_label, predicted_label, count)
+                VALUES (%s, %s, %s, %s, %s)
+                ON CONFLICT (window_start, model_version, true_label, predicted_label)
+                DO UPDATE SET count = performance_confusion.count + EXCLUDED.count
+            """, cell_rows)
+        else:
+            cursor.executemany("UPDATE predictions SET true_label = ? WHERE id = ? AND true_label IS NULL",
+                               updates)
+            cursor.executemany("""
+                INSERT INTO performance_confusion
+                (window_start, model_version, true_label, predicted_label, count)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (window_start, model_version, true_label, predicted_label)
+                DO UPDATE SET count = count + excluded.count
+            """, cell_rows)
+        
+        conn.commit()
+        conn.close()
+        logger.info(f"Labeled {len(updates)} predictions ({len(label_by_id) - len(updates)} skipped)")
+        return len(updates)
+    
+    def iter_labeled_predictions(self, chunk_size: int = 10000):
+        """Stream labeled predictions as (X, y) chunks using keyset pagination"""
+        import numpy as np
+        
+        last_id = 0
+        while True:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            
+            if self.use_postgres:
+                cursor.execute("""
+                    SELECT id, features, true_label FROM predictions
+                    WHERE id > %s AND true_label IS NOT NULL
+                    ORDER BY id LIMIT %s
+                """, (last_id, chunk_size))
+            else:
+                cursor.execute("""
+                    SELECT id, features, true_label FROM predictions
+                    WHERE id > ? AND true_label IS NOT NULL
+                    ORDER BY id LIMIT ?
+                """, (last_id, chunk_size))
+            
+            rows = cursor.fetchall()
+            conn.close()
+            if not rows:
+                return
+            
+            last_id = rows[-1][0]
+            X = np.array([row[1] if self.use_postgres else json.loads(row[1]) for row in rows],
+                         dtype=np.float32)
+            y = np.array([row[2] for row in rows])
+            yield X, y
+    
+    def get_confusion_counts(self, since: int = 0, model_version: str = None) -> List[Dict]:
+        """Get per-window confusion cells with window_start >= since (epoch seconds)"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        ph = '%s' if self.use_postgres else '?'
+        query = f"""
+            SELECT window_start, model_version, true_label, predicted_label, count
+            FROM performance_confusion
+            WHERE window_start >= {ph}
+        """
+        params = [since]
+        if model_version:
+            query += f" AND model_version = {ph}"
+            params.append(model_version)
+        query += " ORDER BY window_start"
+        
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+        conn.close()
+        
+        return [{
+            'window_start': row[0],
+            'model_version': row[1],
+            'true_label': row[2],
+            'predicted_label': row[3],
+            'count': row[4]
+        } for row in rows]
+    
+    def record_output_distribution(self, window_start: int, model_version: str,
+                                   class_counts: Dict[int, int], confidence_counts: List[int]):
+        """Add prediction output counts to the per-window distribution table"""
+        rows = [(window_start, model_version, 'class', int(c), int(n))
+                for c, n in class_counts.items() if n]
+        rows += [(window_start, model_version, 'confidence', b, int(n))
+                 for b, n in enumerate(confidence_counts) if n]
+        if not rows:
+            return
+        
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        if self.use_postgres:
+            cursor.executemany("""
+                INSERT INTO output_distribution (window_start, model_version, kind, bucket, count)
+                VALUES (%s, %s, %s, %s, %s)
+                ON CONFLICT (window_start, model_version, kind, bucket)
+                DO UPDATE SET count = output_distribution.count + EXCLUDED.count
+            """, rows)
+        else:
+            cursor.executemany("""
+                INSERT INTO output_distribution (window_start, model_version, kind, bucket, count)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (window_start, model_version, kind, bucket)
+                DO UPDATE SET count = count + excluded.count
+            """, rows)
+        
+        conn.commit()
+        conn.close()
+    
+    def get_output_distribution(self, since: int = 0, model_version: str = None) -> List[Dict]:
+        """Get per-window output distribution counts with window_start >= since"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        ph = '%s' if self.use_postgres else '?'
+        query = f"""
+            SELECT window_start, model_version, kind, bucket, count
+            FROM output_distribution
+            WHERE window_start >= {ph}
+        """
+        params = [since]
+        if model_version:
+            query += f" AND model_version = {ph}"
+            params.append(model_version)
+        query += " ORDER BY window_start"
+        
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+        conn.close()
+        
+        return [{
+            'window_start': row[0],
+            'model_version': row[1],
+            'kind': row[2],
+            'bucket': row[3],
+            'count': row[4]
+        } for row in rows]
+
+    def record_metric_buckets(self, rows: List[tuple]):
+        """Add (resolution, bucket_start, metric, count, total, maximum) rows to the rollups"""
+        if not rows:
+            return
+        
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        if self.use_postgres:
+            cursor.executemany("""
+                INSERT INTO metric_buckets (resolution, bucket_start, metric, count, total, maximum)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                ON CONFLICT (resolution, bucket_start, metric) DO UPDATE SET
+                    count = metric_buckets.count + EXCLUDED.count,
+                    total = metric_buckets.total + EXCLUDED.total,
+                    maximum = GREATEST(metric_buckets.maximum, EXCLUDED.maximum)
+            """, rows)
+        else:
+            cursor.executemany("""
+                INSERT INTO metric_buckets (resolution, bucket_start, metric, count, total, maximum)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (resolution, bucket_start, metric) DO UPDATE SET
+                    count = count + excluded.count,
+                    total = total + excluded.total,
+                    maximum = max(maximum, excluded.maximum)
+            """, rows)
+        
+        conn.commit()
+        conn.close()
+    
+    def get_metric_buckets(self, resolution: int, start: float, end: float) -> List[tuple]:
+        """(bucket_start, metric, count, total, maximum) rows of one rollup overlapping [start, end)"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        query = """
+            SELECT bucket_start, metric, count, total, maximum FROM metric_buckets
+            WHERE resolution = {0} AND bucket_start > {0} AND bucket_start < {0}
+            ORDER BY bucket_start
+        """
+        cursor.execute(query.format('%s' if self.use_postgres else '?'),
+                       (resolution, int(start) - resolution, end))
+        
+        rows = cursor.fetchall()
+        conn.close()
+        return rows
+
+
+def _features_json(features: Dict) -> str:
+    """Packed online row; NaN/inf are not valid JSON and are left out, so the stored value is kept"""
+    return json.dumps({
+        name: value for name, value in features.items()
+        if not isinstance(value, numbers.Real) or math.isfinite(value)
+    }, default=float)
+
+
+def _window_start(timestamp, window_seconds: int) -> int:
+    """Floor a DB timestamp (UTC datetime or ISO string) to its window start in epoch seconds"""
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp)
+    epoch = calendar.timegm(timestamp.timetuple())
+    return epoch - epoch % window_seconds
@@ -1,6 +1,7 @@
 """Redis client for caching and message queues"""
 import json
-from typing import Any, Optional
+from collections import deque
+from typing import Any, List, Optional
 import time
 
 class RedisClient:
@@ -30,17 +31,56 @@ class RedisClient:
                 del self._cache[key]
         return None
         
+    def incrby(self, key: str, amount: int = 1) -> int:
+        """Increment an integer counter and return the new value"""
+        value = (self.get(key) or 0) + amount
+        self.set(key, value)
+        return value
+        
     def lpush(self, queue: str, value: Any):
         """Push to queue"""
         if queue not in self._queues:
-            self._queues[queue] = []
-        self._queues[queue].insert(0, json.dumps(value))
+            self._queues[queue] = deque()
+        self._queues[queue].appendleft(json.dumps(value))
         
-    def rpop(self, queue: str) -> Optional[Any]:
-        """Pop from queue"""
-        if queue in self._queues and self._queues[queue]:
-            return json.loads(self._queues[queue].pop())
-        return None
+    def ltrim(self, queue: str, start: int, end: int):
+        """Keep only the [start, end] range of a queue (head is index 0)"""
+        items = self._queues.get(queue)
+        if not items:
+            return
+        if start == 0 and end >= 0:
+            # Common ring-buffer case: drop the oldest items from the tail
+            while len(items) > end + 1:
+                items.pop()
+            return
+        end = len(items) + end if end < 0 else end
+        self._queues[queue] = deque(list(items)[start:end + 1])
+        
+    def rpop(self, queue: str, count: int = None) -> Optional[Any]:
+        """Pop from queue; with ``count``, pop up to that many items as a list"""
+        items = self._queues.get(queue)
+        if count is None:
+            if items:
+                return json.loads(items.pop())
+            return None
+        
+        popped: List[Any] = []
+        while items and len(popped) < count:
+            popped.append(json.loads(items.pop()))
+        return popped or None
+        
+    def lpop(self, queue: str, count: int = None) -> Optional[Any]:
+        """Pop from the head (newest pushed); with ``count``, pop up to that many items as a list"""
+        items = self._queues.get(queue)
+        if count is None:
+            if items:
+                return json.loads(items.popleft())
+            return None
+        
+        popped: List[Any] = []
+        while items and len(popped) < count:
+            popped.append(json.loads(items.popleft()))
+        return popped or None
         
     def llen(self, queue: str) -> int:
         """Get queue length"""
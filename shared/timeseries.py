@@ -0,0 +1,91 @@
+"""Pre-aggregated metric time series: bucketed rollups and chart downsampling"""
+import numpy as np
+from typing import Dict, List, Tuple
+
+RESOLUTIONS = (60, 3600, 86400)  # minute, hour and day rollups, finest first
+MAX_BUCKETS = 2000  # most buckets read for one chart before moving to a coarser rollup
+
+# Log-spaced latency histogram (0.1 ms .. 100 s, ~26% wide bins) so
+# percentiles can be merged across requests and rollups
+LATENCY_BIN_EDGES_MS = np.geomspace(0.1, 100000, 61)
+
+
+def latency_bin(latency_ms: float) -> int:
+    """Histogram bin index for a latency in milliseconds"""
+    index = int(np.searchsorted(LATENCY_BIN_EDGES_MS, latency_ms, side='right')) - 1
+    return min(max(index, 0), len(LATENCY_BIN_EDGES_MS) - 2)
+
+
+def quantile_from_bins(bin_counts: Dict[int, float], q: float) -> float:
+    """Upper edge (ms) of the histogram bin holding the q-quantile"""
+    bins = sorted(bin_counts)
+    counts = np.cumsum([bin_counts[b] for b in bins])
+    position = int(np.searchsorted(counts, q * counts[-1], side='left'))
+    return float(LATENCY_BIN_EDGES_MS[bins[min(position, len(bins) - 1)] + 1])
+
+
+def prediction_points(predictions: np.ndarray, confidences: np.ndarray,
+                      latency_seconds: float) -> Dict[str, Tuple[float, float, float]]:
+    """Metric points (count, total, maximum) for one served batch"""
+    points = {}
+    classes, counts = np.unique(np.asarray(predictions), return_counts=True)
+    for c, n in zip(classes, counts):
+        points[f"predictions:{int(c)}"] = (int(n), int(n), int(n))
+    confidences = np.asarray(confidences, dtype=np.float64)
+    points['confidence'] = (len(confidences), float(confidences.sum()), float(confidences.max()))
+    latency_ms = latency_seconds * 1000
+    points[f"latency_bin:{latency_bin(latency_ms)}"] = (1, latency_ms, latency_ms)
+    return points
+
+
+def bucket_rows(points: Dict[str, Tuple[float, float, float]], timestamp: float) -> List[tuple]:
+    """(resolution, bucket_start, metric, count, total, maximum) rows for every rollup"""
+    return [
+        (resolution, int(timestamp // resolution * resolution), metric, count, total, maximum)
+        for resolution in RESOLUTIONS
+        for metric, (count, total, maximum) in points.items()
+    ]
+
+
+def pick_resolution(span_seconds: float, max_buckets: int = MAX_BUCKETS) -> int:
+    """Finest rollup that covers the span in at most ``max_buckets`` buckets"""
+    for resolution in RESOLUTIONS:
+        if span_seconds / resolution <= max_buckets:
+            return resolution
+    return RESOLUTIONS[-1]
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Largest-Triangle-Three-Buckets downsampling to at most ``n_out`` points
+    
+    Keeps the first and last points and, from each bucket in between, the
+    point forming the largest triangle with the previously kept point and
+    the next bucket's average, which preserves the visual shape of a line.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return x, y
+    every = (n - 2) / (n_out - 2)
+    keep = np.empty(n_out, dtype=np.intp)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = int(i * every) + 1, int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x, avg_y = x[end:next_end].mean(), y[end:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        keep[i + 1] = a
+    return x[keep], y[keep]
+
+
+def minmax_downsample(x: np.ndarray, y: np.ndarray, n_out: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Keep each bucket's minimum and maximum (at most ``n_out`` points), so spikes survive"""
+    n = len(x)
+    if n_out >= n or n_out < 2:
+        return x, y
+    keep = []
+    for bucket in np.array_split(np.arange(n), n_out // 2):
+        keep.extend(sorted({bucket[np.argmin(y[bucket])], bucket[np.argmax(y[bucket])]}))
+    keep = np.asarray(keep, dtype=np.intp)
+    return x[keep], y[keep]
@@ -0,0 +1,66 @@
+"""Unit tests for the content-addressed artifact store"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from ml.training.model_families import load_artifact, store_artifact
+from registry.artifact_store import ArtifactStore
+from shared.database import DatabaseManager
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(600, 8))
+    y = (X[:, 0] + X[:, 1] > 0).astype(int)
+    return X, y
+
+
+def test_versions_share_unchanged_arrays(tmp_path, data):
+    """Test a warm-started forest only writes its new trees and loads back identically"""
+    X, y = data
+    store = ArtifactStore(str(tmp_path / 'store'), array_threshold=1024)
+    forest = RandomForestClassifier(n_estimators=10, max_depth=8, random_state=0, warm_start=True).fit(X, y)
+    first = store_artifact(forest, 'random_forest', store)
+    written = store.stats['written']
+    
+    forest.n_estimators = 15
+    forest.fit(X, y)
+    second = store_artifact(forest, 'random_forest', store)
+    model, family = load_artifact(second)
+    
+    assert first != second
+    assert store.stats['deduplicated'] == written - 1  # every array of the first ten trees reused
+    assert store.stats['written'] - written < written  # five new trees and a manifest
+    np.testing.assert_array_equal(family.predict_proba(model, X), forest.predict_proba(X))
+    assert store_artifact(forest, 'random_forest', store) == second  # identical content, no new objects
+
+
+def test_gc_keeps_only_registered_artifacts(tmp_path, data):
+    """Test retention releases old versions and GC deletes exactly what nothing references"""
+    X, y = data
+    store = ArtifactStore(str(tmp_path / 'store'), array_threshold=1024)
+    db = DatabaseManager(str(tmp_path / 'gc.db'))
+    for i in range(6):
+        model = RandomForestClassifier(n_estimators=3, max_depth=6, random_state=i).fit(X, y)
+        db.register_model(f"v{i}", store_artifact(model, 'random_forest', store), {})
+    db.set_model_stage('v0', 'production')
+    db.set_model_stage('v5', 'staging')
+    
+    released = db.release_model_artifacts(keep=2)
+    assert released == ['v2', 'v1']  # v4, v3 kept; staged versions never released
+    with pytest.raises(ValueError):
+        db.set_model_stage('v1', 'production')
+    
+    unregistered = store_artifact(RandomForestClassifier(n_estimators=2).fit(X, y), 'random_forest', store)
+    assert store.collect_garbage(db.get_artifact_refcounts(), grace=60)['removed'] == 0
+    stats = store.collect_garbage(db.get_artifact_refcounts(), grace=0)
+    
+    assert stats['removed'] > 0 and not os.path.exists(unregistered)
+    for version in ('v0', 'v3', 'v4', 'v5'):
+        load_artifact(db.get_model(version)['model_path'])
+    assert store.usage()['objects'] == stats['kept']
@@ -0,0 +1,66 @@
+"""Unit tests for champion/challenger evaluation"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from sklearn.datasets import make_classification
+from sklearn.metrics import accuracy_score, f1_score
+
+from ml.evaluation.champion_challenger import ChampionChallenger, score_model
+from ml.training.model_families import get_family, save_artifact
+from shared.database import DatabaseManager
+
+
+@pytest.fixture
+def data():
+    """Train and holdout splits"""
+    X, y = make_classification(n_samples=600, n_features=8, random_state=3)
+    return (X[:400], y[:400]), (X[400:], y[400:])
+
+
+def train_and_register(db, tmp_path, version, family_name, config, train):
+    """Fit a model, write its artifact and register it"""
+    family = get_family(family_name)
+    model = family.build(config, 1)
+    family.fit(model, *train)
+    path = str(tmp_path / f"{version}.pkl")
+    save_artifact(model, family_name, path)
+    db.register_model(version, path, {}, status='trained')
+    return path
+
+
+def test_score_model_matches_sklearn(data):
+    """Test the bincount metrics agree with sklearn"""
+    (X, y), (X_val, y_val) = data
+    family = get_family('decision_tree')
+    model = family.build({'max_depth': 3}, 1).fit(X, y)
+    
+    metrics = score_model(model, family, X_val, y_val)
+    y_pred = model.predict(X_val)
+    
+    assert metrics['accuracy'] == pytest.approx(accuracy_score(y_val, y_pred))
+    assert metrics['f1_score'] == pytest.approx(f1_score(y_val, y_pred, average='weighted'))
+
+
+def test_promotes_only_when_challenger_wins(data, tmp_path):
+    """Test first deploy, rejection of a weaker model and cached re-evaluation"""
+    train, holdout = data
+    db = DatabaseManager(str(tmp_path / "pipeline.db"))
+    evaluator = ChampionChallenger(db, metric='accuracy', margin=0.01)
+    
+    strong = train_and_register(db, tmp_path, 'v_strong', 'random_forest', {'n_estimators': 30}, train)
+    decision = evaluator.evaluate('v_strong', strong, 'snap_000000', lambda: holdout)
+    assert decision['promoted'] and decision['reason'] == 'no_champion'
+    assert db.get_active_model()['model_version'] == 'v_strong'
+    
+    weak = train_and_register(db, tmp_path, 'v_weak', 'decision_tree', {'max_depth': 1}, train)
+    decision = evaluator.evaluate('v_weak', weak, 'snap_000000', lambda: holdout)
+    assert not decision['promoted'] and decision['reason'] == 'champion_holds'
+    assert db.get_active_model()['model_version'] == 'v_strong'
+    
+    def no_holdout():
+        raise AssertionError("holdout should not be loaded when both scores are cached")
+    
+    again = evaluator.evaluate('v_weak', weak, 'snap_000000', no_holdout)
+    assert again['scores'] == decision['scores']
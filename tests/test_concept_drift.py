@@ -0,0 +1,109 @@
+"""Unit tests for concept drift tracking"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+import numpy as np
+from sklearn.metrics import accuracy_score, f1_score
+
+from ml.evaluation.concept_drift import (
+    OutputDistributionTracker, ConceptDriftDetector, confusion_metrics
+)
+from shared.database import DatabaseManager
+
+
+@pytest.fixture
+def db(tmp_path):
+    """Create an isolated SQLite database"""
+    return DatabaseManager(db_path=str(tmp_path / "pipeline.db"))
+
+
+def test_confusion_metrics_match_sklearn():
+    """Test metrics from a confusion matrix match sklearn on raw labels"""
+    rng = np.random.default_rng(0)
+    y_true = rng.integers(0, 3, 500)
+    y_pred = np.where(rng.random(500) < 0.7, y_true, rng.integers(0, 3, 500))
+    
+    confusion = np.zeros((3, 3), dtype=np.int64)
+    np.add.at(confusion, (y_true, y_pred), 1)
+    
+    metrics = confusion_metrics(confusion)
+    
+    assert metrics['accuracy'] == pytest.approx(accuracy_score(y_true, y_pred))
+    assert metrics['f1_score'] == pytest.approx(f1_score(y_true, y_pred, average='weighted'))
+
+
+def test_output_tracker_counts():
+    """Test each batch is binned into its window's class mix and confidence histogram"""
+    tracker = OutputDistributionTracker(confidence_bins=10, window_seconds=60)
+    
+    window, class_counts, confidence_counts = tracker.update(
+        np.array([0, 1, 1]), np.array([0.55, 0.95, 1.0]), timestamp=120
+    )
+    
+    assert window == 120
+    assert class_counts == {0: 1, 1: 2}
+    assert confidence_counts[5] == 1 and confidence_counts[9] == 2
+    
+    assert tracker.update(np.array([1]), np.array([0.75]), timestamp=150) == (120, {1: 1}, [0] * 7 + [1, 0, 0])
+    assert tracker.update(np.array([0]), np.array([0.6]), timestamp=180)[:2] == (180, {0: 1})
+
+
+def test_delayed_labels_update_confusion(db):
+    """Test bulk labeling fills the confusion table once per prediction"""
+    ids = [db.log_prediction([0.0] * 3, prediction=p, probability=0.9, model_version="v1")
+           for p in [0, 1, 1, 0]]
+    
+    assert db.update_true_labels(ids, [0, 1, 0, 0]) == 4
+    assert db.update_true_labels(ids, [1, 1, 1, 1]) == 0
+    
+    rows = db.get_confusion_counts(model_version="v1")
+    windows = ConceptDriftDetector().rolling_performance(rows)
+    
+    assert len(windows) == 1
+    metrics = next(iter(windows.values()))
+    assert metrics['samples_count'] == 4
+    assert metrics['accuracy'] == pytest.approx(0.75)
+
+
+def test_output_drift_detected(db):
+    """Test a shifted class mix is flagged"""
+    db.record_output_distribution(0, "v1", {0: 90, 1: 10}, [0] * 9 + [100])
+    db.record_output_distribution(3600, "v1", {0: 20, 1: 80}, [0] * 9 + [100])
+    
+    result = ConceptDriftDetector().output_drift(db.get_output_distribution(), current_since=3600)
+    
+    assert result['drift_detected']
+    assert result['current_samples'] == 100
+
+
+def test_performance_drift_needs_enough_labels():
+    """Test a single wrong label does not count as an accuracy drop"""
+    def cells(window, correct, wrong):
+        return [{'window_start': window, 'true_label': 1, 'predicted_label': 1, 'count': correct},
+                {'window_start': window, 'true_label': 0, 'predicted_label': 1, 'count': wrong}]
+    detector = ConceptDriftDetector(min_labeled_samples=50)
+    
+    sparse = detector.performance_drift(cells(0, 95, 5) + cells(3600, 0, 1), current_since=3600)
+    assert sparse['current']['accuracy'] == 0 and not sparse['drift_detected']
+    
+    dense = detector.performance_drift(cells(0, 95, 5) + cells(3600, 40, 20), current_since=3600)
+    assert dense['drift_detected']
+
+
+def test_concurrent_labeling_counts_each_prediction_once(db):
+    """Test the same labels posted concurrently add one confusion count per prediction"""
+    import threading
+    
+    ids = [db.log_prediction([0.0] * 3, prediction=1, probability=0.9, model_version="v1") for _ in range(30)]
+    for batch in (ids[i:i + 3] for i in range(0, len(ids), 3)):
+        barrier = threading.Barrier(4)
+        threads = [threading.Thread(target=lambda: (barrier.wait(), db.update_true_labels(batch, [1] * 3)))
+                   for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    
+    assert sum(row['count'] for row in db.get_confusion_counts()) == 30
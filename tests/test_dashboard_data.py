@@ -0,0 +1,114 @@
+"""Unit tests for the dashboard data layer"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import json
+from dashboards.data_layer import DashboardData
+from shared.database import DatabaseManager
+
+
+class CountingDatabase(DatabaseManager):
+    """SQLite manager that counts connections and recent-prediction rows read"""
+    
+    def __init__(self, db_path):
+        self.connections = 0
+        self.rows_read = 0
+        super().__init__(db_path)
+    
+    def _get_connection(self):
+        self.connections += 1
+        return super()._get_connection()
+    
+    def get_predictions_after(self, after_id, limit, max_id=None):
+        rows = super().get_predictions_after(after_id, limit, max_id)
+        self.rows_read += len(rows)
+        return rows
+
+
+def log_predictions(db, predictions):
+    """Log one prediction per label"""
+    for i, prediction in enumerate(predictions):
+        db.log_prediction([0.0], prediction, 0.5 + i / 1000, 'v1')
+
+
+def test_aggregates_fold_in_only_new_rows(tmp_path):
+    """Test counts match full-table queries while each poll reads only new rows"""
+    db = CountingDatabase(str(tmp_path / 'dash.db'))
+    data = DashboardData(db, ttl=60)
+    log_predictions(db, [0, 1, 1, 0, 1])
+    db.log_drift_event(True, 0.9, ['f0'], {}, 'retrain')
+    db.log_drift_event(False, 0.1, [], {}, 'none')
+    db.register_model('m1', 'models/m1.pkl', {'accuracy': 0.8})
+    
+    assert data.refresh()
+    log_predictions(db, [1, 1])
+    db.log_drift_event(True, 0.7, ['f1'], {}, 'retrain')
+    db.register_model('m2', 'models/m2.pkl', {'accuracy': 0.9})
+    assert data.refresh()
+    
+    stats = data.get()
+    assert stats['class_counts'] == {0: 2, 1: 5}
+    assert stats['total_predictions'] == 7
+    assert stats['drift_count'] == 2
+    assert stats['models'] == [('m1', 0.8), ('m2', 0.9)]
+    assert stats['current_model'] == 'm2' and stats['latest_accuracy'] == 0.9
+    assert [row['id'] for row in stats['recent_predictions']] == [7, 6, 5, 4, 3]
+    assert db.rows_read == 5 + 2
+
+
+def test_rows_logged_mid_poll_are_shown_once(tmp_path):
+    """Test a prediction logged between the count and the recent-rows read is not duplicated"""
+    db = DatabaseManager(str(tmp_path / 'dash.db'))
+    data = DashboardData(db, ttl=60)
+    log_predictions(db, [0, 1])
+    
+    count = db.get_prediction_counts_since
+    def count_then_log(after_id):
+        result = count(after_id)
+        log_predictions(db, [1])
+        return result
+    db.get_prediction_counts_since = count_then_log
+    data.refresh()
+    db.get_prediction_counts_since = count
+    data.refresh()
+    
+    stats = data.get()
+    assert [row['id'] for row in stats['recent_predictions']] == [3, 2, 1]
+    assert stats['total_predictions'] == 3
+
+
+def test_unchanged_polls_keep_version_and_reads_share_the_cache(tmp_path):
+    """Test idle polls do not bump the version and fresh reads skip the database"""
+    db = CountingDatabase(str(tmp_path / 'dash.db'))
+    data = DashboardData(db, ttl=60)
+    log_predictions(db, [0, 1])
+    
+    first = data.get()
+    assert not data.refresh()
+    connections = db.connections
+    for _ in range(100):
+        assert data.get()['version'] == first['version'] == 1
+    
+    assert db.connections == connections
+    assert db.rows_read == 2
+    assert not data.is_stale()
+
+
+def test_event_stream_names_only_changed_tables(tmp_path):
+    """Test viewers get every table once, then only tables whose data changed"""
+    db = DatabaseManager(str(tmp_path / 'dash.db'))
+    data = DashboardData(db, ttl=60)
+    data.refresh()
+    events = data.event_stream(heartbeat=0.05)
+    
+    first = json.loads(next(events)[len('data: '):])
+    assert set(first['changed']) == {'predictions', 'drift_events', 'model_registry', 'status'}
+    assert not first['stale']
+    
+    assert next(events) == ": keep-alive\n\n"
+    log_predictions(db, [1])
+    data.refresh()
+    update = json.loads(next(events)[len('data: '):])
+    assert update['changed'] == ['predictions']
+    assert update['versions']['predictions'] == 1
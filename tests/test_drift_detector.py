@@ -1,7 +1,11 @@
 """Unit tests for Drift Detector"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
 import pytest
 import numpy as np
-from drift_detector import DriftDetector
+from ml.evaluation.drift_detector import DriftDetector
 
 @pytest.fixture
 def detector():
@@ -63,3 +67,35 @@ def test_feature_names(detector, reference_data):
     detector.set_reference(reference_data, feature_names)
     
     assert detector.feature_names == feature_names
+
+def test_parallel_matches_serial(reference_data):
+    """Test process-pool evaluation returns the same per-feature results"""
+    detector = DriftDetector(threshold=0.05, parallel_min_features=1)
+    detector.set_reference(reference_data)
+    
+    current_data = reference_data[:500] + np.linspace(0, 1, 5)
+    
+    serial_drift, serial_metrics = detector.detect_drift(current_data, n_jobs=1)
+    parallel_drift, parallel_metrics = detector.detect_drift(current_data, n_jobs=2)
+    
+    assert serial_drift == parallel_drift
+    assert serial_metrics == parallel_metrics
+
+def test_segmented_drift_localizes_shift():
+    """Test a shift in one segment is flagged only for that segment"""
+    from ml.evaluation.segmented_drift import SegmentedDriftDetector
+    
+    rng = np.random.default_rng(0)
+    segments = rng.integers(0, 4, 4000).astype(float)
+    reference = np.column_stack([rng.normal(size=(4000, 3)), segments])
+    current = np.column_stack([rng.normal(size=(4000, 3)), segments])
+    current[segments == 2, :3] += 3.0
+    
+    detector = SegmentedDriftDetector(segment_column='country', min_segment_samples=30)
+    detector.set_reference(reference, ['a', 'b', 'c', 'country'])
+    
+    drift_detected, metrics = detector.detect_drift(current)
+    
+    assert drift_detected
+    assert metrics['summary']['drifting_segments'] == ['2']
+    assert set(metrics['segments']['0']['features']) == {'a', 'b', 'c'}
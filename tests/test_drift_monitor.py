@@ -0,0 +1,68 @@
+"""Unit tests for the drift monitor's buffer and reference handling"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+import pytest
+
+from shared.redis_client import RedisClient
+
+
+@pytest.fixture
+def monitor(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # the module opens data/pipeline.db on import
+    from services.drift_monitor import monitor
+    monkeypatch.setattr(monitor, 'redis_client', RedisClient())
+    return monitor
+
+
+def test_collects_the_newest_window(monitor, monkeypatch):
+    """Test the newest batches fill the window and older buffered rows are dropped"""
+    monkeypatch.setattr(monitor.config.drift, 'window_size', 25)
+    for i in range(30):
+        monitor.redis_client.lpush('prediction_buffer', {'features': [[i, j] for j in range(10)]})
+    
+    recent = monitor.DriftMonitor().collect_recent_data()
+    
+    assert recent[:, 0].tolist() == [27] * 5 + [28] * 10 + [29] * 10
+    assert recent[:5, 1].tolist() == [5, 6, 7, 8, 9]  # newest rows of the partly used batch
+    assert monitor.redis_client.llen('prediction_buffer') == 0
+
+
+def test_segment_column_by_name(monitor, monkeypatch):
+    """Test a named segment column resolves through the cached reference's feature names"""
+    monkeypatch.setattr(monitor.config.drift, 'segment_column', 'CountryEncoded')
+    rng = np.random.default_rng(0)
+    reference = np.column_stack([rng.normal(size=(400, 2)), rng.integers(0, 3, 400)])
+    monitor.cache_reference_data(reference, ['Quantity', 'UnitPrice', 'CountryEncoded'])
+    
+    drift_monitor = monitor.DriftMonitor()
+    drift_monitor.load_reference_data()
+    
+    assert drift_monitor.reference_data.shape == (400, 3)
+    assert drift_monitor.segment_detector.segment_name == 'CountryEncoded'
+    assert drift_monitor.segment_detector.feature_names == ['Quantity', 'UnitPrice']
+    
+    monitor.redis_client.set('reference_data', reference.tolist())  # unnamed: the name cannot resolve
+    unnamed = monitor.DriftMonitor()
+    unnamed.load_reference_data()
+    assert unnamed.reference_data is not None and unnamed.segment_detector is None
+
+
+def test_concept_drift_compares_only_the_production_model(monitor, monkeypatch, tmp_path):
+    """Test canary outputs with a different class mix are not reported as drift"""
+    db = monitor.DatabaseManager(str(tmp_path / 'concept.db'))
+    monkeypatch.setattr(monitor, 'db', db)
+    monkeypatch.setattr(monitor, 'registry', monitor.ModelRegistry(db))
+    db.register_model('v1', 'models/v1.pkl', {})
+    db.set_model_stage('v1', 'production')
+    
+    window = monitor.config.drift.performance_window
+    current = monitor.window_start(monitor.time.time(), window)
+    for start in (current - window, current):
+        db.record_output_distribution(start, 'v1', {0: 150, 1: 50}, [0] * 9 + [200])
+    db.record_output_distribution(current, 'v2', {0: 10, 1: 190}, [0] * 5 + [200] + [0] * 4)
+    
+    assert monitor.DriftMonitor().check_concept_drift() == 200
+    assert monitor.redis_client.llen('retraining_queue') == 0
@@ -0,0 +1,72 @@
+"""Unit tests for the adaptive drift check scheduler"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import time
+
+from services.drift_monitor.scheduler import DriftCheckScheduler, MonitorTarget
+
+
+def wait_idle(target, timeout=5.0):
+    """Wait for a submitted check to finish"""
+    deadline = time.time() + timeout
+    while target.running and time.time() < deadline:
+        time.sleep(0.01)
+
+
+def test_triggers_on_min_samples():
+    """Test a check runs as soon as enough rows are pending"""
+    pending = {'rows': 50}
+    target = MonitorTarget(name='features', check=lambda: pending['rows'],
+                           pending_rows=lambda: pending['rows'],
+                           min_samples=100, max_interval=3600)
+    scheduler = DriftCheckScheduler(min_poll_interval=1, max_poll_interval=8)
+    scheduler.add_target(target)
+    
+    assert scheduler.tick() == 0
+    
+    pending['rows'] = 150
+    assert scheduler.tick() == 1
+    wait_idle(target)
+    
+    stats = scheduler.get_stats()['features']
+    assert stats['checks_run'] == 1
+    assert stats['rows_per_check'] == 150
+    assert stats['last_latency'] is not None
+    scheduler.stop()
+
+
+def test_max_interval_skips_when_data_is_short():
+    """Test the max interval records a skip instead of checking too few rows"""
+    calls = []
+    target = MonitorTarget(name='features', check=lambda: calls.append(1) or 10,
+                           pending_rows=lambda: 10, min_samples=100, max_interval=60)
+    scheduler = DriftCheckScheduler()
+    scheduler.add_target(target)
+    
+    assert scheduler.tick(now=target.last_check + 61) == 0
+    assert calls == []
+    assert scheduler.get_stats()['features']['checks_skipped'] == 1
+    scheduler.stop()
+
+
+def test_idle_back_off():
+    """Test the poll interval doubles while idle and resets on traffic"""
+    pending = {'rows': 0}
+    target = MonitorTarget(name='features', check=lambda: 0,
+                           pending_rows=lambda: pending['rows'],
+                           min_samples=100, max_interval=3600)
+    scheduler = DriftCheckScheduler(min_poll_interval=1, max_poll_interval=4)
+    scheduler.add_target(target)
+    
+    intervals = []
+    for _ in range(4):
+        scheduler.tick()
+        intervals.append(scheduler.poll_interval)
+    assert intervals == [2, 4, 4, 4]
+    
+    pending['rows'] = 5
+    scheduler.tick()
+    assert scheduler.poll_interval == 1
+    scheduler.stop()
@@ -0,0 +1,105 @@
+"""Unit tests for the online feature store and bulk writes"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ml.feature_store.feature_store import FeatureCache, FeatureStore
+from ml.feature_store.offline_store import OfflineFeatureStore
+from shared.database import DatabaseManager
+
+
+@pytest.fixture
+def store(tmp_path):
+    """Feature store on a scratch database"""
+    return FeatureStore(DatabaseManager(str(tmp_path / "features.db")), cache_size=100, cache_ttl=60)
+
+
+def test_latest_value_wins_and_updates_merge(store):
+    """Test a second write overrides its features and keeps the others"""
+    store.store_features('c1', {'recency': 10.0, 'frequency': 2.0})
+    store.store_features('c1', {'recency': 3.0})
+    
+    assert store.get_features('c1') == {'recency': 3.0, 'frequency': 2.0}
+    assert store.get_features('c1', feature_group='other') == {}
+
+
+def test_non_finite_update_keeps_stored_value(store):
+    """Test NaN/inf in an update leave the stored features as they were"""
+    store.store_features('c1', {'recency': 10.0, 'frequency': 2.0, 'monetary': 5.0})
+    store.store_features('c1', {'recency': float('nan'), 'frequency': np.float32('inf'), 'monetary': 7.0})
+    
+    assert store.get_features('c1') == {'recency': 10.0, 'frequency': 2.0, 'monetary': 7.0}
+
+
+def test_get_features_many_batches_and_caches(store):
+    """Test misses are fetched together and later reads come from the cache"""
+    for i in range(5):
+        store.store_features(f"c{i}", {'value': float(i)})
+    
+    first = store.get_features_many(['c0', 'c3', 'missing'])
+    queries = []
+    store.db.get_online_features = lambda ids, group: queries.append(ids) or {}
+    second = store.get_features_many(['c0', 'c3', 'c4'])
+    
+    assert first == {'c0': {'value': 0.0}, 'c3': {'value': 3.0}, 'missing': {}}
+    assert second['c3'] == {'value': 3.0}
+    assert queries == [['c4']]
+
+
+def test_write_invalidates_cached_row(store):
+    """Test a local write is visible immediately despite the cache"""
+    store.store_features('c1', {'value': 1.0})
+    assert store.get_features('c1') == {'value': 1.0}
+    
+    store.store_features('c1', {'value': 2.0})
+    
+    assert store.get_features('c1') == {'value': 2.0}
+
+
+def test_cache_evicts_least_recently_used():
+    """Test the LRU keeps the most recently read keys"""
+    cache = FeatureCache(max_size=2, ttl=60)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    cache.get('a')
+    cache.put('c', 3)
+    
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+
+
+def test_bulk_write_from_dataframe(store):
+    """Test a DataFrame batch lands in history and keeps each entity's latest row online"""
+    rows = pd.DataFrame({
+        'entity_id': ['a', 'b', 'a'],
+        'event_timestamp': [200.0, 100.0, 100.0],
+        'spend': [2.0, 5.0, 1.0],
+        'visits': [4.0, 1.0, 3.0]
+    })
+    
+    stats = store.store_features_bulk(rows)
+    
+    assert stats['rows'] == 3 and stats['entities'] == 2 and stats['rows_per_sec'] > 0
+    assert store.get_features_many(['a', 'b']) == {
+        'a': {'spend': 2.0, 'visits': 4.0},
+        'b': {'spend': 5.0, 'visits': 1.0}
+    }
+    history = OfflineFeatureStore(store.db).get_historical_features(
+        pd.DataFrame({'entity_id': ['a'], 'event_timestamp': [150.0]}))
+    assert history[['spend', 'visits']].values.tolist() == [[1.0, 3.0]]
+
+
+def test_bulk_write_from_array(store):
+    """Test an ndarray batch needs ids and names, and invalidates cached rows"""
+    store.store_features('a', {'x': 0.0}, timestamp=1.0)
+    assert store.get_features('a') == {'x': 0.0}
+    
+    with pytest.raises(ValueError):
+        store.store_features_bulk(np.ones((2, 1)))
+    store.store_features_bulk(np.array([[1.0], [2.0]]), entity_ids=['a', 'b'], feature_names=['x'])
+    
+    assert store.get_features_many(['a', 'b']) == {'a': {'x': 1.0}, 'b': {'x': 2.0}}
@@ -0,0 +1,48 @@
+"""Unit tests for the ingestion API"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+import pandas as pd
+
+from shared.database import DatabaseManager
+from ml.training.preprocessing import Preprocessor
+
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # the module opens data/pipeline.db on import
+    from services.ingestion_api import app
+    monkeypatch.setattr(app, 'db', DatabaseManager(str(tmp_path / 'labels.db')))
+    return app
+
+
+def test_labels_outside_the_classes_are_rejected(api):
+    """Test negative, non-integer and out-of-range labels get a 400 and label nothing"""
+    ids = [api.db.log_prediction([0.0], prediction=1, probability=0.9, model_version='v1') for _ in range(2)]
+    client = api.app.test_client()
+    
+    for bad in (-1, 'x', 1.5, True, api.config.model.n_classes):
+        response = client.post('/ingest/labels', json={'prediction_ids': ids, 'labels': [0, bad]})
+        assert response.status_code == 400
+    assert api.db.get_confusion_counts() == []
+    
+    response = client.post('/ingest/labels', json={'prediction_ids': ids, 'labels': [0, 1]})
+    assert response.status_code == 200 and response.json['predictions_labeled'] == 2
+
+
+def test_batches_record_their_preprocessor_version(api, monkeypatch):
+    """Test batches are stamped with the current preprocessor and unknown versions are rejected"""
+    queued = []
+    monkeypatch.setattr(api.redis_client, 'lpush', lambda key, value: queued.append(value))
+    preprocessor = Preprocessor.fit(pd.DataFrame({'x': [0.0, 1.0, 2.0]}))
+    api.db.save_preprocessor(preprocessor.version, preprocessor.to_dict())
+    client = api.app.test_client()
+    
+    response = client.post('/ingest/batch', json={'features': [[0.5]], 'labels': [1]})
+    assert response.status_code == 200
+    assert queued[-1]['preprocessor'] == preprocessor.version
+    
+    response = client.post('/ingest/batch', json={'features': [[0.5]], 'labels': [1], 'preprocessor_version': 'nope'})
+    assert response.status_code == 400 and len(queued) == 1
@@ -0,0 +1,129 @@
+"""Unit tests for the MLflow tracking client"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from registry.mlflow.mlflow_client import MLFlowClient
+from registry.mlflow.tracking_store import FileStore
+
+
+def test_file_store_follows_mlflow_layout(tmp_path):
+    """Test a run lands in mlruns/<experiment>/<run> with metrics, params and artifacts"""
+    client = MLFlowClient(f"file:{tmp_path}", "unit", flush_interval=60)
+    model_file = tmp_path / "model.pkl"
+    model_file.write_bytes(b"x" * 3_000_000)
+    
+    run_id = client.start_run("retrain_1")
+    client.log_params({'samples': 100, 'trigger': 'drift'})
+    client.log_metrics({'accuracy': 0.9, 'confusion_matrix': [[1, 0], [0, 1]]})
+    client.log_model(str(model_file))
+    client.end_run()
+    
+    run = FileStore(str(tmp_path)).get_run(run_id)
+    assert run['status'] == 3 and run['run_name'] == 'retrain_1'
+    assert run['metrics'] == {'accuracy': 0.9}
+    assert run['params'] == {'samples': '100', 'trigger': 'drift'}
+    assert run['tags']['mlflow.runName'] == 'retrain_1'
+    artifact = tmp_path / run['experiment_id'] / run_id / 'artifacts' / 'model' / 'model.pkl'
+    assert artifact.stat().st_size == 3_000_000
+
+
+def test_logging_is_batched(tmp_path):
+    """Test many log calls are written as a few batched writes"""
+    client = MLFlowClient(str(tmp_path), "unit", flush_interval=60)
+    run_id = client.start_run("loop")
+    for step in range(2500):
+        client.log_metrics({'loss': 1.0 / (step + 1)}, step=step)
+    client.end_run()
+    
+    # Full batches wake the flusher early; the rest is flushed by end_run
+    assert 3 <= client.stats['batches'] <= 6
+    assert client.stats['failed'] == 0
+    run_dir = tmp_path / client.experiment_id / run_id
+    assert len((run_dir / 'metrics' / 'loss').read_text().splitlines()) == 2500
+
+
+def test_non_finite_metrics_are_skipped(tmp_path):
+    """Test NaN/inf metrics are dropped and the rest of the batch is written"""
+    import numpy as np
+    
+    client = MLFlowClient(f"file:{tmp_path}", "unit", flush_interval=60)
+    run_id = client.start_run("nan")
+    client.log_metrics({'accuracy': 0.9, 'f1_score': float('nan'), 'loss': np.float32('inf')})
+    client.end_run()
+    
+    assert client.stats['failed'] == 0
+    assert FileStore(str(tmp_path)).get_run(run_id)['metrics'] == {'accuracy': 0.9}
+
+
+class FakeTrackingServer(BaseHTTPRequestHandler):
+    """Minimal MLflow REST endpoints, recording what was sent"""
+    calls = []
+    
+    def _reply(self, body):
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+    
+    def do_GET(self):
+        self.calls.append(('GET', self.path, None))
+        self.send_response(404)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+    
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.calls.append(('POST', self.path, body))
+        if self.path.endswith('experiments/create'):
+            self._reply({'experiment_id': '7'})
+        elif self.path.endswith('runs/create'):
+            self._reply({'run': {'info': {'run_id': 'abc'}}})
+        else:
+            self._reply({})
+    
+    def do_PUT(self):
+        size = len(self.rfile.read(int(self.headers['Content-Length'])))
+        self.calls.append(('PUT', self.path, size))
+        self._reply({})
+    
+    def log_message(self, *args):
+        pass
+
+
+def test_rest_store_talks_to_tracking_server(tmp_path):
+    """Test the REST backend uses MLflow's experiment, run, batch and artifact endpoints"""
+    server = HTTPServer(('127.0.0.1', 0), FakeTrackingServer)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    model_file = tmp_path / "model.pkl"
+    model_file.write_bytes(b"x" * 1000)
+    
+    try:
+        client = MLFlowClient(f"http://127.0.0.1:{server.server_port}", "unit", flush_interval=60)
+        assert client.start_run("retrain_1") == 'abc'
+        client.log_params({'samples': 10})
+        client.log_metrics({'accuracy': 0.5})
+        client.log_model(str(model_file))
+        client.end_run()
+    finally:
+        server.shutdown()
+    
+    paths = [(method, path.split('?')[0]) for method, path, _ in FakeTrackingServer.calls]
+    assert paths == [
+        ('GET', '/api/2.0/mlflow/experiments/get-by-name'),
+        ('POST', '/api/2.0/mlflow/experiments/create'),
+        ('POST', '/api/2.0/mlflow/runs/create'),
+        ('POST', '/api/2.0/mlflow/runs/log-batch'),
+        ('PUT', '/api/2.0/mlflow-artifacts/artifacts/7/abc/artifacts/model/model.pkl'),
+        ('POST', '/api/2.0/mlflow/runs/update')
+    ]
+    batch = FakeTrackingServer.calls[3][2]
+    assert batch['params'] == [{'key': 'samples', 'value': '10'}]
+    assert batch['metrics'][0]['key'] == 'accuracy'
+    assert FakeTrackingServer.calls[4][2] == 1000
+    assert FakeTrackingServer.calls[5][2]['status'] == 'FINISHED'
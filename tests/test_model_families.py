@@ -0,0 +1,67 @@
+"""Unit tests for model families and the artifact format"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import joblib
+import pytest
+import numpy as np
+from sklearn.datasets import make_classification
+
+from ml.training.model_families import MODEL_FAMILIES, LinearScorer, get_family, load_artifact, save_artifact
+from ml.training.trainer import ModelTrainer
+
+
+@pytest.fixture
+def sample_data():
+    """Generate sample data for testing"""
+    return make_classification(n_samples=300, n_features=6, random_state=7)
+
+
+@pytest.mark.parametrize("name", [n for n, f in MODEL_FAMILIES.items() if f.build is not None])
+def test_artifact_round_trip(sample_data, name, tmp_path):
+    """Test every trainable family serves the same probabilities after save/load"""
+    X, y = sample_data
+    family = get_family(name)
+    model = family.build({'n_estimators': 10, 'max_depth': 4}, 1)
+    family.fit(model, X, y)
+    
+    path = str(tmp_path / f"{name}.pkl")
+    save_artifact(model, name, path)
+    served, served_family = load_artifact(path)
+    
+    assert served_family.name == name
+    np.testing.assert_allclose(served_family.predict_proba(served, X), model.predict_proba(X), atol=1e-8)
+
+
+def test_linear_family_stores_coefficients_only(sample_data, tmp_path):
+    """Test logistic regression is served by the numpy scorer"""
+    X, y = sample_data
+    trainer = ModelTrainer({'model_family': 'logistic_regression'}, model_path=str(tmp_path / "lr.pkl"))
+    
+    metrics, _ = trainer.train(X, y, mode='oob')
+    trainer.save_model()
+    served, _ = load_artifact(str(tmp_path / "lr.pkl"))
+    
+    assert metrics['training_mode'] == 'holdout'
+    assert metrics['model_family'] == 'logistic_regression'
+    assert isinstance(served, LinearScorer)
+    np.testing.assert_array_equal(served.predict(X), trainer.model.predict(X))
+
+
+def test_untagged_artifact_loads_as_random_forest(sample_data, tmp_path):
+    """Test artifacts written before families existed still load"""
+    X, y = sample_data
+    model = get_family('random_forest').build({'n_estimators': 5}, 1).fit(X, y)
+    joblib.dump({'model': model, 'timestamp': 'now'}, tmp_path / "old.pkl")
+    
+    served, family = load_artifact(str(tmp_path / "old.pkl"))
+    
+    assert family.name == 'random_forest'
+    assert served.predict(X[:3]).shape == (3,)
+
+
+def test_unknown_family_rejected():
+    """Test a typo in MODEL_FAMILY fails fast"""
+    with pytest.raises(ValueError):
+        ModelTrainer({'model_family': 'svm'})
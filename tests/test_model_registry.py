@@ -0,0 +1,86 @@
+"""Unit tests for registry stage pointers and the cached registry reader"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import sqlite3
+import pytest
+
+from registry.model_registry import ModelRegistry
+from shared.database import DatabaseManager
+
+
+class CountingDatabase(DatabaseManager):
+    """SQLite manager that counts connections"""
+    
+    def __init__(self, db_path):
+        self.connections = 0
+        super().__init__(db_path)
+    
+    def _get_connection(self):
+        self.connections += 1
+        return super()._get_connection()
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = CountingDatabase(str(tmp_path / 'registry.db'))
+    for version in ('v1', 'v2', 'v3'):
+        db.register_model(version, f"models/{version}.pkl", {'accuracy': 0.8})
+    return db
+
+
+def test_stage_moves_archive_the_displaced_version(db):
+    """Test production holds one version and promotion archives the previous one"""
+    db.set_model_stage('v1', 'production')
+    db.set_model_stage('v2', 'staging')
+    db.set_model_stage('v2', 'production')
+    
+    assert db.get_active_model()['model_version'] == 'v2'
+    assert db.get_model('v1')['stage'] == 'archived' and not db.get_model('v1')['deployed']
+    assert db.get_model('v2')['stage'] == 'production' and db.get_model('v2')['deployed']
+    assert set(db.get_model_pointers()[1]) == {'production'}  # v2 left staging
+    
+    db.set_model_stage('v2', 'archived')
+    assert db.get_active_model() is None
+    with pytest.raises(ValueError):
+        db.set_model_stage('v3', 'live')
+    with pytest.raises(ValueError):
+        db.set_model_stage('missing', 'production')
+
+
+def test_resolve_reads_memory_until_the_stamp_moves(db):
+    """Test resolution skips the database and another writer's move is picked up once"""
+    registry = ModelRegistry(db, check_interval=60)
+    writer = ModelRegistry(DatabaseManager(db.db_path), check_interval=60)
+    writer.promote('v1', 'production')
+    changes = []
+    registry.on_change(lambda previous, current: changes.append(current['production']['model_version']))
+    
+    assert registry.resolve()['model_version'] == 'v1'
+    connections = db.connections
+    for _ in range(1000):
+        assert registry.resolve()['model_version'] == 'v1'
+    assert db.connections == connections
+    
+    assert not registry.refresh()
+    assert db.connections == connections + 1  # one stamp read
+    writer.promote('v3', 'production')
+    assert registry.refresh()
+    assert registry.resolve()['model_version'] == 'v3'
+    assert changes == ['v1', 'v3']
+
+
+def test_deployed_model_migrates_to_production_pointer(tmp_path):
+    """Test a registry written before stage pointers keeps its deployed model"""
+    path = str(tmp_path / 'old.db')
+    DatabaseManager(path).register_model('old', 'models/old.pkl', {})
+    conn = sqlite3.connect(path)
+    conn.execute("UPDATE model_registry SET deployed = 1, model_name = NULL")
+    conn.commit()
+    conn.close()
+    
+    db = DatabaseManager(path)
+    
+    assert db.get_active_model()['model_version'] == 'old'
+    assert db.get_model('old')['stage'] == 'production'
@@ -0,0 +1,66 @@
+"""Unit tests for canary and shadow serving"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import threading
+import numpy as np
+from sklearn.datasets import make_classification
+
+from ml.training.model_families import get_family
+from services.prediction_service.model_router import ModelRouter, ServedModel
+
+X, y = make_classification(n_samples=200, n_features=5, random_state=0)
+
+
+def served(version, depth):
+    """Small fitted tree wrapped for serving"""
+    family = get_family('decision_tree')
+    return ServedModel(version, family.build({'max_depth': depth}, 1).fit(X, y), family)
+
+
+def test_canary_takes_configured_fraction():
+    """Test roughly canary_fraction of requests go to the canary"""
+    router = ModelRouter(canary_fraction=0.25, seed=0)
+    router.set_model('primary', served('v1', 3))
+    router.set_model('canary', served('v2', 2))
+    
+    roles = [router.route()[0] for _ in range(2000)]
+    
+    assert 0.2 < roles.count('canary') / len(roles) < 0.3
+
+
+def test_shadow_runs_off_the_request_path():
+    """Test mirrored batches are scored asynchronously and compared"""
+    recorded = []
+    router = ModelRouter(on_shadow=lambda ids, version, preds: recorded.append((ids, version, len(preds))))
+    primary, shadow = served('v1', 4), served('v2', 1)
+    router.set_model('primary', primary)
+    router.set_model('shadow', shadow)
+    
+    role, model = router.route()
+    predictions, _, _ = router.predict(model, X)
+    assert router.mirror(X, predictions, list(range(len(X))))
+    router.wait_for_shadow()
+    
+    stats = router.get_stats()['versions']
+    expected = np.mean(shadow.model.predict(X) != predictions)
+    assert role == 'primary'
+    assert stats['v2']['disagreement_rate'] == expected
+    assert stats['v1']['requests'] == 1 and stats['v1']['disagreement_rate'] is None
+    assert recorded == [(list(range(len(X))), 'v2', len(X))]
+
+
+def test_shadow_backlog_is_dropped_not_queued():
+    """Test a slow shadow never builds an unbounded queue"""
+    gate = threading.Event()
+    router = ModelRouter(shadow_workers=1, shadow_queue_max=1,
+                         on_shadow=lambda *args: gate.wait(5))
+    router.set_model('shadow', served('v2', 1))
+    
+    assert router.mirror(X, y, [1])
+    assert not router.mirror(X, y, [2])
+    gate.set()
+    router.wait_for_shadow()
+    
+    assert router.get_stats()['shadow_dropped'] == 1
@@ -0,0 +1,80 @@
+"""Unit tests for the shipped preprocessing transform"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+from sklearn.tree import DecisionTreeClassifier
+
+from ml.training.model_families import load_artifact, load_serving_artifact, save_artifact
+from ml.training.preprocessing import Preprocessor
+from services.prediction_service.model_router import ServedModel
+
+
+def raw_frame(n=300, seed=0):
+    """Mixed numeric/categorical frame with missing values"""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'age': rng.normal(50, 10, n),
+        'visits': rng.integers(0, 20, n),
+        'country': rng.choice(['DE', 'FR', 'UK'], n),
+        'member': rng.choice([True, False], n)
+    })
+    df.loc[::17, 'age'] = np.nan
+    df.loc[::23, 'country'] = None
+    return df
+
+
+def sklearn_reference(df):
+    """The original client-side steps: fill, LabelEncoder, StandardScaler"""
+    df = df.copy()
+    for col in ['age', 'visits']:
+        df[col] = df[col].fillna(df[col].median())
+    for col in ['country', 'member']:
+        df[col] = df[col].fillna(df[col].mode()[0])
+        df[col] = LabelEncoder().fit_transform(df[col].astype(str))
+    return StandardScaler().fit_transform(df.values)
+
+
+def test_matches_label_encoder_and_scaler():
+    """Test fit+transform reproduces the sklearn preprocessing"""
+    df = raw_frame()
+    preprocessor = Preprocessor.fit(df)
+    
+    assert np.allclose(preprocessor.transform(df), sklearn_reference(df))
+
+
+def test_records_and_unknown_categories():
+    """Test dict records match frame rows and unseen or missing categories get the mode"""
+    df = raw_frame()
+    preprocessor = Preprocessor.fit(df)
+    expected = preprocessor.transform(df.iloc[:5])
+    
+    records = df.iloc[:5].astype(object).where(df.iloc[:5].notna(), None).to_dict('records')
+    assert np.allclose(preprocessor.transform(records), expected)
+    
+    unseen = preprocessor.transform([{'age': None, 'visits': 3, 'country': 'XX', 'member': True}])
+    missing = preprocessor.transform([{'age': 50.0, 'visits': 3, 'country': None, 'member': True}])
+    mode = preprocessor.transform([{'age': 50.0, 'visits': 3, 'country': df['country'].mode()[0], 'member': True}])
+    assert np.isfinite(unseen).all()
+    assert unseen[0, 2] == missing[0, 2] == mode[0, 2]
+
+
+def test_preprocessor_round_trips_through_artifact(tmp_path):
+    """Test the artifact carries the preprocessor and serving applies it"""
+    df = raw_frame()
+    preprocessor = Preprocessor.fit(df)
+    y = (df['visits'] > 10).astype(int)
+    model = DecisionTreeClassifier(max_depth=3, random_state=0).fit(preprocessor.transform(df), y)
+    path = str(tmp_path / 'model.pkl')
+    save_artifact(model, 'decision_tree', path, preprocessor=preprocessor.to_dict())
+    
+    loaded, family, restored = load_serving_artifact(path)
+    served = ServedModel('v1', loaded, family, restored)
+    predictions, _, _ = served.predict(served.prepare(df.to_dict('records')))
+    
+    assert restored.version == preprocessor.version
+    assert np.array_equal(predictions, model.predict(preprocessor.transform(df)))
+    assert load_artifact(path)[1].name == 'decision_tree'
@@ -0,0 +1,44 @@
+"""Unit tests for the Redis client wrapper"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from shared.redis_client import RedisClient
+
+
+def test_ring_buffer_is_bounded():
+    """Test lpush + ltrim keeps only the newest items"""
+    client = RedisClient()
+    
+    for i in range(10):
+        client.lpush('buffer', {'i': i})
+        client.ltrim('buffer', 0, 3)
+    
+    assert client.llen('buffer') == 4
+    assert client.rpop('buffer') == {'i': 6}
+
+
+def test_bulk_rpop():
+    """Test popping several items at once in FIFO order"""
+    client = RedisClient()
+    
+    for i in range(5):
+        client.lpush('queue', i)
+    
+    assert client.rpop('queue', count=3) == [0, 1, 2]
+    assert client.rpop('queue', count=10) == [3, 4]
+    assert client.rpop('queue', count=10) is None
+    assert client.rpop('queue') is None
+
+
+def test_bulk_lpop():
+    """Test popping several items at once, newest first"""
+    client = RedisClient()
+    
+    for i in range(5):
+        client.lpush('queue', i)
+    
+    assert client.lpop('queue', count=3) == [4, 3, 2]
+    assert client.lpop('queue') == 1
+    assert client.lpop('queue', count=10) == [0]
+    assert client.lpop('queue', count=10) is None
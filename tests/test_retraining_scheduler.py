@@ -0,0 +1,91 @@
+"""Unit tests for the retraining job scheduler"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import threading
+import time
+
+from services.retraining_worker.scheduler import RetrainingScheduler
+
+
+class Recorder:
+    """Collects runs and transitions; jobs block until released"""
+    
+    def __init__(self):
+        self.runs = []
+        self.transitions = []
+        self.release = threading.Event()
+    
+    def run_job(self, job, n_jobs):
+        self.runs.append((job.model, n_jobs, job.triggers))
+        self.release.wait(5)
+        return True
+    
+    def on_transition(self, job, status):
+        self.transitions.append((job.model, status))
+
+
+def wait_for(condition, timeout=5.0):
+    """Poll until a condition holds"""
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+
+
+def test_coalesces_pending_triggers():
+    """Test repeated triggers for one model become a single job"""
+    rec = Recorder()
+    scheduler = RetrainingScheduler(rec.run_job, rec.on_transition, cooldown=0)
+    
+    for score in (0.2, 0.9, 0.5):
+        scheduler.submit({'model': 'm', 'trigger': 'drift_detected', 'drift_score': score})
+    
+    assert scheduler.get_stats()['pending'] == 1
+    assert scheduler.pending['m'].priority == 0.9
+    
+    rec.release.set()
+    assert scheduler.dispatch() == 1
+    wait_for(lambda: scheduler.get_stats()['completed'] == 1)
+    
+    assert rec.runs == [('m', scheduler.cpu_budget, 3)]
+    assert [t[1] for t in rec.transitions] == ['queued', 'started', 'completed']
+    scheduler.stop()
+
+
+def test_cooldown_holds_back_next_job():
+    """Test a model is not retrained again inside its cool-down"""
+    rec = Recorder()
+    rec.release.set()
+    scheduler = RetrainingScheduler(rec.run_job, cooldown=60)
+    
+    scheduler.submit({'model': 'm'})
+    scheduler.dispatch()
+    wait_for(lambda: scheduler.get_stats()['completed'] == 1)
+    
+    scheduler.submit({'model': 'm'})
+    assert scheduler.dispatch() == 0
+    assert scheduler.dispatch(now=time.time() + 61) == 1
+    scheduler.stop()
+
+
+def test_priority_and_worker_limit():
+    """Test the highest drift score runs first and CPUs are split across workers"""
+    rec = Recorder()
+    scheduler = RetrainingScheduler(rec.run_job, max_workers=2, cooldown=0, cpu_budget=8)
+    
+    scheduler.submit({'model': 'low', 'drift_score': 0.1})
+    scheduler.submit({'model': 'high', 'drift_score': 0.8})
+    scheduler.submit({'model': 'mid', 'drift_score': 0.4})
+    
+    assert scheduler.dispatch() == 2
+    wait_for(lambda: len(rec.runs) == 2)
+    
+    assert sorted(m for m, _, _ in rec.runs) == ['high', 'mid']
+    assert all(n_jobs == 4 for _, n_jobs, _ in rec.runs)
+    assert scheduler.dispatch() == 0
+    
+    rec.release.set()
+    wait_for(lambda: scheduler.get_stats()['running'] == 0)
+    assert scheduler.dispatch() == 1
+    scheduler.stop()
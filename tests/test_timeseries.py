@@ -0,0 +1,88 @@
+"""Unit tests for metric rollups and chart downsampling"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import time
+import numpy as np
+
+from dashboards.data_layer import DashboardData
+from shared.database import DatabaseManager
+from shared.timeseries import (LATENCY_BIN_EDGES_MS, bucket_rows, latency_bin, lttb,
+                               minmax_downsample, pick_resolution, prediction_points,
+                               quantile_from_bins)
+
+
+def test_lttb_keeps_endpoints_and_spikes():
+    """Test LTTB returns n_out points including the ends and an isolated spike"""
+    x = np.arange(10000, dtype=float)
+    y = np.sin(x / 500)
+    y[4321] = 25.0
+    
+    xs, ys = lttb(x, y, 200)
+    
+    assert len(xs) == 200
+    assert xs[0] == 0 and xs[-1] == 9999
+    assert 4321 in xs and np.all(np.diff(xs) > 0)
+
+
+def test_minmax_downsample_keeps_extremes():
+    """Test min/max downsampling is bounded and keeps the global min and max"""
+    rng = np.random.default_rng(0)
+    x = np.arange(5000, dtype=float)
+    y = rng.normal(size=5000)
+    
+    xs, ys = minmax_downsample(x, y, 100)
+    
+    assert len(xs) <= 100
+    assert ys.max() == y.max() and ys.min() == y.min()
+
+
+def test_latency_percentile_from_bins():
+    """Test p95 from the log histogram is within one bin of the exact value"""
+    latencies = np.random.default_rng(1).lognormal(1, 0.5, 5000)
+    counts = {}
+    for ms in latencies:
+        counts[latency_bin(ms)] = counts.get(latency_bin(ms), 0) + 1
+    
+    estimate = quantile_from_bins(counts, 0.95)
+    exact = np.percentile(latencies, 95)
+    ratio = LATENCY_BIN_EDGES_MS[1] / LATENCY_BIN_EDGES_MS[0]
+    
+    assert exact <= estimate <= exact * ratio
+
+
+def test_rollup_resolution_grows_with_range():
+    """Test wider ranges read coarser rollups"""
+    assert pick_resolution(3600) == 60
+    assert pick_resolution(86400) == 60
+    assert pick_resolution(30 * 86400) == 3600
+    assert pick_resolution(365 * 86400) == 86400
+
+
+def test_series_are_bounded_whatever_the_range(tmp_path):
+    """Test charts over three days of minute data send at most max_points per series"""
+    db = DatabaseManager(str(tmp_path / 'ts.db'))
+    now = time.time()
+    rng = np.random.default_rng(2)
+    rows = []
+    for minute in range(3 * 1440):
+        predictions = rng.integers(0, 2, 10)
+        points = prediction_points(predictions, rng.uniform(0.5, 1, 10), rng.uniform(0.001, 0.01))
+        rows.extend(bucket_rows(points, now - minute * 60))
+    db.record_metric_buckets(rows)
+    db.record_metric_buckets(bucket_rows({'drift_score': (1, 0.4, 0.4)}, now))
+    data = DashboardData(db)
+    
+    day = data.get_series(86400, max_points=200)
+    week = data.get_series(7 * 86400, max_points=200)
+    
+    assert day['resolution'] == 60 and week['resolution'] == 3600
+    for series in (day, week):
+        assert set(series['volume']) == {0, 1}
+        for points in [*series['volume'].values(), series['confidence'], series['latency_p95']]:
+            assert 0 < len(points['x']) <= 200
+    assert day['drift_score']['y'] == [0.4]
+    # Rates are per minute at every rollup (10 predictions/minute, two classes)
+    assert 3 <= np.median(day['volume'][0]['y']) <= 7
+    assert 4 < np.median(week['volume'][0]['y']) < 6
@@ -0,0 +1,72 @@
+"""Unit tests for the model trainer"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+import numpy as np
+from sklearn.datasets import make_classification
+
+from ml.training.trainer import ModelTrainer, FoldEnsemble
+from shared.config import ModelConfig
+
+
+@pytest.fixture
+def sample_data():
+    """Generate sample data for testing"""
+    return make_classification(n_samples=400, n_features=8, random_state=42)
+
+
+@pytest.mark.parametrize("mode", ["cv", "oob", "holdout"])
+def test_training_modes(sample_data, mode):
+    """Test every mode trains a model and reports its timings"""
+    X, y = sample_data
+    trainer = ModelTrainer({'n_estimators': 20})
+    
+    metrics, _ = trainer.train(X, y, mode=mode)
+    
+    assert metrics['training_mode'] == mode
+    assert metrics['accuracy'] > 0.7
+    assert metrics['fit_time'] > 0
+    assert trainer.model.predict(X[:5]).shape == (5,)
+
+
+def test_cv_without_refit_serves_fold_ensemble(sample_data):
+    """Test CV fold models are reused instead of a sixth fit"""
+    X, y = sample_data
+    trainer = ModelTrainer({'n_estimators': 20, 'cv_refit': False})
+    
+    metrics, _ = trainer.train(X, y, mode='cv')
+    
+    assert isinstance(trainer.model, FoldEnsemble)
+    assert len(trainer.cv_models) == 5
+    assert 'fit_time' not in metrics and metrics['cv_time'] > 0
+    assert trainer.model.predict_proba(X[:3]).shape == (3, 2)
+
+
+def test_accepts_model_config_dataclass(sample_data):
+    """Test the service config dataclass can be passed directly"""
+    X, y = sample_data
+    trainer = ModelTrainer(ModelConfig(n_estimators=10, training_mode='oob'))
+    
+    metrics, _ = trainer.train(X, y)
+    
+    assert metrics['training_mode'] == 'oob'
+
+
+def test_incremental_update_keeps_forest_bounded(sample_data):
+    """Test warm-start updates add trees and retire the oldest ones"""
+    X, y = sample_data
+    trainer = ModelTrainer({'n_estimators': 20, 'max_trees': 20, 'decay': 0.75})
+    trainer.train(X[:200], y[:200], mode='oob')
+    base = trainer.model
+    oldest = base.estimators_[0]
+    
+    assert trainer.can_update(base, X[200:], y[200:])
+    metrics, _ = trainer.train_incremental(X[200:], y[200:], base,
+                                           sample_weight=np.ones(200))
+    
+    assert metrics['trees_added'] == 5
+    assert metrics['forest_size'] == 20
+    assert oldest not in trainer.model.estimators_
+    assert trainer.model.predict(X[:5]).shape == (5,)
@@ -0,0 +1,112 @@
+"""Unit tests for the training data store"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+import numpy as np
+
+from ml.feature_store.training_data import TrainingDataStore, row_hashes
+
+
+@pytest.fixture
+def store(tmp_path):
+    """Empty store in a temporary directory"""
+    return TrainingDataStore(str(tmp_path / "training"))
+
+
+def test_row_hashes_detect_label_and_value_changes():
+    """Test identical rows hash equal and any change alters the hash"""
+    X = np.array([[1.0, 2.0], [1.0, 2.0], [1.0, 2.5]])
+    y = np.array([0, 0, 0])
+    
+    hashes = row_hashes(X, y)
+    
+    assert hashes[0] == hashes[1]
+    assert hashes[0] != hashes[2]
+    assert row_hashes(X[:1], np.array([1]))[0] != hashes[0]
+
+
+def test_append_skips_duplicates(store):
+    """Test duplicate rows are skipped within and across appends"""
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(50, 4))
+    y = rng.integers(0, 2, size=50)
+    
+    assert store.append(np.vstack([X, X[:10]]), np.concatenate([y, y[:10]])) == 50
+    assert store.append(X[:20], y[:20]) == 0
+    assert len(store.manifest['shards']) == 1
+
+
+def test_snapshot_selects_time_window(store):
+    """Test snapshots use shard time ranges and filter edge rows"""
+    rng = np.random.default_rng(1)
+    for day in range(3):
+        X = rng.normal(size=(10, 3))
+        store.append(X, np.full(10, day), timestamps=day * 100.0 + np.arange(10))
+    
+    snapshot_id = store.create_snapshot(start=105, end=205)
+    X, y, _ = store.load_snapshot(snapshot_id)
+    
+    assert store.get_snapshot(snapshot_id)['shards'] == ['shard_000001', 'shard_000002']
+    assert len(X) == 10
+    assert set(y.tolist()) == {1, 2}
+
+
+def test_snapshots_survive_reopen(store):
+    """Test the manifest persists shards and snapshots"""
+    X = np.arange(12, dtype=float).reshape(6, 2)
+    store.append(X, np.zeros(6))
+    snapshot_id = store.create_snapshot()
+    
+    reopened = TrainingDataStore(store.root)
+    X_loaded, _, _ = reopened.load_snapshot(snapshot_id)
+    
+    np.testing.assert_array_equal(X_loaded, X)
+    assert reopened.append(X, np.zeros(6)) == 0
+
+
+def test_snapshot_after_shard_returns_new_data_only(store):
+    """Test incremental snapshots skip shards already trained on"""
+    store.append(np.ones((3, 2)), np.zeros(3))
+    first = store.latest_shard()
+    store.append(np.full((4, 2), 2.0) + np.arange(4)[:, None], np.ones(4))
+    
+    X, _, _ = store.load_snapshot(store.create_snapshot(after_shard=first))
+    
+    assert len(X) == 4
+    assert store.create_snapshot(after_shard=store.latest_shard()) is None
+
+
+def test_snapshot_holds_one_preprocessor_version(store):
+    """Test a snapshot only spans shards of the newest shard's preprocessor"""
+    store.append(np.arange(6.0).reshape(3, 2), np.zeros(3), preprocessor='p1')
+    store.append(np.full((4, 3), 2.0) + np.arange(4)[:, None], np.ones(4), preprocessor='p2')
+    store.append(np.full((5, 2), 3.0) + np.arange(5)[:, None], np.ones(5), preprocessor='p1')
+    
+    snapshot_id = store.create_snapshot()
+    X, _, _ = store.load_snapshot(snapshot_id)
+    
+    assert store.get_snapshot(snapshot_id)['preprocessor'] == 'p1'
+    assert X.shape == (8, 2)
+
+
+def test_holdout_split_is_stable_and_disjoint(store):
+    """Test train/holdout splits partition a snapshot and identical snapshots are reused"""
+    rng = np.random.default_rng(2)
+    store.append(rng.normal(size=(500, 3)), rng.integers(0, 2, size=500))
+    
+    snapshot_id = store.create_snapshot()
+    X_train, _, _ = store.load_snapshot(snapshot_id, split='train')
+    X_hold, _, _ = store.load_snapshot(snapshot_id, split='holdout')
+    
+    assert len(X_train) + len(X_hold) == 500
+    assert 20 < len(X_hold) < 80
+    assert store.create_snapshot() == snapshot_id
+
+
+def test_holdout_every_must_leave_training_rows(tmp_path):
+    """Test a holdout interval below 2 is rejected"""
+    for holdout_every in (0, 1):
+        with pytest.raises(ValueError):
+            TrainingDataStore(str(tmp_path / 'training'), holdout_every=holdout_every)
@@ -0,0 +1,85 @@
+"""Unit tests for hyperparameter search"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import time
+import numpy as np
+from sklearn.datasets import make_classification
+
+from ml.training.tuning import HyperbandSearch, sample_configs
+from ml.training.trainer import ModelTrainer
+from registry.mlflow.mlflow_client import MLFlowClient
+
+SMALL_SPACE = {'n_estimators': [10, 20], 'max_depth': [3, None], 'min_samples_leaf': [1, 4]}
+
+
+class RecordingClient(MLFlowClient):
+    """Tracking client that keeps logged metrics"""
+    
+    def __init__(self, tracking_dir):
+        super().__init__(f"file:{tracking_dir}", "tuning_test")
+        self.logged = []
+    
+    def log_metrics(self, metrics: dict):
+        self.logged.append(metrics)
+
+
+def test_sample_configs_draws_from_space():
+    """Test sampled configs only use candidate values"""
+    configs = sample_configs(SMALL_SPACE, 5, np.random.default_rng(0))
+    
+    assert len(configs) == 5
+    for config in configs:
+        assert all(config[name] in values for name, values in SMALL_SPACE.items())
+
+
+def test_hyperband_promotes_to_full_data(tmp_path):
+    """Test successive halving reaches the full training set and logs each trial"""
+    X, y = make_classification(n_samples=900, n_features=8, random_state=42)
+    client = RecordingClient(tmp_path)
+    search = HyperbandSearch(space=SMALL_SPACE, min_samples=80, max_workers=1,
+                             time_budget=120, mlflow_client=client)
+    
+    best = search.search(X, y)
+    
+    assert best is not None
+    assert search.best['n_samples'] == 720
+    assert len(client.logged) == len(search.trials)
+    # Early rungs train on subsamples
+    assert min(t['n_samples'] for t in search.trials) < 720
+
+
+def test_time_budget_stops_search():
+    """Test a zero budget returns without running trials"""
+    X, y = make_classification(n_samples=300, n_features=5, random_state=0)
+    search = HyperbandSearch(space=SMALL_SPACE, max_workers=1, time_budget=0)
+    
+    assert search.search(X, y) is None
+    assert search.trials == []
+
+
+def test_trainer_uses_tuned_params():
+    """Test tuned parameters are applied to the next training run"""
+    X, y = make_classification(n_samples=600, n_features=6, random_state=1)
+    trainer = ModelTrainer({'n_jobs': 1, 'tuning_min_samples': 100, 'tuning_time_budget': 120})
+    
+    result = trainer.tune(X, y)
+    trainer.train(X, y, mode='holdout')
+    
+    assert result['trials'] > 0
+    assert trainer.model.max_depth == result['best_params']['max_depth']
+
+
+def test_time_budget_terminates_running_trials():
+    """Test trials still running at the deadline are killed rather than left to finish"""
+    import multiprocessing
+    
+    X, y = make_classification(n_samples=20000, n_features=20, random_state=0)
+    search = HyperbandSearch(space={'n_estimators': [500], 'max_depth': [None]}, min_samples=20000,
+                             max_workers=2, time_budget=1)
+    
+    start = time.time()
+    assert search.search(X, y) is None
+    assert time.time() - start < 5
+    assert multiprocessing.active_children() == []